@@ -0,0 +1,54 @@
+# app/bulk.py
+"""
+Translate a TSV, JSONL, PO or XLIFF file from the command line, without the
+HTTP server. Examples:
+
+    python -m app.bulk strings.tsv strings.out.tsv --source en --target es,fr,de
+    python -m app.bulk messages.po messages.es.po --source en --target es
+
+Progress is checkpointed next to the output file; running the same command
+again after a failure picks up where it stopped (use --restart to start over).
+"""
+import argparse
+import asyncio
+import json
+import sys
+from app.services.bulk_jobs import BulkJob, FORMATS
+from app.services.model_loader import model_loader
+from app.utils.log import setup_logging
+
+async def run(args) -> int:
+    try:
+        job = BulkJob(
+            args.input, args.output, args.source, args.target.split(","),
+            file_format=args.format, chunk_size=args.chunk_size, parallelism=args.parallelism,
+        )
+    except ValueError as e:
+        print(f"error: {str(e)}", file=sys.stderr)
+        return 2
+    try:
+        await job.run(resume=not args.restart)
+    except Exception:
+        return 1
+    finally:
+        await model_loader.clear_cache()
+        print(json.dumps(job.status(), indent=2))
+    return 0
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("input")
+    parser.add_argument("output")
+    parser.add_argument("--source", required=True, help="Source language")
+    parser.add_argument("--target", required=True, help="Target languages, comma separated")
+    parser.add_argument("--format", choices=sorted(FORMATS), help="File format (default: from the extension)")
+    parser.add_argument("--chunk-size", type=int, help="Records translated per checkpoint")
+    parser.add_argument("--parallelism", type=int, help="Strings in flight at once")
+    parser.add_argument("--restart", action="store_true", help="Ignore an existing checkpoint")
+    args = parser.parse_args()
+
+    setup_logging()
+    sys.exit(asyncio.run(run(args)))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+# app/controllers/jobs.py
+import os
+from typing import List, Optional
+from fastapi import APIRouter, HTTPException
+from pydantic import BaseModel
+from app.services.bulk_jobs import BulkJob, FORMATS, job_manager
+from app.config import config
+
+router = APIRouter()
+
+class JobRequest(BaseModel):
+    input_path: str
+    output_path: str
+    source_lang: str
+    target_langs: List[str]
+    format: Optional[str] = None
+
+def _job_path(path: str) -> str:
+    """Resolve a path inside bulk_jobs_dir; jobs can't read or write elsewhere on the server"""
+    jobs_dir = os.path.realpath(config.get("bulk_jobs_dir", "jobs"))
+    resolved = os.path.realpath(os.path.join(jobs_dir, path))
+    if os.path.commonpath([jobs_dir, resolved]) != jobs_dir:
+        raise HTTPException(status_code=400, detail=f"Path '{path}' is outside the jobs directory")
+    return resolved
+
+@router.post("/jobs")
+async def create_job(request: JobRequest):
+    supported_langs = config.get("supported_languages", [])
+    for lang in [request.source_lang, *request.target_langs]:
+        if lang not in supported_langs:
+            raise HTTPException(status_code=400, detail=f"Language '{lang}' not supported")
+    if request.format is not None and request.format not in FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unknown format '{request.format}'")
+
+    input_path = _job_path(request.input_path)
+    if not os.path.isfile(input_path):
+        raise HTTPException(status_code=404, detail=f"Input file '{request.input_path}' not found")
+    try:
+        job = BulkJob(input_path, _job_path(request.output_path), request.source_lang,
+                      request.target_langs, file_format=request.format)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    job_manager.submit(job)
+    return job.status()
+
+@router.get("/jobs")
+def list_jobs():
+    return {"jobs": [job.status() for job in job_manager.jobs.values()]}
+
+@router.get("/jobs/{job_id}")
+def get_job(job_id: str):
+    job = job_manager.jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+    return job.status()
+
+@router.delete("/jobs/{job_id}")
+def cancel_job(job_id: str):
+    if job_id not in job_manager.jobs:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+    if not job_manager.cancel(job_id):
+        raise HTTPException(status_code=400, detail=f"Job {job_id} is not running")
+    return {"message": f"Job {job_id} cancelled; it can be resumed from its checkpoint"}
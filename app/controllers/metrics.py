@@ -0,0 +1,41 @@
+# app/controllers/metrics.py
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+from app.services.model_loader import model_loader
+from app.services.translation_cache import translation_cache
+from app.services.translation_memory import translation_memory
+from app.services.eviction import process_rss
+from app.services.metrics import (
+    registry, process_cpu_seconds,
+    CACHE_LOOKUPS, CACHE_HIT_RATIO, MEMORY_LOOKUPS, DECODER_RSS, DECODER_CPU
+)
+
+router = APIRouter()
+
+def collect_gauges():
+    """Refresh the gauges that are sampled rather than updated on the hot path"""
+    cache_stats = translation_cache.stats()
+    CACHE_LOOKUPS.set(cache_stats["hits"], result="hit")
+    CACHE_LOOKUPS.set(cache_stats["misses"], result="miss")
+    CACHE_HIT_RATIO.set(cache_stats["hit_ratio"])
+    memory_stats = translation_memory.stats()
+    if memory_stats["enabled"]:
+        MEMORY_LOOKUPS.set(memory_stats["exact_hits"], result="exact")
+        MEMORY_LOOKUPS.set(memory_stats["fuzzy_hits"], result="fuzzy")
+        MEMORY_LOOKUPS.set(memory_stats["misses"], result="miss")
+
+    DECODER_RSS.clear()
+    DECODER_CPU.clear()
+    for key, pool in list(model_loader.models.items()):
+        for replica in pool.replicas:
+            # In-process backends (ctranslate2) have no decoder process of their own
+            process = getattr(replica, "process", None)
+            if process is None or process.returncode is not None:
+                continue
+            DECODER_RSS.set(process_rss(process.pid), model=key, pid=process.pid)
+            DECODER_CPU.set(process_cpu_seconds(process.pid), model=key, pid=process.pid)
+
+@router.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    collect_gauges()
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
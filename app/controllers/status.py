@@ -1,10 +1,23 @@
 # app/controllers/status.py
 from fastapi import APIRouter
 from app.services.model_loader import model_loader
+from app.services.translation_cache import translation_cache
+from app.services.translation_memory import translation_memory
+from app.services.routing import router as model_router
+from app.services.rate_limit import rate_limiter
+from app.services.placement import coordinator
 
 router = APIRouter()
 
 @router.get("/status")
 def status():
     loaded_models = model_loader.get_status()
-    return {"loaded_models": loaded_models}
+    return {
+        "loaded_models": loaded_models,
+        "model_loads": model_loader.load_stats(),
+        "translation_cache": translation_cache.stats(),
+        "translation_memory": translation_memory.stats(),
+        "routing": model_router.stats(),
+        "rate_limit": rate_limiter.stats(),
+        "cluster": coordinator.status()
+    }
@@ -1,7 +1,17 @@
 # app/controllers/translate.py
-from fastapi import APIRouter, HTTPException
+import asyncio
+import codecs
+import json
+from typing import List
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from app.services.translation import translate_text
+from app.services.translation import translate_text, translate_batch, translate_stream
+from app.services.rate_limit import (
+    PRIORITIES, RateLimitedError, RequestTooLargeError, QueueFullError, rate_limiter, request_priority
+)
+from app.services.metrics import REJECTED
+from app.services.language_detection import AUTO, language_detector
 from app.config import config
 
 router = APIRouter()
@@ -11,21 +21,155 @@ class TranslationRequest(BaseModel):
     target_lang: str
     text: str
 
+class DuplexStreamingResponse(StreamingResponse):
+    """
+    StreamingResponse for a body iterator that is still reading the request.
+
+    The stock response listens on receive() for disconnects while streaming,
+    which would steal request body chunks from the iterator. Here the
+    listener only starts once body_read is set; until then a disconnect
+    reaches the iterator itself, through request.stream().
+    """
+    def __init__(self, content, body_read: asyncio.Event, **kwargs):
+        super().__init__(content, **kwargs)
+        self.body_read = body_read
+
+    async def __call__(self, scope, receive, send):
+        async def listen_after_body():
+            await self.body_read.wait()
+            await self.listen_for_disconnect(receive)
+
+        streaming = asyncio.ensure_future(self.stream_response(send))
+        listening = asyncio.ensure_future(listen_after_body())
+        try:
+            await asyncio.wait({streaming, listening}, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            # A client that went away stops the translation instead of waiting for the next failed send
+            streaming.cancel()
+            listening.cancel()
+        if streaming.done() and not streaming.cancelled() and streaming.exception() is not None:
+            raise streaming.exception()
+        if self.background is not None:
+            await self.background()
+
+class BatchTranslationRequest(BaseModel):
+    source_lang: str
+    target_langs: List[str]
+    texts: List[str]
+
+def admit(request: Request, default_priority: str, cost: float = 1.0):
+    """
+    Charge the request (cost tokens) to its client's rate limit and set its
+    priority class.
+
+    Clients are told apart by their address. The X-Client-ID header is only
+    believed from rate_limit_trusted_proxies; anyone else could get a fresh
+    allowance by changing it. X-Priority: bulk lets a client mark its own
+    traffic as bulk; it can't raise bulk endpoints to interactive.
+    """
+    client = request.client.host if request.client else "unknown"
+    if client in config.get("rate_limit_trusted_proxies", []):
+        client = request.headers.get("x-client-id") or client
+    try:
+        rate_limiter.check(client, cost)
+    except RateLimitedError as e:
+        REJECTED.inc(reason="rate_limit")
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+    except RequestTooLargeError as e:
+        REJECTED.inc(reason="rate_limit")
+        raise HTTPException(status_code=400, detail=str(e))
+
+    requested = PRIORITIES.get(request.headers.get("x-priority", "").lower(), 0)
+    request_priority.set(max(PRIORITIES[default_priority], requested))
+
 @router.post("/translate")
-async def translate(request: TranslationRequest):
+async def translate(request: TranslationRequest, http_request: Request):
 
     supported_langs = config.get("supported_languages", [])
-    if request.source_lang not in supported_langs:
+    if request.source_lang not in supported_langs and request.source_lang != AUTO:
         raise HTTPException(status_code=400, detail=f"Source language '{request.source_lang}' not supported")
     
     if request.target_lang not in supported_langs:
         raise HTTPException(status_code=400, detail=f"Target language '{request.target_lang}' not supported")
-    
+
+    admit(http_request, "interactive")
+    source_lang = request.source_lang
+    if source_lang == AUTO:
+        source_lang = language_detector.detect(request.text) or config.get("language_detection_fallback")
+        if source_lang is None:
+            raise HTTPException(status_code=422, detail="Could not detect the source language; send source_lang instead of auto")
     try:
-        result = await translate_text(request.source_lang, request.target_lang, request.text)
+        result = await translate_text(source_lang, request.target_lang, request.text)
+        if request.source_lang == AUTO:
+            return {"translated_text": result, "detected_source_lang": source_lang}
         return {"translated_text": result}
-    
+
+    except QueueFullError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(e.retry_after)})
     except FileNotFoundError as e:
         raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Translation failed: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Translation failed: {str(e)}")
+
+@router.post("/translate/batch")
+async def translate_many(request: BatchTranslationRequest, http_request: Request):
+
+    supported_langs = config.get("supported_languages", [])
+    if request.source_lang not in supported_langs and request.source_lang != AUTO:
+        raise HTTPException(status_code=400, detail=f"Source language '{request.source_lang}' not supported")
+
+    for target_lang in request.target_langs:
+        if target_lang not in supported_langs:
+            raise HTTPException(status_code=400, detail=f"Target language '{target_lang}' not supported")
+
+    max_texts = config.get("max_batch_texts", 1000)
+    if len(request.texts) > max_texts:
+        raise HTTPException(status_code=400, detail=f"Batch exceeds the limit of {max_texts} texts")
+
+    # Every text and target is a translation of its own
+    items = len(request.texts) * len(set(request.target_langs))
+    admit(http_request, "bulk", max(1.0, items * config.get("rate_limit_batch_item_cost", 0.1)))
+    results = await translate_batch(request.source_lang, request.target_langs, request.texts)
+    return {"results": results}
+
+
+@router.post("/translate/stream")
+async def translate_streaming(source_lang: str, target_lang: str, request: Request):
+    """
+    Translate a plain-text request body as it arrives.
+
+    Each finished segment is sent as one NDJSON line, or as a server-sent
+    event when the client accepts text/event-stream. Concatenating every
+    "separator" and "translated_text" in order rebuilds the document.
+    """
+    supported_langs = config.get("supported_languages", [])
+    if source_lang not in supported_langs:
+        raise HTTPException(status_code=400, detail=f"Source language '{source_lang}' not supported")
+
+    if target_lang not in supported_langs:
+        raise HTTPException(status_code=400, detail=f"Target language '{target_lang}' not supported")
+
+    body_read = asyncio.Event()
+
+    async def body_text():
+        # Multi-byte characters may be split across network chunks
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        async for chunk in request.stream():
+            text = decoder.decode(chunk)
+            if text:
+                yield text
+        body_read.set()
+        text = decoder.decode(b"", final=True)
+        if text:
+            yield text
+
+    admit(request, "interactive")
+    use_sse = "text/event-stream" in request.headers.get("accept", "")
+
+    async def events():
+        async for item in translate_stream(source_lang, target_lang, body_text()):
+            line = json.dumps(item, ensure_ascii=False)
+            yield f"data: {line}\n\n" if use_sse else line + "\n"
+
+    media_type = "text/event-stream" if use_sse else "application/x-ndjson"
+    return DuplexStreamingResponse(events(), body_read, media_type=media_type)
@@ -10,13 +10,39 @@
 #debug_marian.py
 
 # app/main.py
+import asyncio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
-from app.controllers import translate, load, unload, clear, status
+from app.controllers import translate, load, unload, clear, status, metrics, jobs
 from app.config import config
+from app.services.model_loader import model_loader
+from app.services.placement import coordinator
+from app.services.translation import decode_local
+from app.services.bulk_jobs import job_manager
+from app.services.translation_memory import translation_memory
 from app.utils.errors import http_error_handler
-import logging
+from app.utils.log import RequestTracingMiddleware, setup_logging, stop_logging
 
-app = FastAPI(title="FluentAI")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Log through a background writer so handlers never block the event loop
+    setup_logging()
+    # Share model placement with the other workers, if configured
+    await coordinator.start(model_loader, decode_local)
+    # Index the models and warm the model cache in the background so startup isn't blocked on it
+    startup_task = asyncio.create_task(model_loader.start_up(preload=config.get("preload_on_startup", True)))
+    yield
+    startup_task.cancel()
+    await model_loader.shut_down()
+    await job_manager.shutdown()
+    await coordinator.stop()
+    await translation_memory.close()
+    # Remember what was hot for the next start, then stop all decoders
+    model_loader.save_history()
+    await model_loader.clear_cache()
+    stop_logging()
+
+app = FastAPI(title="FluentAI", lifespan=lifespan)
 
 # Register API routers
 app.include_router(translate.router)
@@ -24,21 +50,15 @@ app.include_router(load.router)
 app.include_router(unload.router)
 app.include_router(clear.router)
 app.include_router(status.router)
+app.include_router(metrics.router)
+app.include_router(jobs.router)
+
+# Tag every request with an ID that follows it through the logs
+app.add_middleware(RequestTracingMiddleware)
 
 # Global exception handler for consistent error responses
 app.add_exception_handler(Exception, http_error_handler)
 
 if __name__ == "__main__":
-    # Configure logging
-    logging.basicConfig(
-    level=getattr(logging, config.get("log_level", "INFO")),
-    filename=config.get("log_file", "fluentai.log"),
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-    handlers=[
-        logging.FileHandler(config.get("log_file", "fluentai.log")),
-        logging.StreamHandler()  # Added this to see logs in console
-    ]
-)
-    
     import uvicorn
     uvicorn.run(app, host=config.get("host", "0.0.0.0"), port=config.get("port", 8000))
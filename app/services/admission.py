@@ -0,0 +1,70 @@
+# app/services/admission.py
+import asyncio
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+
+class AdmissionQueue:
+    """First-come first-served admission with a concurrency limit and wait-time statistics"""
+
+    def __init__(self, limit: int):
+        self.limit = max(1, limit)
+        self.active = 0
+        self._waiters = deque()
+        self.admitted = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.last_wait = 0.0
+
+    @property
+    def waiting(self) -> int:
+        return len(self._waiters)
+
+    @asynccontextmanager
+    async def slot(self):
+        """Hold one of the limited slots for the duration of the block"""
+        started = time.monotonic()
+        if self.active < self.limit and not self._waiters:
+            self.active += 1
+        else:
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters.append(waiter)
+            try:
+                await waiter
+            except asyncio.CancelledError:
+                if waiter.done() and not waiter.cancelled():
+                    # The slot was handed over just as we gave up; pass it on
+                    self._release()
+                else:
+                    self._waiters.remove(waiter)
+                raise
+
+        wait = time.monotonic() - started
+        self.admitted += 1
+        self.total_wait += wait
+        self.last_wait = wait
+        self.max_wait = max(self.max_wait, wait)
+        try:
+            yield
+        finally:
+            self._release()
+
+    def _release(self):
+        # Hand the slot straight to the next waiter so nobody can jump the queue
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.active -= 1
+
+    def stats(self) -> dict:
+        return {
+            "limit": self.limit,
+            "active": self.active,
+            "waiting": self.waiting,
+            "admitted": self.admitted,
+            "avg_wait_ms": round(self.total_wait / self.admitted * 1000, 2) if self.admitted else 0.0,
+            "max_wait_ms": round(self.max_wait * 1000, 2),
+            "last_wait_ms": round(self.last_wait * 1000, 2),
+        }
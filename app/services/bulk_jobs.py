@@ -0,0 +1,441 @@
+# app/services/bulk_jobs.py
+import asyncio
+import html
+import json
+import logging
+import os
+import uuid
+import xml.etree.ElementTree as ET
+from collections import defaultdict
+from datetime import datetime
+from app.config import config
+from app.services.admission import AdmissionQueue
+from app.services.rate_limit import BULK, QueueFullError, request_priority
+from app.services.translation import translate_text
+from app.utils.log import request_id
+
+# Input and output formats. Readers yield records {"id", "source_lang", "texts", "raw"};
+# a record usually has one text, a PO plural entry has two (singular and plural).
+# A record that can't be translated has no texts and an "error" instead.
+
+class TSVFormat:
+    """id<TAB>text per line (or just text); output adds one column per target"""
+
+    single_target = False
+
+    def read(self, path):
+        with open(path, "r", encoding="utf-8") as f:
+            for number, line in enumerate(f, 1):
+                line = line.rstrip("\r\n")
+                if not line:
+                    continue
+                record_id, tab, text = line.partition("\t")
+                if not tab:
+                    record_id, text = str(number), line
+                yield {"id": record_id, "source_lang": None, "texts": [text], "raw": None}
+
+    def header(self, source_lang, target_langs):
+        return ""
+
+    def write(self, record, translations, errors, target_langs):
+        columns = [record["id"]] + [translations[0].get(target, "") for target in target_langs]
+        return "\t".join(column.replace("\t", " ").replace("\n", " ") for column in columns) + "\n"
+
+    def footer(self):
+        return ""
+
+class JSONLFormat:
+    """{"id", "text", optional "source_lang"} per line; output adds "translations" and "errors" """
+
+    single_target = False
+
+    def read(self, path):
+        with open(path, "r", encoding="utf-8") as f:
+            for number, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    data = json.loads(line)
+                except ValueError as e:
+                    yield {"id": number, "source_lang": None, "texts": [], "raw": {"id": number},
+                           "error": f"Line {number} is not valid JSON: {str(e)}"}
+                    continue
+                if not isinstance(data, dict) or not isinstance(data.get("text"), str):
+                    raw = data if isinstance(data, dict) else {"id": number}
+                    yield {"id": raw.get("id", number), "source_lang": None, "texts": [], "raw": raw,
+                           "error": f"Line {number} has no \"text\" string"}
+                    continue
+                yield {"id": data.get("id", number), "source_lang": data.get("source_lang"),
+                       "texts": [data["text"]], "raw": data}
+
+    def header(self, source_lang, target_langs):
+        return ""
+
+    def write(self, record, translations, errors, target_langs):
+        data = dict(record["raw"], translations=translations[0])
+        if errors[0]:
+            data["errors"] = errors[0]
+        return json.dumps(data, ensure_ascii=False) + "\n"
+
+    def footer(self):
+        return ""
+
+def _po_unquote(line: str) -> str:
+    text = line.strip()[1:-1]
+    return text.encode("latin-1", "backslashreplace").decode("unicode_escape") if "\\" in text else text
+
+def _po_quote(text: str) -> str:
+    escaped = text.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n").replace("\t", "\\t")
+    return f'"{escaped}"'
+
+class POFormat:
+    """gettext catalog; msgstr is filled in for a single target language"""
+
+    single_target = True
+
+    def read(self, path):
+        with open(path, "r", encoding="utf-8") as f:
+            entry = []
+            for line in f:
+                if line.strip():
+                    entry.append(line.rstrip("\r\n"))
+                elif entry:
+                    yield self._record(entry)
+                    entry = []
+            if entry:
+                yield self._record(entry)
+
+    def _record(self, lines):
+        fields, comments, current = {}, [], None
+        for line in lines:
+            if line.startswith("#"):
+                comments.append(line)
+            elif line.startswith('"') and current:
+                fields[current] += _po_unquote(line)
+            else:
+                current, _, value = line.partition(" ")
+                fields[current] = _po_unquote(value)
+        texts = [fields.get("msgid", "")]
+        if "msgid_plural" in fields:
+            texts.append(fields["msgid_plural"])
+        # The header entry (empty msgid) is copied as it is
+        return {"id": texts[0], "source_lang": None, "texts": texts if texts[0] else [],
+                "raw": {"comments": comments, "fields": fields, "lines": lines}}
+
+    def header(self, source_lang, target_langs):
+        return ""
+
+    def write(self, record, translations, errors, target_langs):
+        raw = record["raw"]
+        if not record["texts"]:
+            return "\n".join(raw["lines"]) + "\n\n"
+        target = target_langs[0]
+        fields = raw["fields"]
+        lines = list(raw["comments"])
+        for name in ("msgctxt", "msgid", "msgid_plural"):
+            if name in fields:
+                lines.append(f"{name} {_po_quote(fields[name])}")
+        translated = [result.get(target, "") for result in translations]
+        if "msgid_plural" in fields:
+            plural_forms = [name for name in fields if name.startswith("msgstr[")] or ["msgstr[0]", "msgstr[1]"]
+            for index, name in enumerate(plural_forms):
+                lines.append(f"{name} {_po_quote(translated[min(index, 1)])}")
+        else:
+            lines.append(f"msgstr {_po_quote(translated[0])}")
+        return "\n".join(lines) + "\n\n"
+
+    def footer(self):
+        return ""
+
+def _local_name(tag: str) -> str:
+    return tag.rsplit("}", 1)[-1]
+
+class XLIFFFormat:
+    """XLIFF 1.2 trans-units; the output is a new XLIFF document with <target> filled in"""
+
+    single_target = True
+
+    def read(self, path):
+        for _, element in ET.iterparse(path, events=("end",)):
+            if _local_name(element.tag) != "trans-unit":
+                continue
+            source = next((child for child in element if _local_name(child.tag) == "source"), None)
+            if source is not None:
+                # Inline markup is flattened to its text
+                text = "".join(source.itertext())
+                yield {"id": element.get("id", ""), "source_lang": None, "texts": [text], "raw": None}
+            element.clear()
+
+    def header(self, source_lang, target_langs):
+        return (
+            '<?xml version="1.0" encoding="UTF-8"?>\n'
+            '<xliff version="1.2" xmlns="urn:oasis:names:tc:xliff:document:1.2">\n'
+            f'  <file original="fluentai" datatype="plaintext" source-language="{source_lang}" '
+            f'target-language="{target_langs[0]}">\n'
+            '    <body>\n'
+        )
+
+    def write(self, record, translations, errors, target_langs):
+        target = translations[0].get(target_langs[0])
+        unit = (f'      <trans-unit id="{html.escape(str(record["id"]))}">\n'
+                f'        <source>{html.escape(record["texts"][0], quote=False)}</source>\n')
+        if target is not None:
+            unit += f'        <target state="translated">{html.escape(target, quote=False)}</target>\n'
+        return unit + '      </trans-unit>\n'
+
+    def footer(self):
+        return '    </body>\n  </file>\n</xliff>\n'
+
+FORMATS = {
+    "tsv": TSVFormat,
+    "jsonl": JSONLFormat,
+    "po": POFormat,
+    "xliff": XLIFFFormat,
+}
+
+EXTENSIONS = {".tsv": "tsv", ".txt": "tsv", ".jsonl": "jsonl", ".po": "po", ".xlf": "xliff", ".xliff": "xliff"}
+
+def detect_format(path: str) -> str:
+    name = EXTENSIONS.get(os.path.splitext(path)[1].lower())
+    if name is None:
+        raise ValueError(f"Unknown file format for {path}; expected one of {', '.join(sorted(EXTENSIONS))}")
+    return name
+
+class BulkJob:
+    """
+    Translate a file into one or more languages, streaming it in chunks.
+
+    Each chunk is deduplicated and worked through one model pair at a time,
+    so every model is loaded once per chunk, with at most parallelism
+    strings in flight. Output is appended as each chunk finishes and a
+    checkpoint is written next to it, so memory stays flat for any file size
+    and an interrupted job resumes after the last finished chunk.
+    """
+
+    def __init__(self, input_path: str, output_path: str, source_lang: str, target_langs,
+                 file_format: str = None, chunk_size: int = None, parallelism: int = None):
+        self.id = uuid.uuid4().hex[:12]
+        self.input_path = input_path
+        self.output_path = output_path
+        self.source_lang = source_lang
+        self.target_langs = list(target_langs)
+        self.format_name = file_format or detect_format(input_path)
+        self.format = FORMATS[self.format_name]()
+        if self.format.single_target and len(self.target_langs) != 1:
+            raise ValueError(f"{self.format_name.upper()} files can only be translated into one target language")
+        self.chunk_size = chunk_size or config.get("bulk_chunk_size", 2000)
+        self.parallelism = parallelism or config.get("bulk_parallelism", 64)
+        self.checkpoint_path = output_path + ".checkpoint"
+        self.state = "queued"
+        self.error = None
+        self.records = 0
+        self.strings = 0
+        self.unique_strings = 0
+        self.failed = 0
+        self.created_at = datetime.now().isoformat()
+        self.finished_at = None
+
+    def status(self) -> dict:
+        return {
+            "id": self.id,
+            "state": self.state,
+            "input": self.input_path,
+            "output": self.output_path,
+            "format": self.format_name,
+            "source_lang": self.source_lang,
+            "target_langs": self.target_langs,
+            "records": self.records,
+            "strings": self.strings,
+            "unique_strings": self.unique_strings,
+            "failed": self.failed,
+            "error": self.error,
+            "created_at": self.created_at,
+            "finished_at": self.finished_at,
+        }
+
+    def _load_checkpoint(self):
+        try:
+            with open(self.checkpoint_path, "r") as f:
+                checkpoint = json.load(f)
+        except FileNotFoundError:
+            return None
+        if (checkpoint.get("input") != os.path.abspath(self.input_path)
+                or checkpoint.get("target_langs") != self.target_langs):
+            logging.warning(f"Ignoring checkpoint {self.checkpoint_path}: it belongs to a different job")
+            return None
+        try:
+            output_bytes = os.path.getsize(self.output_path)
+        except OSError:
+            output_bytes = -1
+        if output_bytes < checkpoint.get("output_bytes", 0):
+            logging.warning(f"Ignoring checkpoint {self.checkpoint_path}: the output it describes is missing or cut short")
+            return None
+        return checkpoint
+
+    def _save_checkpoint(self, output_bytes: int):
+        checkpoint = {
+            "input": os.path.abspath(self.input_path),
+            "target_langs": self.target_langs,
+            "records": self.records,
+            "strings": self.strings,
+            "unique_strings": self.unique_strings,
+            "failed": self.failed,
+            "output_bytes": output_bytes,
+        }
+        tmp = self.checkpoint_path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(checkpoint, f)
+        os.replace(tmp, self.checkpoint_path)
+
+    async def run(self, resume: bool = True):
+        self.state = "running"
+        # Bulk work queues behind interactive requests
+        request_priority.set(BULK)
+        # Every line the job logs, down to the decoder batches, carries its ID
+        request_id.set(f"job-{self.id}")
+        try:
+            await self._run(resume)
+            self.state = "done"
+        except asyncio.CancelledError:
+            self.state = "cancelled"
+            raise
+        except Exception as e:
+            self.state = "failed"
+            self.error = str(e)
+            logging.error(f"Bulk job {self.id} failed: {str(e)}")
+            raise
+        finally:
+            self.finished_at = datetime.now().isoformat()
+
+    async def _run(self, resume: bool):
+        checkpoint = self._load_checkpoint() if resume else None
+        skip = 0
+        if checkpoint is not None:
+            skip = checkpoint["records"]
+            self.records, self.strings = checkpoint["records"], checkpoint["strings"]
+            self.unique_strings, self.failed = checkpoint["unique_strings"], checkpoint["failed"]
+            logging.info(f"Resuming bulk job {self.id} after {skip} records")
+
+        header = self.format.header(self.source_lang, self.target_langs)
+        mode = "r+b" if checkpoint is not None else "wb"
+        with open(self.output_path, mode) as out:
+            if checkpoint is not None:
+                # Drop anything written after the last checkpoint
+                out.truncate(checkpoint["output_bytes"])
+                out.seek(checkpoint["output_bytes"])
+            else:
+                out.write(header.encode("utf-8"))
+
+            chunk = []
+            for index, record in enumerate(self.format.read(self.input_path)):
+                if index < skip:
+                    continue
+                chunk.append(record)
+                if len(chunk) >= self.chunk_size:
+                    await self._process_chunk(chunk, out)
+                    chunk = []
+            if chunk:
+                await self._process_chunk(chunk, out)
+
+            out.write(self.format.footer().encode("utf-8"))
+        if os.path.exists(self.checkpoint_path):
+            os.remove(self.checkpoint_path)
+        logging.info(f"Bulk job {self.id} finished: {self.records} records, {self.failed} failed strings")
+
+    async def _process_chunk(self, chunk, out):
+        # Unique texts per source language
+        groups = defaultdict(dict)
+        for record in chunk:
+            source_lang = record["source_lang"] or self.source_lang
+            for text in record["texts"]:
+                self.strings += 1
+                if text.strip():
+                    groups[source_lang][text] = None
+        self.unique_strings += sum(len(texts) for texts in groups.values())
+
+        # One model pair at a time; pairs from the same source are adjacent, so
+        # a shared pivot leg is still in the result cache for the next target
+        results = {}
+        semaphore = asyncio.Semaphore(self.parallelism)
+        for source_lang in sorted(groups):
+            for target_lang in self.target_langs:
+                texts = list(groups[source_lang])
+                outputs = await asyncio.gather(
+                    *(self._translate(semaphore, source_lang, target_lang, text) for text in texts),
+                    return_exceptions=True,
+                )
+                for text, output in zip(texts, outputs):
+                    results[(source_lang, target_lang, text)] = output
+
+        for record in chunk:
+            source_lang = record["source_lang"] or self.source_lang
+            translations, errors = [], []
+            for text in record["texts"]:
+                translated, failed = {}, {}
+                for target_lang in self.target_langs:
+                    output = results.get((source_lang, target_lang, text), text)
+                    if isinstance(output, Exception):
+                        failed[target_lang] = str(output)
+                        self.failed += 1
+                    else:
+                        translated[target_lang] = output
+                translations.append(translated)
+                errors.append(failed)
+            if not record["texts"]:
+                translations, errors = [{}], [{}]
+            if record.get("error"):
+                errors = [{target_lang: record["error"] for target_lang in self.target_langs}]
+                self.failed += len(self.target_langs)
+            out.write(self.format.write(record, translations, errors, self.target_langs).encode("utf-8"))
+        self.records += len(chunk)
+
+        out.flush()
+        os.fsync(out.fileno())
+        self._save_checkpoint(out.tell())
+
+    async def _translate(self, semaphore, source_lang, target_lang, text):
+        async with semaphore:
+            for attempt in range(5):
+                try:
+                    return await translate_text(source_lang, target_lang, text)
+                except QueueFullError as e:
+                    # Interactive traffic has the decoders; back off and try again
+                    if attempt == 4:
+                        raise
+                    await asyncio.sleep(e.retry_after)
+
+class JobManager:
+    """Bulk jobs submitted over the API; a few run at a time, the rest wait in line"""
+
+    def __init__(self):
+        self.jobs = {}
+        self.tasks = {}
+        self.queue = AdmissionQueue(config.get("bulk_max_jobs", 1))
+
+    def submit(self, job: BulkJob) -> BulkJob:
+        async def run():
+            async with self.queue.slot():
+                await job.run()
+
+        self.jobs[job.id] = job
+        task = asyncio.create_task(run())
+        # Failures are recorded on the job itself
+        task.add_done_callback(lambda t: t.cancelled() or t.exception())
+        self.tasks[job.id] = task
+        return job
+
+    def cancel(self, job_id: str) -> bool:
+        task = self.tasks.get(job_id)
+        if task is None or task.done():
+            return False
+        task.cancel()
+        if self.jobs[job_id].state == "queued":
+            self.jobs[job_id].state = "cancelled"
+        return True
+
+    async def shutdown(self):
+        for task in self.tasks.values():
+            task.cancel()
+        await asyncio.gather(*self.tasks.values(), return_exceptions=True)
+
+job_manager = JobManager()
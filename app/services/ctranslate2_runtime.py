@@ -0,0 +1,162 @@
+# app/services/ctranslate2_runtime.py
+import asyncio
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from app.config import config
+from app.services.runtime import TranslationRuntime
+
+CONVERTED_DIR = "ctranslate2"
+
+# Replicas of one model start in parallel; only one of them converts it
+_conversion_locks = {}
+_conversion_locks_guard = threading.Lock()
+
+def _conversion_lock(path: str) -> threading.Lock:
+    with _conversion_locks_guard:
+        return _conversion_locks.setdefault(path, threading.Lock())
+
+class CTranslate2Runtime(TranslationRuntime):
+    """
+    Opus-MT model run in-process with CTranslate2.
+
+    The Marian checkpoint is converted once (int8 by default) into a
+    "ctranslate2" folder inside the model directory. Batches are tokenized
+    with the model's source.spm/target.spm and decoded on a worker thread;
+    CTranslate2 releases the GIL, so the event loop keeps serving requests.
+    """
+
+    backend = "ctranslate2"
+
+    def __init__(self, model_dir: str, cpu_threads: int = 1, artifacts: dict = None):
+        super().__init__(model_dir, cpu_threads, artifacts)
+        self.translator = None
+        self.source_spm = None
+        self.target_spm = None
+        self.compute_type = config.get("ctranslate2_compute_type", "int8")
+        self.beam_size = config.get("ctranslate2_beam_size", 4)
+        self._executor = None
+
+    @property
+    def running(self) -> bool:
+        return self.translator is not None
+
+    @property
+    def converted_dir(self) -> str:
+        return os.path.join(self.model_dir, CONVERTED_DIR)
+
+    async def start(self):
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"ct2-{self.model_key}")
+        try:
+            await asyncio.get_running_loop().run_in_executor(self._executor, self._load)
+        except Exception as e:
+            await self._shutdown()
+            logging.error(f"Failed to start CTranslate2 runtime for {self.model_key}: {str(e)}")
+            raise RuntimeError(f"Failed to start CTranslate2 runtime: {str(e)}")
+        self.loaded_at = datetime.now().isoformat()
+        self.started_at = time.monotonic()
+        self.state = "ready"
+        logging.info(f"CTranslate2 runtime started for {self.model_key} ({self.compute_type})")
+
+    def _load(self):
+        try:
+            import ctranslate2
+            import sentencepiece
+        except ImportError as e:
+            raise RuntimeError(f"The ctranslate2 backend needs the ctranslate2 and sentencepiece packages ({str(e)})")
+
+        artifacts = self._artifacts()
+        source_spm = artifacts["source_spm"]
+        target_spm = artifacts["target_spm"]
+        if not source_spm or not target_spm:
+            raise FileNotFoundError(f"source.spm and target.spm not found in {self.model_dir}")
+
+        with _conversion_lock(self.converted_dir):
+            if not os.path.exists(os.path.join(self.converted_dir, "model.bin")):
+                self._convert(ctranslate2)
+
+        self.translator = ctranslate2.Translator(
+            self.converted_dir,
+            device="cpu",
+            compute_type=self.compute_type,
+            inter_threads=1,
+            intra_threads=self.cpu_threads,
+        )
+        self.source_spm = sentencepiece.SentencePieceProcessor(model_file=source_spm)
+        self.target_spm = sentencepiece.SentencePieceProcessor(model_file=target_spm)
+
+    def _convert(self, ctranslate2):
+        """
+        Convert the Marian checkpoint into a scratch folder and rename it into
+        place, so other workers never load a half-written model
+        """
+        logging.info(f"Converting {self.model_key} to CTranslate2 ({self.compute_type})")
+        scratch = tempfile.mkdtemp(prefix=f".{CONVERTED_DIR}-", dir=self.model_dir)
+        try:
+            converter = ctranslate2.converters.OpusMTConverter(self.model_dir)
+            converter.convert(scratch, quantization=self.compute_type, force=True)
+            if os.path.exists(os.path.join(self.converted_dir, "model.bin")):
+                # Another worker finished converting meanwhile
+                return
+            if os.path.isdir(self.converted_dir):
+                # Left over from a conversion that was interrupted
+                shutil.rmtree(self.converted_dir)
+            try:
+                os.rename(scratch, self.converted_dir)
+            except OSError:
+                # Another worker renamed its conversion into place first
+                if not os.path.exists(os.path.join(self.converted_dir, "model.bin")):
+                    raise
+        finally:
+            shutil.rmtree(scratch, ignore_errors=True)
+
+    def _translate_sync(self, texts):
+        tokens = [self.source_spm.encode(text, out_type=str) for text in texts]
+        results = self.translator.translate_batch(
+            tokens,
+            max_batch_size=self.max_batch_size,
+            beam_size=self.beam_size,
+        )
+        return [self.target_spm.decode(result.hypotheses[0]) for result in results]
+
+    async def _decode(self, texts):
+        if not self.running:
+            await self._ensure_running()
+        if config.get("log_texts", False) and logging.root.isEnabledFor(logging.DEBUG):
+            for text in texts:
+                logging.debug(f"Translation input for {self.model_key}: '{text}'")
+        try:
+            results = await asyncio.get_running_loop().run_in_executor(
+                self._executor, self._translate_sync, texts
+            )
+        except Exception as e:
+            logging.error(f"Translation error for {self.model_key}: {str(e)}")
+            raise RuntimeError(f"Translation error: {str(e)}")
+        if config.get("log_texts", False) and logging.root.isEnabledFor(logging.DEBUG):
+            for result in results:
+                logging.debug(f"Translation output for {self.model_key}: '{result}'")
+        return results
+
+    def memory_bytes(self) -> int:
+        """Size of the converted weights; the model lives in this process, so RSS can't be split per model"""
+        if not self.running:
+            return 0
+        try:
+            return os.path.getsize(os.path.join(self.converted_dir, "model.bin"))
+        except OSError:
+            return 0
+
+    async def _shutdown(self):
+        self.translator = None
+        self.source_spm = None
+        self.target_spm = None
+        if self._executor is not None:
+            # A batch still running finishes on its own; nobody is waiting for it
+            self._executor.shutdown(wait=False)
+            self._executor = None
+        logging.info(f"CTranslate2 runtime stopped for {self.model_key}")
@@ -0,0 +1,95 @@
+# app/services/eviction.py
+import logging
+from collections import Counter
+
+def process_rss(pid) -> int:
+    """Resident memory of a process in bytes, or 0 where /proc isn't available"""
+    try:
+        with open(f"/proc/{pid}/status", "r") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    return 0
+
+class EvictionPolicy:
+    """Chooses which loaded model to stop when the cache is over budget"""
+
+    def __init__(self):
+        self.frequency = Counter()  # key -> requests while loaded
+        self.load_seconds = {}  # key -> how long the last load took
+
+    def record_hit(self, key: str):
+        self.frequency[key] += 1
+
+    def record_load(self, key: str, seconds: float):
+        self.load_seconds[key] = seconds
+
+    def record_eviction(self, key: str):
+        self.frequency.pop(key, None)
+
+    def choose_victim(self, candidates):
+        """
+        Pick a key from candidates, an ordered {key: runtime} mapping from
+        least to most recently used. Returns None if there is nothing to evict.
+        """
+        raise NotImplementedError
+
+class LRUPolicy(EvictionPolicy):
+    """Evict the least recently used model"""
+
+    def choose_victim(self, candidates):
+        return next(iter(candidates), None)
+
+class LFUPolicy(EvictionPolicy):
+    """Evict the least frequently used model; ties go to the least recent"""
+
+    def choose_victim(self, candidates):
+        return min(candidates, key=lambda key: self.frequency[key], default=None)
+
+class GDSFPolicy(EvictionPolicy):
+    """
+    Greedy-Dual-Size-Frequency: keep models that are used often, slow to load
+    and small. Priority is clock + frequency * reload cost / memory size, and
+    the clock rises to each victim's priority so idle models age out.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.clock = 0.0
+        self.priority = {}
+
+    def record_hit(self, key: str):
+        super().record_hit(key)
+        self.priority.pop(key, None)  # recomputed with the current clock
+
+    def record_eviction(self, key: str):
+        super().record_eviction(key)
+        self.priority.pop(key, None)
+
+    def _priority(self, key: str, runtime) -> float:
+        if key not in self.priority:
+            size_mb = max(runtime.memory_bytes(), 1) / (1024 * 1024)
+            cost = self.load_seconds.get(key, 1.0)
+            self.priority[key] = self.clock + max(self.frequency[key], 1) * cost / size_mb
+        return self.priority[key]
+
+    def choose_victim(self, candidates):
+        victim = min(candidates, key=lambda key: self._priority(key, candidates[key]), default=None)
+        if victim is not None:
+            self.clock = self._priority(victim, candidates[victim])
+        return victim
+
+POLICIES = {
+    "lru": LRUPolicy,
+    "lfu": LFUPolicy,
+    "gdsf": GDSFPolicy,
+}
+
+def create_policy(name: str) -> EvictionPolicy:
+    policy = POLICIES.get(name.lower())
+    if policy is None:
+        logging.warning(f"Unknown eviction policy '{name}', using gdsf")
+        policy = GDSFPolicy
+    return policy()
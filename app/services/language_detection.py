@@ -0,0 +1,286 @@
+# app/services/language_detection.py
+import math
+import unicodedata
+from bisect import bisect_right
+from collections import Counter
+from functools import lru_cache
+from app.config import config
+
+# source_lang value that asks for detection
+AUTO = "auto"
+
+# Only the start of a long text is looked at; a few hundred characters decide
+# the language as well as the whole document would
+MAX_CHARS = 400
+# Probability given to an n-gram missing from a language's profile. A fixed
+# floor rather than additive smoothing, so languages with more sample text
+# don't win by default
+LOG_UNSEEN = math.log(1e-4)
+
+# Scripts used by exactly one supported language settle the question alone
+SCRIPT_LANGUAGES = {
+    "hangul": "ko", "kana": "jap", "han": "zh", "thai": "th", "greek": "el", "hebrew": "he",
+    "devanagari": "hi", "bengali": "bn", "tamil": "ta", "telugu": "te", "malayalam": "ml",
+    "ethiopic": "am",
+}
+
+# (first code point, script) ranges, sorted; code points between ranges have no script
+_SCRIPT_RANGES = [
+    (0x0041, "latin"), (0x005B, None), (0x0061, "latin"), (0x007B, None), (0x00C0, "latin"),
+    (0x0250, None), (0x0370, "greek"), (0x0400, "cyrillic"), (0x0530, None), (0x0590, "hebrew"),
+    (0x0600, "arabic"), (0x0700, None), (0x0750, "arabic"), (0x0780, None), (0x0900, "devanagari"),
+    (0x0980, "bengali"), (0x0A00, None), (0x0B80, "tamil"), (0x0C00, "telugu"), (0x0C80, None),
+    (0x0D00, "malayalam"), (0x0D80, None), (0x0E00, "thai"), (0x0E80, None), (0x1100, "hangul"),
+    (0x1200, "ethiopic"), (0x13A0, None), (0x1E00, "latin"), (0x1F00, "greek"), (0x2000, None),
+    (0x3040, "kana"), (0x3100, None), (0x3400, "han"), (0x4DC0, None), (0x4E00, "han"),
+    (0xA000, None), (0xAC00, "hangul"), (0xD7B0, None), (0xF900, "han"), (0xFB00, None),
+    (0xFB50, "arabic"), (0xFE00, None), (0xFE70, "arabic"), (0xFF00, None),
+]
+_SCRIPT_STARTS = [start for start, _ in _SCRIPT_RANGES]
+
+# A few sentences per language (the first article of the Universal Declaration
+# of Human Rights and two everyday questions), enough for n-gram profiles
+# that tell apart languages sharing a script
+SAMPLES = {
+    "en": "All human beings are born free and equal in dignity and rights. They are endowed with reason and conscience and should act towards one another in a spirit of brotherhood. Where is the nearest station? I would like to know what you think about this.",
+    "es": "Todos los seres humanos nacen libres e iguales en dignidad y derechos y, dotados como están de razón y conciencia, deben comportarse fraternalmente los unos con los otros. ¿Dónde está la estación más cercana? Me gustaría saber qué piensas de esto.",
+    "fr": "Tous les êtres humains naissent libres et égaux en dignité et en droits. Ils sont doués de raison et de conscience et doivent agir les uns envers les autres dans un esprit de fraternité. Où est la gare la plus proche ? Je voudrais savoir ce que vous en pensez.",
+    "pt": "Todos os seres humanos nascem livres e iguais em dignidade e em direitos. Dotados de razão e de consciência, devem agir uns para com os outros em espírito de fraternidade. Onde fica a estação mais próxima? Eu gostaria de saber o que você acha disso.",
+    "it": "Tutti gli esseri umani nascono liberi ed eguali in dignità e diritti. Essi sono dotati di ragione e di coscienza e devono agire gli uni verso gli altri in spirito di fratellanza. Dov'è la stazione più vicina? Vorrei sapere che cosa ne pensi.",
+    "de": "Alle Menschen sind frei und gleich an Würde und Rechten geboren. Sie sind mit Vernunft und Gewissen begabt und sollen einander im Geist der Brüderlichkeit begegnen. Wo ist der nächste Bahnhof? Ich möchte wissen, was du darüber denkst.",
+    "nl": "Alle mensen worden vrij en gelijk in waardigheid en rechten geboren. Zij zijn begiftigd met verstand en geweten, en behoren zich jegens elkander in een geest van broederschap te gedragen. Waar is het dichtstbijzijnde station? Ik wil graag weten wat je ervan vindt.",
+    "pl": "Wszyscy ludzie rodzą się wolni i równi pod względem swej godności i swych praw. Są oni obdarzeni rozumem i sumieniem i powinni postępować wobec innych w duchu braterstwa. Gdzie jest najbliższa stacja? Chciałbym wiedzieć, co o tym myślisz.",
+    "tr": "Bütün insanlar hür, haysiyet ve haklar bakımından eşit doğarlar. Akıl ve vicdana sahiptirler ve birbirlerine karşı kardeşlik zihniyeti ile hareket etmelidirler. En yakın istasyon nerede? Bu konuda ne düşündüğünü bilmek istiyorum.",
+    "cs": "Všichni lidé rodí se svobodní a sobě rovní co do důstojnosti a práv. Jsou nadáni rozumem a svědomím a mají spolu jednat v duchu bratrství. Kde je nejbližší nádraží? Chtěl bych vědět, co si o tom myslíš.",
+    "sk": "Všetci ľudia sa rodia slobodní a sebe rovní, čo sa týka ich dôstojnosti a práv. Sú obdarení rozumom a svedomím a majú spolu jednať v bratskom duchu. Kde je najbližšia stanica? Chcel by som vedieť, čo si o tom myslíš.",
+    "sv": "Alla människor är födda fria och lika i värde och rättigheter. De har utrustats med förnuft och samvete och bör handla gentemot varandra i en anda av broderskap. Var ligger närmaste station? Jag skulle vilja veta vad du tycker om det.",
+    "da": "Alle mennesker er født frie og lige i værdighed og rettigheder. De er udstyret med fornuft og samvittighed, og de bør handle mod hverandre i en broderskabets ånd. Hvor er den nærmeste station? Jeg vil gerne vide, hvad du synes om det.",
+    "no": "Alle mennesker er født frie og med samme menneskeverd og menneskerettigheter. De er utstyrt med fornuft og samvittighet og bør handle mot hverandre i brorskapets ånd. Hvor er nærmeste stasjon? Jeg vil gjerne vite hva du synes om det.",
+    "fi": "Kaikki ihmiset syntyvät vapaina ja tasavertaisina arvoltaan ja oikeuksiltaan. Heille on annettu järki ja omatunto, ja heidän on toimittava toisiaan kohtaan veljeyden hengessä. Missä on lähin asema? Haluaisin tietää, mitä mieltä olet siitä.",
+    "hu": "Minden emberi lény szabadon születik és egyenlő méltósága és joga van. Az emberek, ésszel és lelkiismerettel bírván, egymással szemben testvéri szellemben kell hogy viseltessenek. Hol van a legközelebbi állomás? Szeretném tudni, mit gondolsz erről.",
+    "et": "Kõik inimesed sünnivad vabadena ja võrdsetena oma väärikuselt ja õigustelt. Neile on antud mõistus ja südametunnistus ja nende suhtumist üksteisesse peab kandma vendluse vaim. Kus on lähim jaam? Ma tahaksin teada, mida sa sellest arvad.",
+    "lv": "Visi cilvēki piedzimst brīvi un vienlīdzīgi savā pašcieņā un tiesībās. Viņi ir apveltīti ar saprātu un sirdsapziņu, un viņiem jāizturas citam pret citu brālības garā. Kur ir tuvākā stacija? Es gribētu zināt, ko tu par to domā.",
+    "lt": "Visi žmonės gimsta laisvi ir lygūs savo orumu ir teisėmis. Jiems suteiktas protas ir sąžinė ir jie turi elgtis vienas kito atžvilgiu kaip broliai. Kur yra artimiausia stotis? Norėčiau žinoti, ką tu apie tai manai.",
+    "sl": "Vsi ljudje se rodijo svobodni in imajo enako dostojanstvo in enake pravice. Obdarjeni so z razumom in vestjo in bi morali ravnati drug z drugim kakor bratje. Kje je najbližja postaja? Rad bi vedel, kaj misliš o tem.",
+    "hr": "Sva ljudska bića rađaju se slobodna i jednaka u dostojanstvu i pravima. Ona su obdarena razumom i sviješću pa jedna prema drugima trebaju postupati u duhu bratstva. Gdje je najbliža stanica? Želio bih znati što misliš o tome.",
+    "ro": "Toate ființele umane se nasc libere și egale în demnitate și în drepturi. Ele sunt înzestrate cu rațiune și conștiință și trebuie să se comporte unele față de altele în spiritul fraternității. Unde este cea mai apropiată gară? Aș vrea să știu ce crezi despre asta.",
+    "ca": "Tots els éssers humans neixen lliures i iguals en dignitat i en drets. Són dotats de raó i de consciència, i han de comportar-se fraternalment els uns amb els altres. On és l'estació més propera? M'agradaria saber què en penses.",
+    "gl": "Todos os seres humanos nacen libres e iguais en dignidade e dereitos e, dotados como están de razón e conciencia, débense comportar fraternalmente uns cos outros. Onde está a estación máis próxima? Gustaríame saber que pensas disto.",
+    "eu": "Gizon-emakume guztiak aske jaiotzen dira, duintasun eta eskubide berberak dituztela; eta ezaguera eta kontzientzia dutenez gero, elkarren artean senide legez jokatu beharra dute. Non dago geltokirik hurbilena? Jakin nahi nuke zer iruditzen zaizun.",
+    "is": "Hver maður er borinn frjáls og jafn öðrum að virðingu og réttindum. Menn eru gæddir vitsmunum og samvisku, og ber þeim að breyta bróðurlega hverjum við annan. Hvar er næsta stöð? Mig langar að vita hvað þér finnst um það.",
+    "mt": "Il-bnedmin kollha jitwieldu ħielsa u ugwali fid-dinjità u d-drittijiet. Huma mogħnija bir-raġuni u bil-kuxjenza u għandhom iġibu ruħhom ma' xulxin bi spirtu ta' aħwa. Fejn hu l-eqreb stazzjon? Nixtieq inkun naf x'taħseb dwar dan.",
+    "cy": "Genir pawb yn rhydd ac yn gydradd â'i gilydd mewn urddas a hawliau. Fe'u cynysgaeddir â rheswm a chydwybod, a dylai pawb ymddwyn y naill at y llall mewn ysbryd cymodlon. Ble mae'r orsaf agosaf? Hoffwn i wybod beth rwyt ti'n feddwl am hyn.",
+    "ga": "Saolaítear na daoine uile saor agus comhionann ina ndínit agus ina gcearta. Tá bua an réasúin agus an choinsiasa acu agus ba cheart dóibh gníomhú i dtreo a chéile i spiorad an bhráithreachais. Cá bhfuil an stáisiún is gaire? Ba mhaith liom a fháil amach cad a cheapann tú faoi.",
+    "id": "Semua orang dilahirkan merdeka dan mempunyai martabat dan hak-hak yang sama. Mereka dikaruniai akal dan hati nurani dan hendaknya bergaul satu sama lain dalam semangat persaudaraan. Di mana stasiun terdekat? Saya ingin tahu apa pendapatmu tentang hal ini.",
+    "ms": "Semua manusia dilahirkan bebas dan samarata dari segi kemuliaan dan hak-hak. Mereka mempunyai pemikiran dan perasaan hati dan hendaklah bertindak di antara satu sama lain dengan semangat persaudaraan. Di manakah stesen yang paling dekat? Saya ingin tahu apa pendapat awak tentang perkara ini.",
+    "vi": "Tất cả mọi người sinh ra đều được tự do và bình đẳng về nhân phẩm và quyền lợi. Mọi con người đều được tạo hóa ban cho lý trí và lương tâm và cần phải đối xử với nhau trong tình bằng hữu. Nhà ga gần nhất ở đâu? Tôi muốn biết bạn nghĩ gì về điều này.",
+    "sw": "Watu wote wamezaliwa huru, hadhi na haki zao ni sawa. Wote wamejaliwa akili na dhamiri, hivyo yapasa watendeane kindugu. Kituo cha karibu kiko wapi? Ningependa kujua unafikiri nini kuhusu jambo hili.",
+    "ru": "Все люди рождаются свободными и равными в своем достоинстве и правах. Они наделены разумом и совестью и должны поступать в отношении друг друга в духе братства. Где находится ближайшая станция? Я хотел бы знать, что ты об этом думаешь.",
+    "uk": "Всі люди народжуються вільними і рівними у своїй гідності та правах. Вони наділені розумом і совістю і повинні діяти у відношенні один до одного в дусі братерства. Де найближча станція? Я хотів би знати, що ти про це думаєш.",
+    "bg": "Всички хора се раждат свободни и равни по достойнство и права. Те са надарени с разум и съвест и следва да се отнасят помежду си в дух на братство. Къде е най-близката гара? Бих искал да знам какво мислиш за това.",
+    "sr": "Сва људска бића рађају се слободна и једнака у достојанству и правима. Она су обдарена разумом и свешћу и треба једни према другима да поступају у духу братства. Где је најближа станица? Желео бих да знам шта мислиш о томе.",
+    "ar": "يولد جميع الناس أحرارًا متساوين في الكرامة والحقوق. وقد وهبوا عقلاً وضميرًا وعليهم أن يعامل بعضهم بعضًا بروح الإخاء. أين أقرب محطة؟ أود أن أعرف ما رأيك في هذا.",
+    "fa": "تمام افراد بشر آزاد به دنیا می‌آیند و از لحاظ حیثیت و حقوق با هم برابرند. همه دارای عقل و وجدان می‌باشند و باید نسبت به یکدیگر با روح برادری رفتار کنند. نزدیک‌ترین ایستگاه کجاست؟ می‌خواهم بدانم نظر شما درباره این چیست.",
+    "ur": "تمام انسان آزاد اور حقوق و عزت کے اعتبار سے برابر پیدا ہوئے ہیں۔ انہیں ضمیر اور عقل ودیعت ہوئی ہے۔ اس لیے انہیں ایک دوسرے کے ساتھ بھائی چارے کا سلوک کرنا چاہیے۔ سب سے قریبی اسٹیشن کہاں ہے؟ میں جاننا چاہتا ہوں کہ آپ اس بارے میں کیا سوچتے ہیں۔",
+    "ps": "ټول انسانان آزاد نړۍ ته راځي او د حيثيت او حقونو له پلوه سره برابر دي. ټول د عقل او وجدان خاوندان دي او يو له بل سره بايد د ورورولۍ په روحيه چلند وکړي. تر ټولو نږدې تمځای چیرته دی؟ زه غواړم پوه شم چې تاسو د دې په اړه څه فکر کوئ.",
+}
+
+# Frequent everyday words per language, mixed into the profiles so short
+# inputs (greetings, questions, UI strings) are recognised as well
+COMMON_WORDS = {
+    "en": "the of and to a in is it you that he was for on are with as I his they be at one have this from or had by hot but some what there we can out other were all your when up use word how said an each she which do their time if will way about many then them would write like so these her long make thing see him two has look more day could go come did my sound no most number who over know water than call first people may down side been now find any new work part take get place made live where after back little only round man year came show every good me give our under name very through just form much great think say help low line before turn cause same mean differ move right boy old too does tell sentence set three want air well also play small end put home read hand port large spell add even land here must big high such follow act why ask men change went light kind off need house picture try us again animal point mother world near build self earth father hello please thank thanks yes today tomorrow yesterday weather morning evening night friend how are you doing fine",
+    "es": "de la que el en y a los se del las un por con no una su para es al lo como más o pero sus le ha me si sin sobre este ya entre cuando todo esta ser son dos también fue había era muy años hasta desde está mi porque qué sólo han yo hay vez puede todos así nos ni parte tiene él uno donde bien tiempo mismo ese ahora cada e vida otro después te otros aunque esa eso hace otra gobierno tan durante siempre día tanto ella tres sí dijo sido gran país según menos mundo año antes estado hola buenos días gracias por favor cómo estás quiero tengo hoy mañana ayer noche tiempo bueno usted necesito ayuda dónde cuánto cuesta envíe factura",
+    "fr": "de la le et les des en un du une que est pour qui dans a par plus pas au sur ne se ce il sont avec ou son mais comme on tout nous sa aussi leur bien y ces elle deux ont été fait ses faire entre sans même autre peut dont après cette très ils fois non tous avant je vous être encore où peu été moins leurs depuis donc quand jamais toujours ici bonjour merci beaucoup comment allez vous ça va oui aujourd'hui demain hier soir temps beau veux voudrais suis avez besoin aide combien coûte envoyer facture vendredi",
+    "pt": "de a o que e do da em um para é com não uma os no se na por mais as dos como mas foi ao ele das tem à seu sua ou ser quando muito há nos já está eu também só pelo pela até isso ela entre era depois sem mesmo aos ter seus quem nas me esse eles estão você tinha foram essa num nem suas meu às minha têm numa pelos elas havia seja qual será nós tenho lhe deles essas esses pelas este fosse dele olá bom dia obrigado obrigada por favor tudo bem como vai hoje amanhã ontem noite tempo quero preciso ajuda onde quanto custa fatura",
+    "it": "di e il la che in a per un è non una sono del da si le con i al dei ma come più anche della lo ha gli nel se questo alla o ci mi tutto ne suo quando molto delle cosa sua nella io era così fare ho essere perché solo ancora dove già due tra chi loro dopo stato prima fatto hanno tutti quello bene sempre può oggi domani ieri sera tempo ciao buongiorno grazie prego come stai sto voglio vorrei ho bisogno aiuto quanto costa fattura favore",
+    "de": "der die und in den von zu das mit sich des auf für ist im dem nicht ein eine als auch es an werden aus er hat dass sie nach wird bei einer um am sind noch wie einem über einen so zum war haben nur oder aber vor zur bis mehr durch man sein wurde sei hier wir ich du mir dir mich dich ihr uns euch was wer wo warum heute morgen gestern abend hallo guten tag danke bitte geht es gut wie viel kostet schicken rechnung freitag brauche hilfe möchte will kann",
+    "nl": "de en van het een in is dat op te zijn met voor niet die aan er om als ook bij maar uit door nog naar wordt of dan over tot al kan hebben meer heeft worden deze wel was zo geen andere hij ik je jij we wij ze zij u mij me hem haar ons hun wat waar wie hoe waarom vandaag morgen gisteren avond hallo goedemorgen dank bedankt alstublieft alsjeblieft gaat het goed met hoeveel kost stuur sturen factuur vrijdag nodig hulp wil graag",
+    "pl": "i w nie na się z do to że jest o jak co ale po tak za od jego go już tym czy tylko są mi ich przez był może jej było by jednak także lub dla który która które bardzo jestem jesteś ja ty my wy oni ona on mnie ciebie nas was tu tam gdzie kiedy dlaczego dzisiaj jutro wczoraj wieczorem cześć dzień dobry dziękuję proszę jak się masz dobrze ile kosztuje wyślij fakturę piątek potrzebuję pomocy chcę",
+    "tr": "bir ve bu da de için ile çok ne o ben sen biz siz onlar var yok daha gibi kadar sonra ama değil mi mı mu mü şey her ya olarak olan oldu olduğu en bana sana ona bize size nasıl nerede neden ne zaman bugün yarın dün akşam merhaba günaydın teşekkür ederim lütfen nasılsın iyiyim kaç para fatura gönderin cuma yardım istiyorum lazım",
+    "cs": "a se na je v že to s z do o jsem by jako ale i k jak po tak za pro jsou od ve byl jeho už jen co ne mi při které který která bylo být než aby já ty my vy on ona oni mě tě nás vás kde kdy proč dnes zítra včera večer ahoj dobrý den děkuji prosím jak se máš mám dobře kolik stojí pošlete fakturu pátek potřebuji pomoc chci",
+    "sk": "a sa na je v že to s z do o som by ako ale i k ako po tak za pre sú od vo bol jeho už len čo nie mi pri ktoré ktorý ktorá bolo byť než aby ja ty my vy on ona oni ma ťa nás vás kde kedy prečo dnes zajtra včera večer ahoj dobrý deň ďakujem prosím ako sa máš mám dobre koľko stojí pošlite faktúru piatok potrebujem pomoc chcem",
+    "sv": "och i att det som en på är av för med till den har de inte om ett han men var jag sig från vi så kan man när år säga hon under också efter eller nu sin där vid mot ska skulle kommer ut får finns vara hade alla andra mycket än här då sedan över bara in blir upp även vad du dig mig oss er hur varför idag imorgon igår kväll hej god morgon tack snälla mår bra vill behöver hjälp kostar skicka faktura fredag",
+    "da": "og i at det en til er som på de med han af for ikke der var mig sig men et har om vi min havde hun nu over da fra du ud sin dem os op man hans hvor eller hvad skal selv her alle vil blev kunne ind når være dog noget ville jo deres efter ned skulle denne end dette mit også under have dig hvorfor hvordan i dag i morgen i går aften hej godmorgen tak venligst har du det godt hvor meget koster send faktura fredag brug for hjælp",
+    "no": "og i det på som er en til å han av for ikke med jeg at var de har om et men så seg hun hadde fra vi du kan da ble ut skal vil etter når inn opp meg deg oss dere hva hvor hvorfor hvordan ikke noe også bare nå her der mye alle blir være gjøre i dag i morgen i går kveld hei god morgen takk vær så snill har du det bra hvor mye koster send faktura fredag trenger hjelp ønsker",
+    "fi": "ja on ei se että hän oli ovat mutta kuin tai niin myös jos kun vain sen ole olla ne nyt jo minä sinä me te he mitä missä miksi milloin miten kuinka paljon tänään huomenna eilen illalla hei huomenta kiitos ole hyvä mitä kuuluu hyvää maksaa lähetä lasku perjantai tarvitsen apua haluan voitko voin",
+    "hu": "a az és hogy nem is egy ez de van meg már csak el ki mint fel még volt azt vagy kell lesz mi te én ő mi ti ők nekem neked engem téged hol mikor miért hogyan mennyi ma holnap tegnap este szia jó napot köszönöm kérem hogy vagy jól mennyibe kerül küldje számlát pénteken segítség szeretnék kérek",
+    "et": "ja on ei et see oli ka kui aga nii mis või ta ma sa me te nad mul sul tema seda siis kes kus miks millal kuidas palju täna homme eile õhtul tere hommikust aitäh palun kuidas läheb hästi maksab saatke arve reedel vajan abi tahan soovin",
+    "lv": "un ir ka par no uz ar kā arī bet tas tā es tu mēs jūs viņš viņa viņi man tev mums jums kur kad kāpēc kā cik šodien rīt vakar vakarā sveiki labdien paldies lūdzu kā jums klājas labi cik maksā nosūtiet rēķinu piektdien vajag palīdzība gribu vēlos",
+    "lt": "ir yra kad su į iš ne o bet tai kaip jis ji jie aš tu mes jūs man tau mums jums kur kada kodėl kiek šiandien rytoj vakar vakare labas laba diena ačiū prašau kaip sekasi gerai kiek kainuoja atsiųskite sąskaitą penktadienį reikia pagalbos noriu",
+    "sl": "in je v da se na za ki so z pa ne s tudi bi kot ali to sem si smo ste jaz ti mi vi on ona oni meni tebi nam vam kje kdaj zakaj kako koliko danes jutri včeraj zvečer živjo dober dan hvala prosim kako si dobro koliko stane pošljite račun petek potrebujem pomoč želim",
+    "hr": "i je u da se na za su s od ne a koji što kao iz ali to bi sam si smo ste ja ti mi vi on ona oni meni tebi nama vama gdje kada zašto kako koliko danas sutra jučer navečer bok dobar dan hvala molim kako si dobro koliko košta pošaljite račun petak trebam pomoć želim",
+    "ro": "și de în a la cu să pe că nu o un este din care pentru ce mai sunt se au fost dar sau ca eu tu noi voi el ea ei mie ție nouă vouă unde când de ce cum cât astăzi mâine ieri seara bună ziua mulțumesc vă rog ce faci bine cât costă trimiteți factura vineri am nevoie de ajutor vreau",
+    "ca": "de la i el que a en les els un per amb no una es del al com però més va ha seu són també jo tu nosaltres vosaltres ell ella ells on quan per què com quant avui demà ahir vespre hola bon dia gràcies si us plau com estàs bé quant costa envieu la factura divendres necessito ajuda vull",
+    "gl": "de a o que e do da en un para é con non unha os no se na por máis as dos como pero foi ao el das ten súa ou ser cando moi hai xa está eu tamén só ata iso ela entre era despois sen mesmo nós vós eles onde cando por que canto hoxe mañá onte noite ola bos días grazas por favor como estás ben canto custa envíe a factura venres necesito axuda quero",
+    "eu": "eta da ez du bat ere dira zen dut dugu duzu baina hau hori hura ni zu gu zuek haiek nik zuk guk non noiz zergatik nola zenbat gaur bihar atzo gauean kaixo egun on eskerrik asko mesedez zer moduz ondo zenbat balio du bidali faktura ostiralean laguntza behar dut nahi dut",
+    "is": "og að í á er sem til það var ekki með hann við um en af ég þú við þið hann hún þeir mér þér okkur hvar hvenær hvers vegna hvernig hversu í dag á morgun í gær í kvöld halló góðan daginn takk fyrir vinsamlegast hvað segirðu gott hvað kostar sendu reikning föstudag þarf hjálp vil",
+    "mt": "il u li ta fil tal minn għal ma jew biex dan din huwa hija jien int aħna intom huma lili lilek fejn meta għaliex kif kemm illum għada lbieraħ filgħaxija bonġu grazzi jekk jogħġbok kif int tajjeb kemm jiswa ibgħat il-fattura nhar il-ġimgħa għandi bżonn għajnuna rrid",
+    "cy": "a y yr o i yn ar ac mae ei am gyda wedi ond fel neu hyn hynny fi ti ni chi nhw fe hi ble pryd pam sut faint heddiw yfory ddoe heno helo bore da diolch os gwelwch yn dda sut wyt ti da iawn faint mae'n gostio anfonwch anfoneb dydd gwener angen help eisiau",
+    "ga": "agus an na is a ar le i ní go bhí sé sí siad mé tú muid sibh dom duit dúinn cá háit cathain cén fáth conas cé mhéad inniu amárach inné anocht dia duit maidin mhaith go raibh maith agat le do thoil conas atá tú go maith cé mhéad a chosnaíonn seol an sonrasc dé haoine teastaíonn cabhair uaim ba mhaith liom",
+    "id": "yang dan di itu dengan untuk tidak ini dari dalam akan pada juga saya kamu kami kita mereka dia ada adalah atau sudah bisa karena oleh seperti lebih apa di mana kapan mengapa bagaimana berapa hari ini besok kemarin malam halo selamat pagi terima kasih tolong apa kabar baik berapa harganya kirimkan faktur hari jumat butuh bantuan mau ingin",
+    "ms": "yang dan di itu dengan untuk tidak ini dari dalam akan pada juga saya awak kami kita mereka dia ada adalah atau sudah boleh kerana oleh seperti lebih apa di mana bila mengapa bagaimana berapa hari ini esok semalam malam helo selamat pagi terima kasih tolong apa khabar baik berapa harganya hantarkan invois hari jumaat perlukan bantuan mahu ingin",
+    "vi": "và của là có không những được trong cho người này với một các đã tôi bạn chúng anh chị em họ nó ở đâu khi nào tại sao như thế nào bao nhiêu hôm nay ngày mai hôm qua tối xin chào cảm ơn làm ơn bạn có khỏe không khỏe giá gửi hóa đơn thứ sáu cần giúp đỡ muốn",
+    "sw": "na ya wa kwa ni la za katika hii huo kuwa si mimi wewe sisi ninyi yeye wao wapi lini kwa nini vipi ngapi leo kesho jana usiku habari hujambo asante tafadhali nzuri bei gani tuma ankara ijumaa nahitaji msaada nataka",
+    "ru": "и в не на я что он с как а то все она так его но да ты к у же вы за бы по только ее мне было вот от меня еще нет о из ему теперь когда даже ну вдруг ли если уже или ни быть был него до вас нибудь опять уж вам ведь там потом себя ничего ей может они тут где есть надо ней для мы тебя их чем была сам чтоб без будто чего раз тоже себе под будет ж тогда кто этот того потому этого какой совсем ним здесь этом один почти мой тем чтобы нее сейчас были куда зачем всех никогда можно при наконец два об другой хоть после над больше тот через эти нас про всего них какая много разве три эту моя впрочем хорошо свою этой перед иногда лучше чуть том нельзя такой им более всегда конечно всю между привет здравствуйте спасибо пожалуйста как дела сегодня завтра вчера вечером сколько стоит отправьте счет пятницу нужна помощь хочу",
+    "uk": "і в не на я що він з як а то все вона так його але так ти до у вже ви за б по тільки її мені було ось від мене ще ні про з йому тепер коли навіть чи якщо або бути був нього вас знову вам адже там потім себе нічого їй може вони тут де є треба ній для ми тебе їх чим була сам без чого раз теж собі під буде тоді хто цей того тому цього який зовсім ним тут цьому один майже мій тим щоб неї зараз були куди навіщо всіх ніколи можна привіт добрий день дякую будь ласка як справи сьогодні завтра вчора ввечері скільки коштує надішліть рахунок пʼятницю потрібна допомога хочу",
+    "bg": "и в не на аз че той с как а то всичко тя така неговия но да ти към у вече вие за би по само нея ми беше ето от мен още няма за от му сега когато дори или ако бъде беше него до вас отново вам там после себе си нищо може те тук къде има трябва за ние теб тях с какво беше сам без защо също под ще бъде тогава кой този това който един почти моят за да сега бяха никога може здравей добър ден благодаря моля как си днес утре вчера вечерта колко струва изпратете фактурата петък нужда от помощ искам",
+    "sr": "и у је да се на за су са од не а који што као из али то би сам си смо сте ја ти ми ви он она они мени теби нама вама где када зашто како колико данас сутра јуче увече здраво добар дан хвала молим како си добро колико кошта пошаљите рачун петак треба ми помоћ желим",
+    "ar": "في من على إلى عن مع هذا هذه ذلك التي الذي كان هو هي أنا أنت نحن هم لا نعم ما ماذا أين متى لماذا كيف كم اليوم غدا أمس مساء مرحبا صباح الخير شكرا من فضلك كيف حالك بخير كم السعر أرسل الفاتورة الجمعة أحتاج مساعدة أريد",
+    "fa": "و در به از که این را با است برای آن یک تا هم من تو ما شما او آنها نه بله چه کجا کی چرا چطور چند امروز فردا دیروز امشب سلام صبح بخیر ممنون لطفا حال شما چطور است خوبم قیمت چند است فاکتور را بفرستید جمعه کمک لازم دارم می‌خواهم",
+    "ur": "کے میں کی ہے اور کو سے نہیں یہ وہ ہیں کا تھا پر بھی ایک میں تم ہم آپ وہ جی ہاں کیا کہاں کب کیوں کیسے کتنا آج کل رات السلام علیکم شکریہ براہ کرم آپ کیسے ہیں ٹھیک ہوں قیمت کتنی ہے بل بھیجیں جمعہ مدد چاہیے چاہتا ہوں",
+    "ps": "د او په چې دا له ته کې یو هم نه زه ته موږ تاسو هغه دوی هو څه چیرته کله ولې څنګه څومره نن سبا پرون شپه سلام ستړي مه شې مننه مهرباني وکړئ څنګه یاست ښه یم بیه څومره ده بل راولیږئ جمعه مرستې ته اړتیا لرم غواړم",
+}
+
+# Short messages of the kind apps and emails send (errors, confirmations,
+# sign-in prompts), so one-line UI strings get the vocabulary they use
+PHRASES = {
+    "en": "Please try again later. Your changes have been saved. Are you sure you want to delete this file? An error occurred while loading the page. Enter your email address and password. Your account has been created. Click here to download the document. The message was sent successfully. This page could not be found. Sign in to continue. Cancel the order. Open settings.",
+    "es": "Por favor, inténtalo de nuevo más tarde. Se han guardado los cambios. ¿Seguro que quieres eliminar este archivo? Se produjo un error al cargar la página. Introduce tu correo electrónico y tu contraseña. Tu cuenta ha sido creada. Haz clic aquí para descargar el documento. El mensaje se envió correctamente. No se encontró la página. Inicia sesión para continuar. Cancelar el pedido. Abrir la configuración.",
+    "fr": "Veuillez réessayer plus tard. Vos modifications ont été enregistrées. Voulez-vous vraiment supprimer ce fichier ? Une erreur s'est produite lors du chargement de la page. Saisissez votre adresse e-mail et votre mot de passe. Votre compte a été créé. Cliquez ici pour télécharger le document. Le message a bien été envoyé. Cette page est introuvable. Connectez-vous pour continuer. Annuler la commande. Ouvrir les paramètres.",
+    "pt": "Tente novamente mais tarde. Suas alterações foram salvas. Tem certeza de que deseja excluir este arquivo? Ocorreu um erro ao carregar a página. Digite seu endereço de e-mail e sua senha. Sua conta foi criada. Clique aqui para baixar o documento. A mensagem foi enviada com sucesso. A página não foi encontrada. Faça login para continuar. Cancelar o pedido. Abrir as configurações.",
+    "it": "Riprova più tardi. Le modifiche sono state salvate. Sei sicuro di voler eliminare questo file? Si è verificato un errore durante il caricamento della pagina. Inserisci il tuo indirizzo email e la password. Il tuo account è stato creato. Fai clic qui per scaricare il documento. Il messaggio è stato inviato correttamente. Questa pagina non è stata trovata. Accedi per continuare. Annulla l'ordine. Apri le impostazioni.",
+    "de": "Bitte versuchen Sie es später erneut. Ihre Änderungen wurden gespeichert. Möchten Sie diese Datei wirklich löschen? Beim Laden der Seite ist ein Fehler aufgetreten. Geben Sie Ihre E-Mail-Adresse und Ihr Passwort ein. Ihr Konto wurde erstellt. Klicken Sie hier, um das Dokument herunterzuladen. Die Nachricht wurde erfolgreich gesendet. Diese Seite wurde nicht gefunden. Melden Sie sich an, um fortzufahren. Bestellung stornieren. Einstellungen öffnen.",
+    "nl": "Probeer het later opnieuw. Je wijzigingen zijn opgeslagen. Weet je zeker dat je dit bestand wilt verwijderen? Er is een fout opgetreden bij het laden van de pagina. Voer je e-mailadres en wachtwoord in. Je account is aangemaakt. Klik hier om het document te downloaden. Het bericht is verzonden. Deze pagina kan niet worden gevonden. Log in om verder te gaan. De bestelling annuleren. Instellingen openen.",
+    "pl": "Spróbuj ponownie później. Zmiany zostały zapisane. Czy na pewno chcesz usunąć ten plik? Wystąpił błąd podczas ładowania strony. Wpisz swój adres e-mail i hasło. Twoje konto zostało utworzone. Kliknij tutaj, aby pobrać dokument. Wiadomość została wysłana. Nie znaleziono tej strony. Zaloguj się, aby kontynuować. Anuluj zamówienie. Otwórz ustawienia.",
+    "tr": "Lütfen daha sonra tekrar deneyin. Değişiklikleriniz kaydedildi. Bu dosyayı silmek istediğinizden emin misiniz? Sayfa yüklenirken bir hata oluştu. E-posta adresinizi ve şifrenizi girin. Hesabınız oluşturuldu. Belgeyi indirmek için buraya tıklayın. Mesaj başarıyla gönderildi. Bu sayfa bulunamadı. Devam etmek için giriş yapın. Siparişi iptal et. Ayarları aç.",
+    "cs": "Zkuste to prosím později. Změny byly uloženy. Opravdu chcete tento soubor smazat? Při načítání stránky došlo k chybě. Zadejte svou e-mailovou adresu a heslo. Váš účet byl vytvořen. Klikněte sem a stáhněte si dokument. Zpráva byla úspěšně odeslána. Tato stránka nebyla nalezena. Pro pokračování se přihlaste. Zrušit objednávku. Otevřít nastavení.",
+    "sk": "Skúste to prosím neskôr. Zmeny boli uložené. Naozaj chcete odstrániť tento súbor? Pri načítaní stránky sa vyskytla chyba. Zadajte svoju e-mailovú adresu a heslo. Váš účet bol vytvorený. Kliknite sem a stiahnite si dokument. Správa bola úspešne odoslaná. Táto stránka sa nenašla. Pre pokračovanie sa prihláste. Zrušiť objednávku. Otvoriť nastavenia.",
+    "sv": "Försök igen senare. Dina ändringar har sparats. Är du säker på att du vill ta bort den här filen? Ett fel uppstod när sidan laddades. Ange din e-postadress och ditt lösenord. Ditt konto har skapats. Klicka här för att ladda ner dokumentet. Meddelandet har skickats. Sidan kunde inte hittas. Logga in för att fortsätta. Avbryt beställningen. Öppna inställningar.",
+    "da": "Prøv igen senere. Dine ændringer er blevet gemt. Er du sikker på, at du vil slette denne fil? Der opstod en fejl under indlæsning af siden. Indtast din e-mailadresse og din adgangskode. Din konto er blevet oprettet. Klik her for at hente dokumentet. Beskeden er sendt. Siden blev ikke fundet. Log ind for at fortsætte. Annuller ordren. Åbn indstillinger.",
+    "no": "Prøv igjen senere. Endringene dine er lagret. Er du sikker på at du vil slette denne filen? Det oppstod en feil under lasting av siden. Skriv inn e-postadressen og passordet ditt. Kontoen din er opprettet. Klikk her for å laste ned dokumentet. Meldingen ble sendt. Siden ble ikke funnet. Logg inn for å fortsette. Avbryt bestillingen. Åpne innstillinger.",
+    "fi": "Yritä myöhemmin uudelleen. Muutokset on tallennettu. Haluatko varmasti poistaa tämän tiedoston? Sivun lataamisessa tapahtui virhe. Anna sähköpostiosoitteesi ja salasanasi. Tilisi on luotu. Lataa asiakirja napsauttamalla tästä. Viesti lähetettiin onnistuneesti. Sivua ei löytynyt. Kirjaudu sisään jatkaaksesi. Peruuta tilaus. Avaa asetukset.",
+    "hu": "Kérjük, próbálja újra később. A módosítások mentése megtörtént. Biztosan törölni szeretné ezt a fájlt? Hiba történt az oldal betöltése közben. Adja meg az e-mail-címét és a jelszavát. A fiókja létrejött. Kattintson ide a dokumentum letöltéséhez. Az üzenet sikeresen elküldve. Az oldal nem található. A folytatáshoz jelentkezzen be. Rendelés lemondása. Beállítások megnyitása.",
+    "et": "Palun proovige hiljem uuesti. Teie muudatused on salvestatud. Kas olete kindel, et soovite selle faili kustutada? Lehe laadimisel tekkis viga. Sisestage oma e-posti aadress ja parool. Teie konto on loodud. Dokumendi allalaadimiseks klõpsake siin. Sõnum on edukalt saadetud. Lehte ei leitud. Jätkamiseks logige sisse. Tühista tellimus. Ava seaded.",
+    "lv": "Lūdzu, mēģiniet vēlreiz vēlāk. Jūsu izmaiņas ir saglabātas. Vai tiešām vēlaties dzēst šo failu? Ielādējot lapu, radās kļūda. Ievadiet savu e-pasta adresi un paroli. Jūsu konts ir izveidots. Noklikšķiniet šeit, lai lejupielādētu dokumentu. Ziņojums ir veiksmīgi nosūtīts. Lapa netika atrasta. Piesakieties, lai turpinātu. Atcelt pasūtījumu. Atvērt iestatījumus.",
+    "lt": "Bandykite dar kartą vėliau. Jūsų pakeitimai išsaugoti. Ar tikrai norite ištrinti šį failą? Įkeliant puslapį įvyko klaida. Įveskite savo el. pašto adresą ir slaptažodį. Jūsų paskyra sukurta. Spustelėkite čia, kad atsisiųstumėte dokumentą. Žinutė sėkmingai išsiųsta. Puslapis nerastas. Prisijunkite, kad galėtumėte tęsti. Atšaukti užsakymą. Atidaryti nustatymus.",
+    "sl": "Poskusite znova pozneje. Vaše spremembe so shranjene. Ali ste prepričani, da želite izbrisati to datoteko? Pri nalaganju strani je prišlo do napake. Vnesite svoj e-poštni naslov in geslo. Vaš račun je bil ustvarjen. Kliknite tukaj za prenos dokumenta. Sporočilo je bilo uspešno poslano. Strani ni mogoče najti. Za nadaljevanje se prijavite. Prekliči naročilo. Odpri nastavitve.",
+    "hr": "Pokušajte ponovno kasnije. Vaše promjene su spremljene. Jeste li sigurni da želite izbrisati ovu datoteku? Došlo je do pogreške pri učitavanju stranice. Unesite svoju adresu e-pošte i lozinku. Vaš račun je stvoren. Kliknite ovdje za preuzimanje dokumenta. Poruka je uspješno poslana. Stranica nije pronađena. Prijavite se za nastavak. Otkaži narudžbu. Otvori postavke.",
+    "ro": "Vă rugăm să încercați din nou mai târziu. Modificările au fost salvate. Sigur doriți să ștergeți acest fișier? A apărut o eroare la încărcarea paginii. Introduceți adresa de e-mail și parola. Contul dumneavoastră a fost creat. Faceți clic aici pentru a descărca documentul. Mesajul a fost trimis cu succes. Pagina nu a fost găsită. Conectați-vă pentru a continua. Anulați comanda. Deschideți setările.",
+    "ca": "Torna-ho a provar més tard. S'han desat els canvis. Segur que vols suprimir aquest fitxer? S'ha produït un error en carregar la pàgina. Introdueix la teva adreça electrònica i la contrasenya. S'ha creat el teu compte. Fes clic aquí per baixar el document. El missatge s'ha enviat correctament. No s'ha trobat la pàgina. Inicia la sessió per continuar. Cancel·la la comanda. Obre la configuració.",
+    "gl": "Téntao de novo máis tarde. Gardáronse os cambios. Seguro que queres eliminar este ficheiro? Produciuse un erro ao cargar a páxina. Introduce o teu enderezo de correo electrónico e o contrasinal. Creouse a túa conta. Fai clic aquí para descargar o documento. A mensaxe enviouse correctamente. Non se atopou a páxina. Inicia sesión para continuar. Cancelar o pedido. Abrir a configuración.",
+    "eu": "Saiatu berriro geroago. Aldaketak gorde dira. Ziur zaude fitxategi hau ezabatu nahi duzula? Errore bat gertatu da orria kargatzean. Idatzi zure helbide elektronikoa eta pasahitza. Zure kontua sortu da. Egin klik hemen dokumentua deskargatzeko. Mezua behar bezala bidali da. Ez da orria aurkitu. Hasi saioa jarraitzeko. Utzi eskaera bertan behera. Ireki ezarpenak.",
+    "is": "Vinsamlegast reyndu aftur síðar. Breytingarnar þínar hafa verið vistaðar. Ertu viss um að þú viljir eyða þessari skrá? Villa kom upp við að hlaða síðunni. Sláðu inn netfangið þitt og lykilorð. Aðgangurinn þinn hefur verið stofnaður. Smelltu hér til að sækja skjalið. Skilaboðin voru send. Síðan fannst ekki. Skráðu þig inn til að halda áfram. Hætta við pöntun. Opna stillingar.",
+    "mt": "Jekk jogħġbok erġa' pprova aktar tard. Il-bidliet tiegħek ġew issejvjati. Żgur li trid tħassar dan il-fajl? Seħħ żball waqt li l-paġna kienet qed titgħabba. Daħħal l-indirizz tal-email u l-password tiegħek. Il-kont tiegħek inħoloq. Ikklikkja hawn biex tniżżel id-dokument. Il-messaġġ intbagħat b'suċċess. Din il-paġna ma nstabitx. Idħol biex tkompli. Ikkanċella l-ordni. Iftaħ is-settings.",
+    "cy": "Rhowch gynnig arall arni yn nes ymlaen. Mae eich newidiadau wedi'u cadw. Ydych chi'n siŵr eich bod am ddileu'r ffeil hon? Digwyddodd gwall wrth lwytho'r dudalen. Rhowch eich cyfeiriad e-bost a'ch cyfrinair. Mae eich cyfrif wedi'i greu. Cliciwch yma i lawrlwytho'r ddogfen. Anfonwyd y neges yn llwyddiannus. Ni ellir dod o hyd i'r dudalen. Mewngofnodwch i barhau. Canslo'r archeb. Agor y gosodiadau.",
+    "ga": "Bain triail eile as ar ball. Sábháladh na hathruithe. An bhfuil tú cinnte gur mian leat an comhad seo a scriosadh? Tharla earráid agus an leathanach á lódáil. Cuir isteach do sheoladh ríomhphoist agus do phasfhocal. Cruthaíodh do chuntas. Cliceáil anseo chun an doiciméad a íoslódáil. Seoladh an teachtaireacht. Níor aimsíodh an leathanach. Logáil isteach chun leanúint ar aghaidh. Cealaigh an t-ordú. Oscail na socruithe.",
+    "id": "Silakan coba lagi nanti. Perubahan Anda telah disimpan. Apakah Anda yakin ingin menghapus berkas ini? Terjadi kesalahan saat memuat halaman. Masukkan alamat email dan kata sandi Anda. Akun Anda telah dibuat. Klik di sini untuk mengunduh dokumen. Pesan berhasil dikirim. Halaman tidak ditemukan. Masuk untuk melanjutkan. Batalkan pesanan. Buka pengaturan.",
+    "ms": "Sila cuba lagi kemudian. Perubahan anda telah disimpan. Adakah anda pasti mahu memadam fail ini? Ralat berlaku semasa memuatkan halaman. Masukkan alamat e-mel dan kata laluan anda. Akaun anda telah dicipta. Klik di sini untuk memuat turun dokumen. Mesej berjaya dihantar. Halaman tidak dijumpai. Log masuk untuk meneruskan. Batalkan pesanan. Buka tetapan.",
+    "vi": "Vui lòng thử lại sau. Các thay đổi của bạn đã được lưu. Bạn có chắc chắn muốn xóa tệp này không? Đã xảy ra lỗi khi tải trang. Nhập địa chỉ email và mật khẩu của bạn. Tài khoản của bạn đã được tạo. Nhấp vào đây để tải xuống tài liệu. Tin nhắn đã được gửi thành công. Không tìm thấy trang. Đăng nhập để tiếp tục. Hủy đơn hàng. Mở cài đặt.",
+    "sw": "Tafadhali jaribu tena baadaye. Mabadiliko yako yamehifadhiwa. Una uhakika unataka kufuta faili hii? Hitilafu imetokea wakati wa kupakia ukurasa. Weka anwani yako ya barua pepe na nenosiri. Akaunti yako imeundwa. Bofya hapa ili kupakua hati. Ujumbe umetumwa. Ukurasa haukupatikana. Ingia ili kuendelea. Ghairi agizo. Fungua mipangilio.",
+    "ru": "Пожалуйста, повторите попытку позже. Ваши изменения сохранены. Вы уверены, что хотите удалить этот файл? При загрузке страницы произошла ошибка. Введите адрес электронной почты и пароль. Ваша учётная запись создана. Нажмите здесь, чтобы скачать документ. Сообщение успешно отправлено. Страница не найдена. Войдите, чтобы продолжить. Отменить заказ. Открыть настройки.",
+    "uk": "Будь ласка, спробуйте пізніше. Ваші зміни збережено. Ви впевнені, що хочете видалити цей файл? Під час завантаження сторінки сталася помилка. Введіть свою адресу електронної пошти та пароль. Ваш обліковий запис створено. Натисніть тут, щоб завантажити документ. Повідомлення успішно надіслано. Сторінку не знайдено. Увійдіть, щоб продовжити. Скасувати замовлення. Відкрити налаштування.",
+    "bg": "Моля, опитайте отново по-късно. Промените ви са запазени. Сигурни ли сте, че искате да изтриете този файл? Възникна грешка при зареждането на страницата. Въведете своя имейл адрес и парола. Профилът ви е създаден. Щракнете тук, за да изтеглите документа. Съобщението е изпратено успешно. Страницата не е намерена. Влезте, за да продължите. Отказ от поръчката. Отворете настройките.",
+    "sr": "Молимо покушајте поново касније. Ваше измене су сачуване. Да ли сте сигурни да желите да избришете ову датотеку? Дошло је до грешке приликом учитавања странице. Унесите своју адресу е-поште и лозинку. Ваш налог је креиран. Кликните овде да преузмете документ. Порука је успешно послата. Страница није пронађена. Пријавите се да бисте наставили. Откажи поруџбину. Отвори подешавања.",
+    "ar": "يرجى المحاولة مرة أخرى لاحقا. تم حفظ التغييرات. هل أنت متأكد أنك تريد حذف هذا الملف؟ حدث خطأ أثناء تحميل الصفحة. أدخل عنوان بريدك الإلكتروني وكلمة المرور. تم إنشاء حسابك. انقر هنا لتنزيل المستند. تم إرسال الرسالة بنجاح. لم يتم العثور على الصفحة. سجل الدخول للمتابعة. إلغاء الطلب. افتح الإعدادات.",
+    "fa": "لطفا بعدا دوباره امتحان کنید. تغییرات شما ذخیره شد. آیا مطمئن هستید که می‌خواهید این فایل را حذف کنید؟ هنگام بارگیری صفحه خطایی رخ داد. آدرس ایمیل و رمز عبور خود را وارد کنید. حساب شما ایجاد شد. برای دانلود سند اینجا کلیک کنید. پیام با موفقیت ارسال شد. صفحه پیدا نشد. برای ادامه وارد شوید. لغو سفارش. باز کردن تنظیمات.",
+    "ur": "براہ کرم بعد میں دوبارہ کوشش کریں۔ آپ کی تبدیلیاں محفوظ ہو گئی ہیں۔ کیا آپ واقعی یہ فائل حذف کرنا چاہتے ہیں؟ صفحہ لوڈ کرتے وقت ایک خرابی پیش آئی۔ اپنا ای میل پتہ اور پاس ورڈ درج کریں۔ آپ کا اکاؤنٹ بن گیا ہے۔ دستاویز ڈاؤن لوڈ کرنے کے لیے یہاں کلک کریں۔ پیغام کامیابی سے بھیج دیا گیا۔ صفحہ نہیں ملا۔ جاری رکھنے کے لیے سائن ان کریں۔ آرڈر منسوخ کریں۔ ترتیبات کھولیں۔",
+    "ps": "مهرباني وکړئ وروسته بیا هڅه وکړئ. ستاسو بدلونونه خوندي شول. ایا تاسو ډاډه یاست چې غواړئ دا فایل ړنګ کړئ؟ د پاڼې د پورته کولو پر مهال تېروتنه رامنځته شوه. خپل برېښنالیک پته او پټنوم ولیکئ. ستاسو حساب جوړ شو. د سند د ښکته کولو لپاره دلته کلیک وکړئ. پیغام په بریالیتوب سره ولېږل شو. پاڼه ونه موندل شوه. د دوام لپاره ننوځئ.",
+}
+
+def script_of(char: str):
+    code = ord(char)
+    index = bisect_right(_SCRIPT_STARTS, code) - 1
+    return _SCRIPT_RANGES[index][1] if index >= 0 else None
+
+def ngrams(text: str):
+    """Character 1- to 3-grams of each word, padded with spaces at the word edges"""
+    grams = []
+    for word in text.lower().split():
+        word = "".join(char for char in word if char.isalpha() or char == "'")
+        if not word:
+            continue
+        padded = f" {word} "
+        for size in (1, 2, 3):
+            grams.extend(padded[i:i + size] for i in range(len(padded) - size + 1) if padded[i:i + size] != " ")
+    return grams
+
+class LanguageDetector:
+    """
+    Offline language identification for source_lang="auto".
+
+    The dominant Unicode script of the text picks the candidates; a script
+    only one supported language uses settles it. Otherwise the text's
+    character n-grams are scored against per-language profiles with naive
+    Bayes. The profiles are stored as an inverted index from n-gram to
+    (language, log probability) pairs, so a text costs one dictionary lookup
+    per n-gram plus a short loop over the languages that actually use it.
+    Only languages in supported_languages are considered, and only the first
+    MAX_CHARS characters of a text are read.
+
+    Short texts ("Save", "OK") carry too few n-grams to tell related
+    languages apart, so a guess only counts when its log likelihood beats
+    the runner-up's by min_margin.
+    """
+
+    def __init__(self, languages=None, samples=None, min_margin: float = None):
+        languages = set(languages if languages is not None else config.get("supported_languages", []))
+        samples = samples if samples is not None else SAMPLES
+        self.min_margin = min_margin if min_margin is not None else config.get("language_detection_min_margin", 8.0)
+        self.script_languages = {script: lang for script, lang in SCRIPT_LANGUAGES.items() if lang in languages}
+        self.languages = sorted(lang for lang in samples if lang in languages)
+        self.scripts = {}  # script -> indexes into self.languages
+        # n-gram -> [(language index, log P(n-gram | language) - log UNSEEN)]
+        self.index = {}
+
+        for i, lang in enumerate(self.languages):
+            text = " ".join((samples[lang], PHRASES.get(lang, ""), COMMON_WORDS.get(lang, "")))
+            profile = Counter(ngrams(text))
+            total = sum(profile.values())
+            for gram, count in profile.items():
+                self.index.setdefault(gram, []).append((i, math.log(count / total) - LOG_UNSEEN))
+            script = Counter(script_of(char) for char in text if char.isalpha()).most_common(1)[0][0]
+            self.scripts.setdefault(script, []).append(i)
+
+        # Per detector rather than on the method, which would keep every
+        # detector alive and share one cache between them
+        self._cached_score = lru_cache(maxsize=4096)(self._score)
+
+    def dominant_script(self, text: str):
+        scripts = Counter(script_of(char) for char in text if char.isalpha())
+        scripts.pop(None, None)
+        if not scripts:
+            return None
+        # Japanese mixes kana with kanji; any kana at all means Japanese
+        if scripts.get("kana") and "han" in scripts:
+            return "kana"
+        return scripts.most_common(1)[0][0]
+
+    def detect(self, text: str):
+        """
+        Most likely supported language of text, or None if it has no letters
+        or the best guess isn't clearly ahead of the next one
+        """
+        lang, margin = self.score(text)
+        return lang if margin >= self.min_margin else None
+
+    def score(self, text: str):
+        """
+        (most likely language, how far its log likelihood is ahead of the
+        runner-up's) for text; the margin is infinite when the script alone
+        decides, and (None, 0.0) is returned for text without letters
+        """
+        return self._cached_score(unicodedata.normalize("NFC", text[:MAX_CHARS]))
+
+    def _score(self, text: str):
+        script = self.dominant_script(text)
+        if script is None:
+            return None, 0.0
+        if script in self.script_languages:
+            return self.script_languages[script], math.inf
+        candidates = self.scripts.get(script)
+        if not candidates:
+            return None, 0.0
+        if len(candidates) == 1:
+            return self.languages[candidates[0]], math.inf
+
+        scores = [0.0] * len(self.languages)
+        for gram in ngrams(text):
+            for i, weight in self.index.get(gram, ()):
+                scores[i] += weight
+        best, runner_up = sorted(candidates, key=scores.__getitem__, reverse=True)[:2]
+        return self.languages[best], scores[best] - scores[runner_up]
+
+    def detect_batch(self, texts):
+        return [self.detect(text) for text in texts]
+
+language_detector = LanguageDetector()
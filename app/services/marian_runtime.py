@@ -1,19 +1,67 @@
-# app/services/marian_runtime.py
 import os
 import asyncio
 import logging
 import html
+import itertools
+import math
+import shlex
+import time
+from collections import deque
 from datetime import datetime
+from app.config import config
+from app.services.eviction import process_rss
+from app.services.runtime import TranslationRuntime
+from app.utils.log import request_id
 
-class MarianRuntime:
-    def __init__(self, model_dir: str):
-        self.model_dir = model_dir
+DEFAULT_DECODER_PATH = "/mnt/c/Users/julia/FluentAI/marian-dev/build/marian-decoder"
+# A decoder that dies sooner than this after starting counts as crash-looping
+STABLE_UPTIME = 30
+
+class DecoderDiedError(RuntimeError):
+    """The decoder process exited or its pipe broke while a batch was in it"""
+
+class _Resend(Exception):
+    """The batch was written to a decoder that died before answering it"""
+
+def sanitize_line(text: str) -> str:
+    """One line of decoder input: every kind of line break or run of whitespace becomes one space"""
+    return " ".join(text.replace("\x00", " ").split())
+
+class MarianRuntime(TranslationRuntime):
+    """marian-decoder subprocess fed over stdin/stdout"""
+
+    backend = "marian"
+
+    def __init__(self, model_dir: str, cpu_threads: int = 1, artifacts: dict = None):
+        super().__init__(model_dir, cpu_threads, artifacts)
         self.process = None
-        self.loaded_at = None
-        self.model_key = os.path.basename(model_dir)
-        # Only process one translation at a time
-        self._translate_lock = asyncio.Lock()
-    
+        # Pipelined I/O: several batches may be written before their output is
+        # read back. Each written line has a (batch number, future) entry here,
+        # and the reader task resolves them in order.
+        self.pipeline_depth = max(1, int(config.get("pipeline_depth", 2)))
+        self.decode_timeout = config.get("decode_timeout", 120)
+        self._waiting = deque()
+        self._batch_numbers = itertools.count()
+        self._reader_task = None
+        self._restart_lock = asyncio.Lock()
+        self.generation = 0
+        self.restarts = 0
+        # Supervision: liveness probes while idle, restarts with exponential backoff
+        self.health_check_interval = config.get("health_check_interval", 5)
+        self.restart_backoff = config.get("restart_backoff", 1)
+        self.restart_backoff_max = config.get("restart_backoff_max", 60)
+        self._failures = 0
+        self._restart_at = 0.0
+        self._supervisor_task = None
+        self.last_error = None
+        # marian logs to stderr; it has to be drained or the decoder blocks
+        self.stderr_tail = deque(maxlen=50)
+        self._stderr_task = None
+
+    @property
+    def running(self) -> bool:
+        return self.process is not None
+
     def win_to_wsl_path(self, win_path):
         """Convert Windows path to WSL path format to allow Marian NMT runtime"""
         if os.name == 'nt':  # Check if running on Windows
@@ -27,25 +75,17 @@ class MarianRuntime:
             else:
                 return win_path.replace('\\', '/')
         return win_path  # Return unchanged if not on Windows
-    
+
     async def start(self):
-        # Identify the required files in model_dir:
-        files = os.listdir(self.model_dir)
-        model_file = None
-        vocab_file = None
-        decoder_config = None
-
-        for f in files:
-            if f.endswith(".npz"):
-                model_file = os.path.join(self.model_dir, f)
-            if "vocab" in f and f.endswith(".yml"):
-                vocab_file = os.path.join(self.model_dir, f)
-            if "decoder" in f and f.endswith(".yml"):
-                decoder_config = os.path.join(self.model_dir, f)
-        
+        # The required files in model_dir, as indexed by the model registry
+        artifacts = self._artifacts()
+        model_file = artifacts["model"]
+        vocab_file = artifacts["vocab"]
+        decoder_config = artifacts["decoder_config"]
+
         if not model_file or not vocab_file or not decoder_config:
             raise FileNotFoundError("Required model files not found in " + self.model_dir)
-        
+
         model_file = os.path.abspath(model_file)
         vocab_file = os.path.abspath(vocab_file)
         decoder_config = os.path.abspath(decoder_config)
@@ -55,93 +95,302 @@ class MarianRuntime:
             model_file = self.win_to_wsl_path(model_file)
             vocab_file = self.win_to_wsl_path(vocab_file)
             decoder_config = self.win_to_wsl_path(decoder_config)
-        
+
         # When running in WSL terminal, just use the direct path to marian-decoder
-        # No need for wsl prefix
-        cmd = f"/mnt/c/Users/julia/FluentAI/marian-dev/build/marian-decoder -m {model_file} -v {vocab_file} {vocab_file} -c {decoder_config}"
-        
-        logging.info(f"Starting marian-decoder with command: {cmd}")
+        # No need for wsl prefix. The path may also name a wrapper or a stub
+        # decoder, e.g. "python benchmarks/fake_marian_decoder.py"
+        decoder = shlex.split(config.get("marian_decoder_path", DEFAULT_DECODER_PATH), posix=os.name != 'nt')
+        # The command-line mini-batch overrides the value in decoder.yml so a
+        # whole micro-batch is decoded in one pass
+        cmd = decoder + [
+            "-m", model_file, "-v", vocab_file, vocab_file, "-c", decoder_config,
+            "--mini-batch", str(self.max_batch_size), "--maxi-batch", "1",
+            "--cpu-threads", str(self.cpu_threads),
+        ]
+
+        logging.info(f"Starting marian-decoder with command: {' '.join(cmd)}")
 
         # Start the process asynchronously.
         try:
-            self.process = await asyncio.create_subprocess_shell(
-                cmd,
+            self.process = await asyncio.create_subprocess_exec(
+                *cmd,
                 stdin=asyncio.subprocess.PIPE,
                 stdout=asyncio.subprocess.PIPE,
                 stderr=asyncio.subprocess.PIPE,
             )
-            await asyncio.sleep(2)
-            if self.process.returncode is not None:
-                stderr = await self.process.stderr.read()
-                error_msg = stderr.decode('utf-8').strip()
-                logging.error(f"Marian decoder process exited immediately: {error_msg}")
+            self._stderr_task = asyncio.create_task(self._drain_stderr(self.process))
+            try:
+                await self._wait_until_ready()
+            except Exception as e:
+                # Give a dying decoder a moment to exit and flush its log
+                try:
+                    await asyncio.wait_for(self.process.wait(), timeout=1)
+                    await asyncio.wait_for(self._stderr_task, timeout=1)
+                except asyncio.TimeoutError:
+                    pass
+                error_msg = "\n".join(self.stderr_tail) or str(e) or e.__class__.__name__
+                await self._stop_process()
+                logging.error(f"Marian decoder did not become ready: {error_msg}")
                 raise RuntimeError(f"Failed to start marian-decoder: {error_msg}")
-            
+
+            self._attach(self.process)
             self.loaded_at = datetime.now().isoformat()
+            self.started_at = time.monotonic()
+            self.state = "ready"
+            if self._supervisor_task is None or self._supervisor_task.done():
+                self._supervisor_task = asyncio.create_task(self._supervise())
             logging.info(f"Marian decoder started for {self.model_key}")
         except Exception as e:
             logging.error(f"Failed to start marian-decoder for {self.model_key}: {str(e)}")
             raise RuntimeError(f"Failed to start marian-decoder: {str(e)}")
 
-    async def translate(self, text: str) -> str:
-        if self.process is None:
-            logging.info(f"Starting marian-decoder for {self.model_key} on demand")
-            await self.start()
+    def memory_bytes(self) -> int:
+        """Resident memory of the decoder process"""
+        if self.process is None or self.process.returncode is not None:
+            return 0
+        return process_rss(self.process.pid)
+
+    async def _wait_until_ready(self):
+        """
+        Wait until the decoder has loaded its model.
+
+        marian only answers once the model is in memory, so a padding batch of
+        empty lines doubles as a readiness probe instead of a fixed sleep.
+        """
+        self.process.stdin.write(b"\n" * self.max_batch_size)
+        await self.process.stdin.drain()
+        await asyncio.wait_for(
+            self._read_lines(self.max_batch_size),
+            timeout=config.get("decoder_startup_timeout", 60)
+        )
+
+    async def _drain_stderr(self, process):
+        while True:
+            line = await process.stderr.readline()
+            if not line:
+                return
+            self.stderr_tail.append(line.decode('utf-8', errors='replace').rstrip())
+
+    def _attach(self, process):
+        """Use process as the decoder and start reading its output"""
+        self.process = process
+        self.generation += 1
+        self._reader_task = asyncio.create_task(self._read_loop(process))
+
+    def _pipe_ok(self) -> bool:
+        return self.process is not None and self._reader_task is not None and not self._reader_task.done()
+
+    async def _read_loop(self, process):
+        """Hand each output line to the oldest line still waiting for one"""
+        request_id.set(None)
+        while True:
+            line = await process.stdout.readline()
+            if not line:
+                break
+            if not self._waiting:
+                logging.warning(f"Unexpected output from marian-decoder for {self.model_key}")
+                continue
+            _, future = self._waiting.popleft()
+            if not future.done():
+                future.set_result(line)
+        tail = "; ".join(list(self.stderr_tail)[-3:])
+        self._fail_pipe(DecoderDiedError(f"marian-decoder for {self.model_key} exited" + (f": {tail}" if tail else "")))
+
+    def _fail_pipe(self, error):
+        """
+        Fail everything still waiting on the pipe. The oldest batch is the one
+        the decoder was working on, so it gets error; later batches never
+        reached the decoder's output and are sent again to its replacement.
+        """
+        head = self._waiting[0][0] if self._waiting else None
+        while self._waiting:
+            batch, future = self._waiting.popleft()
+            if not future.done():
+                future.set_exception(error if batch == head else _Resend())
+
+    async def _send(self, lines):
+        """Write one batch and return a future per output line, in order"""
+        # Pad to a full mini-batch so marian doesn't block waiting for
+        # more input; the padding output is discarded
+        padding = -len(lines) % self.max_batch_size
+        payload = "".join(line + "\n" for line in lines) + "\n" * padding
+        loop = asyncio.get_running_loop()
+        batch = next(self._batch_numbers)
+        futures = [loop.create_future() for _ in range(len(lines) + padding)]
+        # Queued and written without yielding in between, so lines and futures stay in step
+        self._waiting.extend((batch, future) for future in futures)
+        try:
+            self.process.stdin.write(payload.encode("utf-8"))
+            await self.process.stdin.drain()
+        except (ConnectionError, RuntimeError) as e:
+            self._fail_pipe(DecoderDiedError(f"Lost the pipe to marian-decoder for {self.model_key}: {str(e)}"))
+        return futures
+
+    async def _replace_process(self, generation: int, reason: str, wait: bool = False):
+        """
+        Swap in a new decoder, unless another batch already replaced this generation.
+
+        After repeated failures restarts are spaced out exponentially; callers
+        with wait=False (requests) fail fast during the backoff, the
+        supervisor (wait=True) sleeps it out.
+        """
+        async with self._restart_lock:
+            if self.generation != generation and self._pipe_ok():
+                return
+            delay = self._restart_at - time.monotonic()
+            if delay > 0:
+                if not wait:
+                    raise DecoderDiedError(
+                        f"marian-decoder for {self.model_key} keeps failing; next restart in {math.ceil(delay)}s"
+                    )
+                await asyncio.sleep(delay)
+
+            self.restarts += 1
+            self.last_error = reason
+            self.state = "restarting"
+            logging.warning(f"Replacing marian-decoder for {self.model_key}: {reason}")
+            crashed_early = self.started_at is not None and time.monotonic() - self.started_at < STABLE_UPTIME
+            self._fail_pipe(DecoderDiedError(reason))
+            await self._stop_process()
+            try:
+                await self.start()
+            except Exception:
+                self.state = "failed"
+                self._back_off()
+                raise
+            if crashed_early:
+                self._back_off()
+            else:
+                self._failures = 0
+                self._restart_at = 0.0
+
+    async def _ensure_running(self):
+        # Same path as a crash restart: one start for all waiting requests,
+        # and none while restarts are backing off
+        await self._replace_process(self.generation, "decoder is not running")
+
+    def _back_off(self):
+        self._failures += 1
+        backoff = min(self.restart_backoff_max, self.restart_backoff * 2 ** (self._failures - 1))
+        self._restart_at = time.monotonic() + backoff
+
+    async def _supervise(self):
+        """Restart a decoder that died, and probe an idle one to catch it hanging"""
+        request_id.set(None)
+        while True:
+            await asyncio.sleep(self.health_check_interval)
+            try:
+                if not self._pipe_ok():
+                    await self._replace_process(self.generation, self.last_exit_reason(), wait=True)
+                elif not self._waiting and time.monotonic() - self.last_used > self.health_check_interval:
+                    await self._probe()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logging.error(f"Health check for {self.model_key} failed: {str(e)}")
 
-        async with self._translate_lock:
+    async def _probe(self):
+        """Liveness probe: an empty mini-batch must come back within health_probe_timeout"""
+        generation = self.generation
+        futures = await self._send([""])
+        try:
+            await asyncio.wait_for(asyncio.gather(*futures), timeout=config.get("health_probe_timeout", 10))
+        except asyncio.TimeoutError:
+            await self._replace_process(generation, "liveness probe timed out", wait=True)
+        except (DecoderDiedError, _Resend):
+            await self._replace_process(generation, self.last_exit_reason(), wait=True)
+
+    def last_exit_reason(self) -> str:
+        code = self.process.returncode if self.process is not None else None
+        tail = "; ".join(list(self.stderr_tail)[-3:])
+        return f"decoder exited (code {code})" + (f": {tail}" if tail else "")
+
+    def stats(self) -> dict:
+        return {
+            **super().stats(),
+            "pid": self.process.pid if self.process is not None else None,
+            "restarts": self.restarts,
+            "last_error": self.last_error,
+            "stderr_tail": list(self.stderr_tail)[-5:],
+        }
+
+    async def _decode(self, texts):
+        # One line per input; embedded newlines would shift every later
+        # output line onto the wrong caller
+        lines = [sanitize_line(text) for text in texts]
+
+        # Texts are only logged when explicitly enabled (slow, and private data)
+        if config.get("log_texts", False) and logging.root.isEnabledFor(logging.DEBUG):
+            for text in texts:
+                logging.debug(f"Translation input for {self.model_key}: '{text}'")
+
+        for attempt in range(2):
+            if not self._pipe_ok():
+                await self._replace_process(self.generation, "decoder is not running")
+            generation = self.generation
+            futures = await self._send(lines)
             try:
-                # Add a newline to the input text
-                input_text = text.strip() + '\n'
-                
-                # Log the input text for debugging
-                logging.info(f"Translation input for {self.model_key}: '{text}'")
-                
-                # Write to stdin
-                self.process.stdin.write(input_text.encode('utf-8'))
-                await self.process.stdin.drain()
-                
-                # Read output
-                output_line = await asyncio.wait_for(
-                    self.process.stdout.readline(), 
-                    timeout=120  # 2 minute timeout
-                )
-                
-                # Decode and strip whitespace
-                result = output_line.decode('utf-8').strip()
-                
-                # Fix HTML entities (like &apos;)
-                result = html.unescape(result)
-                
-                # Log the output for debugging
-                logging.info(f"Translation output for {self.model_key}: '{result}'")
-                
-                return result
-                
+                output_lines = await asyncio.wait_for(asyncio.gather(*futures), timeout=self.decode_timeout)
+                break
+            except _Resend:
+                if attempt == 1:
+                    raise DecoderDiedError(f"marian-decoder for {self.model_key} failed twice")
             except asyncio.TimeoutError:
                 logging.error(f"Translation timeout for {self.model_key}")
-                # Restart the process in case it's stuck
-                await self.stop()
-                await self.start()
+                # The decoder is stuck; later output can't be matched to requests any more
+                await self._replace_process(generation, "translation timed out")
                 raise TimeoutError(f"Translation timed out for {self.model_key}")
-                
-            except Exception as e:
+            except DecoderDiedError as e:
                 logging.error(f"Translation error for {self.model_key}: {str(e)}")
-                # Check if process is still alive
-                if self.process and self.process.returncode is not None:
-                    logging.error(f"Process died, restarting for {self.model_key}")
-                    await self.start()
-                raise RuntimeError(f"Translation error: {str(e)}")
-
-    async def stop(self):
-        """Stop the Marian decoder process"""
+                await self._replace_process(generation, str(e))
+                raise
+
+        results = []
+        for output_line in output_lines[:len(lines)]:
+            # Decode, strip whitespace and fix HTML entities (like &apos;)
+            result = html.unescape(output_line.decode('utf-8').strip())
+            if config.get("log_texts", False) and logging.root.isEnabledFor(logging.DEBUG):
+                logging.debug(f"Translation output for {self.model_key}: '{result}'")
+            results.append(result)
+        return results
+
+    async def _read_lines(self, count):
+        lines = []
+        for _ in range(count):
+            line = await self.process.stdout.readline()
+            if not line:
+                raise RuntimeError(f"marian-decoder closed its output for {self.model_key}")
+            lines.append(line)
+        return lines
+
+    async def _shutdown(self):
+        if self._supervisor_task is not None:
+            self._supervisor_task.cancel()
+            self._supervisor_task = None
+        await self._stop_process()
+
+    async def _stop_process(self):
+        if self._reader_task is not None:
+            self._reader_task.cancel()
+            self._reader_task = None
+        while self._waiting:
+            self._waiting.popleft()[1].cancel()
+        if self._stderr_task is not None:
+            self._stderr_task.cancel()
+            self._stderr_task = None
         if self.process:
             try:
-                self.process.terminate()
+                # Closing stdin lets the pipe transport shut down cleanly
+                self.process.stdin.close()
+                if self.process.returncode is None:
+                    self.process.terminate()
                 await asyncio.wait_for(self.process.wait(), timeout=5.0)
                 logging.info(f"Marian decoder stopped for {self.model_key}")
+            except ProcessLookupError:
+                pass
             except asyncio.TimeoutError:
                 logging.warning(f"Marian decoder did not terminate gracefully for {self.model_key}, killing")
                 self.process.kill()
                 await self.process.wait()
             finally:
-                self.process = None
\ No newline at end of file
+                self.process = None
@@ -0,0 +1,137 @@
+# app/services/metrics.py
+import bisect
+import os
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+def _format_labels(label_names, label_values, extra=None) -> str:
+    pairs = list(zip(label_names, label_values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, value in pairs)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+class Metric:
+    type_name = "untyped"
+
+    def __init__(self, name: str, description: str, labels=()):
+        self.name = name
+        self.description = description
+        self.label_names = tuple(labels)
+        self.values = {}  # tuple of label values -> value
+
+    def _key(self, labels) -> tuple:
+        return tuple(labels.get(name, "") for name in self.label_names)
+
+    def render(self):
+        yield f"# HELP {self.name} {self.description}"
+        yield f"# TYPE {self.name} {self.type_name}"
+        for key, value in sorted(self.values.items()):
+            yield f"{self.name}{_format_labels(self.label_names, key)} {value}"
+
+class Counter(Metric):
+    type_name = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        self.values[key] = self.values.get(key, 0) + amount
+
+class Gauge(Metric):
+    type_name = "gauge"
+
+    def set(self, value: float, **labels):
+        self.values[self._key(labels)] = value
+
+    def clear(self):
+        self.values.clear()
+
+class Histogram(Metric):
+    type_name = "histogram"
+
+    def __init__(self, name: str, description: str, labels=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, description, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        series = self.values.get(key)
+        if series is None:
+            # [count per bucket..., +Inf count, sum]
+            series = self.values[key] = [0] * (len(self.buckets) + 1) + [0.0]
+        series[bisect.bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def render(self):
+        yield f"# HELP {self.name} {self.description}"
+        yield f"# TYPE {self.name} {self.type_name}"
+        for key, series in sorted(self.values.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + ("+Inf",), series[:-1]):
+                cumulative += count
+                labels = _format_labels(self.label_names, key, ("le", bound))
+                yield f"{self.name}_bucket{labels} {cumulative}"
+            labels = _format_labels(self.label_names, key)
+            yield f"{self.name}_sum{labels} {series[-1]}"
+            yield f"{self.name}_count{labels} {cumulative}"
+
+class MetricsRegistry:
+    def __init__(self):
+        self.metrics = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+def process_cpu_seconds(pid) -> float:
+    """User plus system CPU time of a process, or 0 where /proc isn't available"""
+    try:
+        with open(f"/proc/{pid}/stat", "r") as f:
+            # The command name may contain spaces; fields resume after ")"
+            fields = f.read().rsplit(")", 1)[1].split()
+        return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+    except (OSError, ValueError, IndexError):
+        return 0.0
+
+
+registry = MetricsRegistry()
+
+REQUESTS = registry.register(Counter(
+    "fluentai_requests_total", "Translation requests per language pair", ["pair"]))
+REQUEST_ERRORS = registry.register(Counter(
+    "fluentai_request_errors_total", "Failed translation requests per language pair", ["pair"]))
+REJECTED = registry.register(Counter(
+    "fluentai_rejected_requests_total", "Requests refused by rate limiting or full queues", ["reason"]))
+QUEUE_WAIT = registry.register(Histogram(
+    "fluentai_queue_wait_seconds", "Time a segment waits for a decoder batch", ["model"]))
+DECODE_TIME = registry.register(Histogram(
+    "fluentai_decode_seconds", "Time to decode one batch", ["model"]))
+BATCH_SIZE = registry.register(Histogram(
+    "fluentai_batch_size", "Segments per decoder batch", ["model"], buckets=(1, 2, 4, 8, 16, 32, 64)))
+LEG_TIME = registry.register(Histogram(
+    "fluentai_leg_seconds", "Time for one segment to pass one model, by route kind", ["model", "route"]))
+MODEL_LOAD_TIME = registry.register(Histogram(
+    "fluentai_model_load_seconds", "Time to start a model's decoders", ["model"]))
+LOAD_QUEUE_WAIT = registry.register(Histogram(
+    "fluentai_load_queue_wait_seconds", "Time a model load waits for an admission slot"))
+MODEL_LOADS = registry.register(Counter(
+    "fluentai_model_loads_total", "Models loaded", ["model"]))
+MODEL_EVICTIONS = registry.register(Counter(
+    "fluentai_model_evictions_total", "Models unloaded to make room", ["model"]))
+CACHE_LOOKUPS = registry.register(Gauge(
+    "fluentai_translation_cache_lookups", "Result cache lookups since start", ["result"]))
+CACHE_HIT_RATIO = registry.register(Gauge(
+    "fluentai_translation_cache_hit_ratio", "Share of result cache lookups that hit"))
+MEMORY_LOOKUPS = registry.register(Gauge(
+    "fluentai_translation_memory_lookups", "Translation memory lookups since start", ["result"]))
+DECODER_RSS = registry.register(Gauge(
+    "fluentai_decoder_resident_memory_bytes", "Resident memory of each decoder process", ["model", "pid"]))
+DECODER_CPU = registry.register(Gauge(
+    "fluentai_decoder_cpu_seconds", "CPU time used by each decoder process", ["model", "pid"]))
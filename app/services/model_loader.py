@@ -1,58 +1,297 @@
 # app/services/model_loader.py
 import asyncio
 import logging
-from collections import OrderedDict
+import time
+from collections import Counter, OrderedDict
 import os
-from datetime import datetime
 from app.config import config
-from app.services.marian_runtime import MarianRuntime
+from app.services.runtime import ModelUnloadedError
+from app.services.rate_limit import QueueFullError
+from app.services.runtime_pool import RuntimePool, replica_settings
+from app.services.model_registry import ModelRegistry, resolve_models_dir
+from app.services.prefetch import RequestHistory
+from app.services.eviction import create_policy
+from app.services.admission import AdmissionQueue
+from app.services.metrics import MODEL_LOAD_TIME, MODEL_LOADS, MODEL_EVICTIONS, LOAD_QUEUE_WAIT
+
+class ModelCacheFullError(QueueFullError):
+    """A model can't be loaded because every loaded model is busy and none can be evicted"""
+
+    def __init__(self, model_key: str, retry_after: int):
+        super().__init__(model_key, retry_after)
+        self.args = (f"No room to load model {model_key}: every loaded model is busy, try again later",)
 
 class ModelLoader:
     def __init__(self, cache_size: int = config.get("cache_size",6)):
         self.cache_size = cache_size
-        self.models = OrderedDict()  # key: "src-tgt" -> (model, tokenizer)
-        self.load_semaphore = asyncio.Semaphore(5)
+        self.models = OrderedDict()  # key: "src-tgt" -> RuntimePool
+        self.models_dir = resolve_models_dir()
+        self.registry = ModelRegistry(self.models_dir)
+        self._watch_task = None
+        # Decoder spawns are CPU and disk heavy; admit a few at a time, in order
+        self.load_queue = AdmissionQueue(config.get("max_concurrent_loads", 5))
+        self.eviction_policy = create_policy(config.get("eviction_policy", "gdsf"))
+        # Resident memory the decoders may use in total; 0 means only cache_size applies
+        self.memory_budget = config.get("memory_budget_mb", 0) * 1024 * 1024
+        self.history = RequestHistory()
+        # key -> task of the load in progress; concurrent misses all await it
+        self._loading = {}
+        # key -> callers waiting on its load; a model just loaded is pinned
+        # until they have had the chance to send it their requests
+        self._waiters = Counter()
+        # Pools that made room in the budget and are starting; they count against it already
+        self._starting = set()
+        self._prefetching = set()
+        # Prefetches and prewarms; the event loop only holds weak references to tasks
+        self._background = set()
+        # Set by the placement coordinator when several workers share models:
+        # async (key) -> whether this worker should host the pair
+        self.should_host = None
+
+    def model_version(self, src: str, tgt: str):
+        """Identify the model file for a pair so cached results change with the model"""
+        entry = self.registry.get(self._make_model_key(src, tgt))
+        return entry["version"] if entry is not None else None
 
     def _make_model_key(self, src: str, tgt: str) -> str:
         return f"{src}-{tgt}"
+
+    @staticmethod
+    def _replicas_of(pool) -> int:
+        # A pool that hasn't started yet is about to start min_replicas
+        return pool.size or pool.min_replicas
+
+    def replica_count(self) -> int:
+        """Decoder processes running or starting; this is what cache_size limits"""
+        return sum(pool.size for pool in self.models.values()) + sum(map(self._replicas_of, self._starting))
+
+    def memory_usage(self) -> int:
+        pools = [*self.models.values(), *self._starting]
+        return sum(pool.memory_bytes() for pool in pools)
+
+    def _has_replica_capacity(self) -> bool:
+        return self.replica_count() < self.cache_size
+
+    def _over_budget(self, incoming) -> bool:
+        if incoming in self._starting:
+            # Already counted
+            return self.replica_count() > self.cache_size or bool(
+                self.memory_budget and self.memory_usage() > self.memory_budget)
+        if self.replica_count() + self._replicas_of(incoming) > self.cache_size:
+            return True
+        if self.memory_budget and self.memory_usage() + incoming.memory_bytes() > self.memory_budget:
+            return True
+        return False
+
+    async def _evict_for(self, incoming) -> bool:
+        """
+        Stop models chosen by the eviction policy until incoming fits the budget.
+        Returns False if it doesn't fit because every loaded model is busy or
+        still starting.
+        """
+        while self._over_budget(incoming):
+            # Models with requests in flight, or about to get them, are pinned
+            candidates = OrderedDict(
+                (key, pool) for key, pool in self.models.items() if pool.in_flight == 0 and key not in self._waiters
+            )
+            victim = self.eviction_policy.choose_victim(candidates)
+            if victim is None:
+                # A model bigger than the whole budget still loads, on its own
+                return not self.models and not self._starting - {incoming}
+            victim_runtime = self.models.pop(victim)
+            self.eviction_policy.record_eviction(victim)
+            MODEL_EVICTIONS.inc(model=victim)
+            logging.info(f"Cache full, unloading model {victim}")
+            await victim_runtime.stop()
+        return True
+
+    async def _make_room(self, key: str, incoming):
+        """
+        Evict for incoming before it starts, since starting over the budget is
+        when memory runs out. Busy and starting models are waited on for up to
+        model_load_wait seconds, then the load fails with ModelCacheFullError.
+        """
+        deadline = time.monotonic() + config.get("model_load_wait", 10)
+        while not await self._evict_for(incoming):
+            if time.monotonic() >= deadline:
+                logging.warning(f"No room to load model {key}: every loaded model is busy")
+                raise ModelCacheFullError(key, 1)
+            await asyncio.sleep(0.05)
+        self._starting.add(incoming)
     
     async def load_model(self, src: str, tgt: str):
         key = self._make_model_key(src, tgt)
         # Return from cache if already loaded
         if key in self.models:
             self.models.move_to_end(key)
+            self.eviction_policy.record_hit(key)
             return self.models[key]
         
+        # Single flight: only the first miss starts a decoder, the rest wait for it
+        load = self._loading.get(key)
+        if load is None:
+            load = asyncio.ensure_future(self._load(key))
+            self._loading[key] = load
+            load.add_done_callback(lambda _: self._loading.pop(key, None))
+        # Shielded so one caller giving up doesn't cancel the load for everyone
+        self._waiters[key] += 1
+        try:
+            runtime = await asyncio.shield(load)
+        except asyncio.CancelledError:
+            if not load.cancelled():
+                raise
+            # The load itself was cancelled by clear_cache
+            raise ModelUnloadedError(f"Model {key} was unloaded while loading") from None
+        finally:
+            self._waiters[key] -= 1
+            if not self._waiters[key]:
+                del self._waiters[key]
+        self.eviction_policy.record_hit(key)
+        return runtime
+
+    async def _load(self, key: str):
         logging.info(f"Loading model {key}")
 
-        async with self.load_semaphore:
-            # Offload blocking model load to a thread
-            model_dir = os.path.join("app", "models", key)
-            if not os.path.exists(model_dir):
+        async with self.load_queue.slot():
+            LOAD_QUEUE_WAIT.observe(self.load_queue.last_wait)
+            # Re-index the directory on every (re)load; its files may have been replaced
+            entry = self.registry.refresh(key, checksums=False)
+            if entry is None:
+                model_dir = os.path.join(self.models_dir, key)
                 logging.error(f"Model directory not found: {model_dir}")
                 raise FileNotFoundError(f"Model directory not found: {model_dir}")
-            
-            # Create runtime
-            runtime = MarianRuntime(model_dir)
-            
-            # Initialize runtime (this will validate the model files)
+            runtime = self._create_pool(key, entry)
+            await self._make_room(key, runtime)
+
             try:
-                await runtime.start()
-                logging.info(f"Model {key} loaded successfully")
-            except Exception as e:
-                logging.error(f"Failed to load model {key}: {str(e)}")
+                # Initialize runtime (this will validate the model files)
+                try:
+                    started = time.monotonic()
+                    await runtime.start()
+                    load_seconds = time.monotonic() - started
+                    self.eviction_policy.record_load(key, load_seconds)
+                    MODEL_LOAD_TIME.observe(load_seconds, model=key)
+                    MODEL_LOADS.inc(model=key)
+                    logging.info(f"Model {key} loaded successfully")
+                except Exception as e:
+                    logging.error(f"Failed to load model {key}: {str(e)}")
+                    raise
+
+                # Measured memory may exceed the estimate room was made for
+                if not await self._evict_for(runtime):
+                    logging.warning(f"Model {key} is over the memory budget but every loaded model is busy")
+            except asyncio.CancelledError:
+                # Cleared while loading; don't leave its decoders running
+                await runtime.stop()
                 raise
+            finally:
+                self._starting.discard(runtime)
 
-            if len(self.models) >= self.cache_size:
-                oldest_key = next(iter(self.models))  # Get just the first key
-                oldest_runtime = self.models.pop(oldest_key)
-                logging.info(f"Cache full, unloading model {oldest_key}")
-                await oldest_runtime.stop()
-            
             # Add to cache
             self.models[key] = runtime
             return runtime
     
+    def _create_pool(self, key: str, entry: dict):
+        settings = replica_settings(key)
+        return RuntimePool(
+            entry["dir"],
+            min_replicas=settings["min"],
+            max_replicas=settings["max"],
+            cpu_threads=settings["cpu_threads"],
+            has_capacity=self._has_replica_capacity,
+            artifacts=entry,
+        )
+
+    async def reload_model(self, key: str):
+        """
+        Swap a loaded model for its updated files without dropping requests:
+        the new replicas start first, new requests go to them, and the old
+        ones are stopped once their queued requests are answered.
+        """
+        old = self.models.get(key)
+        entry = self.registry.get(key)
+        if old is None or entry is None:
+            return
+        if config.get("prewarm_models", True):
+            await asyncio.to_thread(self.registry.prewarm, [key])
+        new = self._create_pool(key, entry)
+        try:
+            await new.start()
+        except Exception as e:
+            logging.error(f"Could not start updated model {key}, keeping the old one: {str(e)}")
+            return
+        if self.models.get(key) is not old:
+            # Unloaded or reloaded meanwhile
+            await new.stop()
+            return
+        self.models[key] = new
+        MODEL_LOADS.inc(model=key)
+        logging.info(f"Model {key} swapped for its updated version")
+
+        deadline = time.monotonic() + config.get("decode_timeout", 120)
+        while old.in_flight and time.monotonic() < deadline:
+            await asyncio.sleep(0.1)
+        await old.stop()
+
+    async def scan_models(self):
+        """Index the models directory and swap in any loaded model whose files changed"""
+        changed = await asyncio.to_thread(self.registry.scan)
+        for key in changed:
+            if key in self.models:
+                await self.reload_model(key)
+
+    async def watch_models(self, interval: float = None):
+        """Index the models now, then again every interval seconds if one is given"""
+        while True:
+            try:
+                await self.scan_models()
+            except Exception as e:
+                logging.error(f"Checking for model updates failed: {str(e)}")
+            if interval is None:
+                return
+            await asyncio.sleep(interval)
+
+    async def start_up(self, preload: bool = True):
+        """
+        List the models, index and watch them in the background and warm the cache.
+
+        Hashing multi-GB model files can take minutes, so preloading works
+        from the directory listing (with checksums from the manifest where
+        files are unchanged) instead of waiting for the full scan.
+        """
+        try:
+            await asyncio.to_thread(self.registry.list_models)
+        except Exception as e:
+            logging.error(f"Listing models failed: {str(e)}")
+        if self._watch_task is None:
+            interval = config.get("model_update_interval", 86400) if config.get("auto_update_models", False) else None
+            self._watch_task = asyncio.create_task(self.watch_models(interval))
+        if preload:
+            await self.preload()
+
+    def _spawn(self, coro):
+        """Run coro in the background, keeping it referenced until it finishes"""
+        task = asyncio.ensure_future(coro)
+        self._background.add(task)
+        task.add_done_callback(self._background_done)
+        return task
+
+    def _background_done(self, task):
+        self._background.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logging.warning(f"Background model task failed: {str(task.exception())}")
+
+    async def shut_down(self):
+        """Stop watching for model updates and cancel prefetches and prewarms"""
+        tasks = list(self._background)
+        if self._watch_task is not None:
+            tasks.append(self._watch_task)
+            self._watch_task = None
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+
     async def unload_model(self, src: str, tgt: str):
         """Unload a model from cache"""
         key = self._make_model_key(src, tgt)
@@ -64,12 +303,18 @@ class ModelLoader:
         return False
     
     async def clear_cache(self):
-        """Clear all models from cache"""
-        for key, runtime in self.models.items():
+        """Clear all models from cache, including those still loading"""
+        loading = list(self._loading.values())
+        for load in loading:
+            load.cancel()
+        if loading:
+            await asyncio.gather(*loading, return_exceptions=True)
+
+        # Stop a snapshot: loads and reloads may touch self.models while we wait
+        models, self.models = self.models, OrderedDict()
+        for key, runtime in models.items():
             logging.info(f"Stopping model {key}")
             await runtime.stop()
-        
-        self.models.clear()
         logging.info("Model cache cleared")
 
     def get_status(self):
@@ -79,11 +324,88 @@ class ModelLoader:
                 "model_key": key,
                 "source_lang": key.split("-")[0],
                 "target_lang": key.split("-")[1],
-                "loaded_at": datetime.now().isoformat() if hasattr(runtime, "loaded_at") else None
+                "loaded_at": runtime.loaded_at,
+                "replicas": runtime.size,
+                "memory_bytes": runtime.memory_bytes(),
+                **runtime.stats(),
             }
             for key, runtime in reversed(self.models.items())
         ]
-    
-    
+
+    def load_stats(self):
+        """Loads in progress and admission queue wait times"""
+        return {"loading": sorted(self._loading), **self.load_queue.stats()}
+
+    def record_request(self, src: str, tgt: str):
+        """Note a request for a pair and warm up the pair that usually comes next"""
+        key = self._make_model_key(src, tgt)
+        self.history.record(key)
+        likely = self.history.likely_next(key, config.get("prefetch_min_share", 0.5))
+        if likely is not None and likely not in self.models:
+            self.prefetch(*likely.split("-", 1), evict=False)
+
+    def prefetch(self, src: str, tgt: str, evict: bool = True):
+        """
+        Start loading a model in the background.
+
+        With evict=False the model is only loaded into free cache capacity, so a
+        guess never pushes out a model that is actually in use.
+        """
+        key = self._make_model_key(src, tgt)
+        if key in self.models or key in self._loading or key in self._prefetching:
+            return
+        if not evict and self.replica_count() + replica_settings(key)["min"] > self.cache_size:
+            return
+
+        async def load():
+            try:
+                if self.should_host is not None and not await self.should_host(key):
+                    return
+                await self.load_model(src, tgt)
+            except Exception as e:
+                logging.warning(f"Prefetch of model {key} failed: {str(e)}")
+            finally:
+                self._prefetching.discard(key)
+
+        self._prefetching.add(key)
+        self._spawn(load())
+
+    async def preload(self):
+        """Warm the cache with the configured models and the learned hot set"""
+        path = config.get("hot_set_file")
+        if path:
+            self.history.load(path)
+
+        keys = list(config.get("preload_models", []))
+        keys += self.history.hot_set(config.get("hot_set_size", self.cache_size))
+        keys = [key for key in dict.fromkeys(keys) if self.registry.get(key) is not None]
+        if config.get("prewarm_models", True):
+            # Read the model files ahead of the decoders, so each load after
+            # the first finds its weights in the page cache
+            fitting, budget = [], self.cache_size
+            for key in keys:
+                if replica_settings(key)["min"] <= budget:
+                    fitting.append(key)
+                    budget -= replica_settings(key)["min"]
+            self._spawn(asyncio.to_thread(self.registry.prewarm, fitting))
+
+        budget = self.cache_size
+        for key in keys:
+            needed = replica_settings(key)["min"]
+            if needed > budget:
+                continue
+            try:
+                if self.should_host is not None and not await self.should_host(key):
+                    continue
+                await self.load_model(*key.split("-", 1))
+                budget -= needed
+            except Exception as e:
+                logging.warning(f"Preloading model {key} failed: {str(e)}")
+
+    def save_history(self):
+        path = config.get("hot_set_file")
+        if path:
+            self.history.save(path)
+
+
 model_loader = ModelLoader()
-    
\ No newline at end of file
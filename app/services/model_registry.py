@@ -0,0 +1,244 @@
+# app/services/model_registry.py
+import hashlib
+import json
+import logging
+import mmap
+import os
+import tempfile
+from app.config import config, CONFIG_PATH
+
+# Relative paths in config.json are relative to the project, not the working directory
+PROJECT_ROOT = str(CONFIG_PATH.parent)
+
+def resolve_models_dir(models_dir: str = None) -> str:
+    models_dir = models_dir or config.get("models_dir", os.path.join("app", "models"))
+    return models_dir if os.path.isabs(models_dir) else os.path.join(PROJECT_ROOT, models_dir)
+
+def _sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(1024 * 1024):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def describe_model_dir(model_dir: str, previous: dict = None, checksums: bool = False) -> dict:
+    """
+    The files of one model directory and what each is for.
+
+    Returns {"dir", "files": {name: {"size", "mtime_ns", "sha256"}}, "model",
+    "vocab", "decoder_config", "source_spm", "target_spm", "version"}; roles
+    without a file are None. Checksums are carried over from previous for
+    files whose size and mtime are unchanged, and otherwise only computed
+    when checksums is set.
+    """
+    old_files = (previous or {}).get("files", {})
+    files = {}
+    entry = {"dir": model_dir, "files": files, "model": None, "vocab": None, "decoder_config": None,
+             "source_spm": None, "target_spm": None}
+    for name in sorted(os.listdir(model_dir)):
+        path = os.path.join(model_dir, name)
+        if not os.path.isfile(path):
+            continue
+        stat = os.stat(path)
+        info = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "sha256": None}
+        old = old_files.get(name)
+        if old and (old["size"], old["mtime_ns"]) == (info["size"], info["mtime_ns"]):
+            info["sha256"] = old.get("sha256")
+        if info["sha256"] is None and checksums:
+            info["sha256"] = _sha256(path)
+        files[name] = info
+
+        if name.endswith(".npz"):
+            entry["model"] = path
+        elif name.endswith(".yml") and "vocab" in name:
+            entry["vocab"] = path
+        elif name.endswith(".yml") and "decoder" in name:
+            entry["decoder_config"] = path
+        elif name == "source.spm":
+            entry["source_spm"] = path
+        elif name == "target.spm":
+            entry["target_spm"] = path
+
+    # Content-based once the checksum is known, so touching a file doesn't change it
+    model = files.get(os.path.basename(entry["model"])) if entry["model"] else None
+    if model is None:
+        entry["version"] = None
+    elif model["sha256"]:
+        entry["version"] = model["sha256"][:16]
+    else:
+        entry["version"] = f"{os.path.basename(entry['model'])}@{model['size']}@{model['mtime_ns']}"
+    return entry
+
+def _changed(old: dict, new: dict) -> bool:
+    """Whether a model's files differ in content (or, without checksums, in size or mtime)"""
+    old_files, new_files = old["files"], new["files"]
+    if old_files.keys() != new_files.keys():
+        return True
+    for name, a in old_files.items():
+        b = new_files[name]
+        if (a["size"], a["mtime_ns"]) != (b["size"], b["mtime_ns"]) and (not a["sha256"] or a["sha256"] != b["sha256"]):
+            return True
+    return False
+
+def prewarm(path: str) -> int:
+    """Read a file into the page cache through mmap so the next open is served from memory"""
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if not size:
+            return 0
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            if hasattr(mapped, "madvise"):
+                mapped.madvise(mmap.MADV_WILLNEED)
+            for offset in range(0, size, mmap.PAGESIZE):
+                mapped[offset]
+    return size
+
+class ModelRegistry:
+    """
+    Index of the model directories under models_dir.
+
+    A scan lists every "src-tgt" directory once and records its files' sizes,
+    mtimes and SHA-256 checksums in a JSON manifest (model_manifest). On the
+    next start the manifest is validated against the disk: unchanged files
+    keep their checksums, so only new or modified files are hashed. Runtimes
+    take their file paths from the index instead of listing directories on
+    every start.
+    """
+
+    def __init__(self, models_dir: str = None, manifest_path: str = None):
+        self.models_dir = resolve_models_dir(models_dir)
+        self.manifest_path = manifest_path if manifest_path is not None else config.get("model_manifest", "model_manifest.json")
+        self.entries = {}  # key -> describe_model_dir() result
+        self.scanned = False
+        self.listed = False
+        self.updates = 0
+        # Bumped whenever the set of models may have changed, so indexes built on it know to rebuild
+        self.generation = 0
+
+    def _read_manifest(self) -> dict:
+        if not self.manifest_path:
+            return {}
+        try:
+            with open(self.manifest_path, "r") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            logging.warning(f"Could not read model manifest {self.manifest_path}: {str(e)}")
+            return {}
+        if data.get("models_dir") != self.models_dir:
+            return {}
+        return data.get("models", {})
+
+    def _write_manifest(self):
+        if not self.manifest_path:
+            return
+        directory = os.path.dirname(os.path.abspath(self.manifest_path))
+        try:
+            fd, tmp = tempfile.mkstemp(dir=directory, prefix=".manifest-")
+            with os.fdopen(fd, "w") as f:
+                json.dump({"models_dir": self.models_dir, "models": self.entries}, f, indent=1)
+            os.replace(tmp, self.manifest_path)
+        except OSError as e:
+            logging.warning(f"Could not write model manifest {self.manifest_path}: {str(e)}")
+
+    def scan(self):
+        """
+        Index every model directory, hashing files that are new or changed.
+        Returns the keys whose files changed since they were last indexed.
+        """
+        previous = self.entries if self.scanned else {**self._read_manifest(), **self.entries}
+        entries = {}
+        try:
+            names = sorted(os.listdir(self.models_dir))
+        except OSError as e:
+            logging.error(f"Could not list models directory {self.models_dir}: {str(e)}")
+            names = []
+        for name in names:
+            model_dir = os.path.join(self.models_dir, name)
+            if "-" not in name or not os.path.isdir(model_dir):
+                continue
+            try:
+                entries[name] = describe_model_dir(model_dir, previous.get(name), checksums=True)
+            except OSError as e:
+                logging.warning(f"Could not index model {name}: {str(e)}")
+                continue
+            if not entries[name]["model"] and not entries[name]["source_spm"]:
+                logging.warning(f"Model directory {name} has no model file")
+
+        changed = [key for key, entry in entries.items() if key in previous and _changed(previous[key], entry)]
+        for key in changed:
+            logging.info(f"Model {key} changed on disk")
+        self.entries = entries
+        self.scanned = True
+        self.generation += 1
+        self.updates += len(changed)
+        self._write_manifest()
+        logging.info(f"Indexed {len(entries)} models in {self.models_dir}")
+        return changed
+
+    def list_models(self):
+        """
+        Model keys with a model file. Until the first scan has run, the
+        directories are listed without hashing, with checksums taken from
+        the manifest where it still matches.
+        """
+        if not self.scanned and not self.listed:
+            manifest = self._read_manifest()
+            try:
+                names = sorted(os.listdir(self.models_dir))
+            except OSError as e:
+                logging.error(f"Could not list models directory {self.models_dir}: {str(e)}")
+                names = []
+            for name in names:
+                model_dir = os.path.join(self.models_dir, name)
+                if "-" in name and name not in self.entries and os.path.isdir(model_dir):
+                    try:
+                        self.entries[name] = describe_model_dir(model_dir, manifest.get(name))
+                    except OSError as e:
+                        logging.warning(f"Could not index model {name}: {str(e)}")
+            self.listed = True
+            self.generation += 1
+        return [key for key, entry in self.entries.items() if entry["model"]]
+
+    def get(self, key: str):
+        """Index entry for a model pair, or None if it has no directory"""
+        entry = self.entries.get(key)
+        if entry is None:
+            entry = self.refresh(key, checksums=False)
+        return entry
+
+    def refresh(self, key: str, checksums: bool = True):
+        """Re-index one model directory (its files may have been replaced since the last scan)"""
+        model_dir = os.path.join(self.models_dir, key)
+        old = self.entries.get(key)
+        if not os.path.isdir(model_dir):
+            if self.entries.pop(key, None) is not None:
+                self.generation += 1
+            return None
+        entry = describe_model_dir(model_dir, old, checksums=checksums)
+        self.entries[key] = entry
+        if old is None or old["model"] != entry["model"]:
+            self.generation += 1
+        return entry
+
+    def prewarm(self, keys) -> int:
+        """Pull the model files of keys into the page cache; returns bytes read"""
+        total = 0
+        for key in keys:
+            entry = self.get(key)
+            if entry is None or not entry["model"]:
+                continue
+            try:
+                total += prewarm(entry["model"])
+            except (OSError, ValueError) as e:
+                logging.warning(f"Could not prewarm model {key}: {str(e)}")
+        return total
+
+    def stats(self) -> dict:
+        return {
+            "models_dir": self.models_dir,
+            "indexed": len(self.entries),
+            "scanned": self.scanned,
+            "updates": self.updates,
+        }
@@ -0,0 +1,373 @@
+# app/services/placement.py
+import asyncio
+import json
+import logging
+import os
+import socket
+import tempfile
+import time
+from contextlib import contextmanager
+from app.config import config
+from app.services.rate_limit import QueueFullError, request_priority
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+# Idle connections kept open to each peer for the next forwarded leg
+MAX_IDLE_CONNECTIONS = 16
+
+class PeerUnavailableError(Exception):
+    """A worker listed in the registry could not be reached"""
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+class PlacementRegistry:
+    """
+    Which worker hosts which model pair, kept in a JSON file shared by every
+    worker and guarded by an flock. Workers publish their models on a
+    heartbeat; entries that stop updating, or whose process is gone, are
+    dropped. A worker about to load a pair nobody hosts first claims it, so
+    two workers don't load the same model at once.
+    """
+
+    def __init__(self, path: str, ttl: float = 10, claim_ttl: float = 120):
+        self.path = path
+        self.ttl = ttl
+        self.claim_ttl = claim_ttl
+
+    @contextmanager
+    def _locked(self):
+        with open(self.path + ".lock", "a+") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def _read(self) -> dict:
+        try:
+            with open(self.path, "r") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            data = {}
+        except (OSError, ValueError) as e:
+            logging.warning(f"Could not read placement registry {self.path}: {str(e)}")
+            data = {}
+        data.setdefault("workers", {})
+        data.setdefault("claims", {})
+        return data
+
+    def _write(self, data: dict):
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, tmp = tempfile.mkstemp(dir=directory, prefix=".placement-")
+        with os.fdopen(fd, "w") as f:
+            json.dump(data, f)
+        os.replace(tmp, self.path)
+
+    def _prune(self, data: dict, now: float):
+        node = socket.gethostname()
+        for worker_id, worker in list(data["workers"].items()):
+            stale = now - worker.get("updated", 0) > self.ttl
+            dead = worker.get("node") == node and not _pid_alive(worker.get("pid", 0))
+            if stale or dead:
+                del data["workers"][worker_id]
+        for key, claim in list(data["claims"].items()):
+            if claim["worker"] not in data["workers"] or now - claim["at"] > self.claim_ttl:
+                del data["claims"][key]
+
+    def publish(self, worker_id: str, info: dict) -> dict:
+        """Record this worker's models; returns the whole registry"""
+        with self._locked():
+            now = time.time()
+            data = self._read()
+            data["workers"][worker_id] = dict(info, updated=now)
+            self._prune(data, now)
+            # A claim is settled once its model shows up as hosted
+            for key in info.get("models", {}):
+                if data["claims"].get(key, {}).get("worker") == worker_id:
+                    del data["claims"][key]
+            self._write(data)
+            return data
+
+    def claim(self, worker_id: str, key: str):
+        """
+        Claim key for worker_id, or return the id of the worker that already
+        hosts or claimed it (the least busy one if several host it).
+        """
+        with self._locked():
+            now = time.time()
+            data = self._read()
+            self._prune(data, now)
+            hosts = [
+                (sum(worker["models"].values()), other) for other, worker in data["workers"].items()
+                if other != worker_id and key in worker.get("models", {})
+            ]
+            if hosts:
+                return min(hosts)[1]
+            claim = data["claims"].get(key)
+            if claim is not None and claim["worker"] != worker_id:
+                return claim["worker"]
+            data["claims"][key] = {"worker": worker_id, "at": now}
+            self._write(data)
+            return None
+
+    def remove(self, worker_id: str):
+        with self._locked():
+            data = self._read()
+            data["workers"].pop(worker_id, None)
+            for key, claim in list(data["claims"].items()):
+                if claim["worker"] == worker_id:
+                    del data["claims"][key]
+            self._write(data)
+
+    def snapshot(self) -> dict:
+        with self._locked():
+            data = self._read()
+            self._prune(data, time.time())
+            return data
+
+class Coordinator:
+    """
+    Places model pairs on one worker each and forwards legs to their host.
+
+    Disabled unless placement_registry is set. Each worker listens on a Unix
+    socket (or on placement_address, host:port, to reach workers on other
+    nodes through a shared registry file) for forwarded legs, one JSON line
+    per request and per reply. The port has no authentication: without a
+    host it only listens on 127.0.0.1. Connections to peers are kept open
+    and reused, one leg at a time each.
+    """
+
+    def __init__(self):
+        path = config.get("placement_registry")
+        self.enabled = bool(path) and fcntl is not None
+        if path and fcntl is None:
+            logging.warning("Model placement needs flock, which this platform lacks; running standalone")
+        self.registry = PlacementRegistry(
+            path or "", ttl=config.get("placement_ttl", 10), claim_ttl=config.get("placement_claim_ttl", 120)
+        )
+        self.heartbeat = config.get("placement_heartbeat", 2)
+        self.forward_timeout = config.get("placement_forward_timeout", 180)
+        self.worker_id = None
+        self.address = None
+        self.view = {"workers": {}, "claims": {}}
+        self.forwarded = 0
+        self.served = 0
+        self._loader = None
+        self._handler = None
+        self._server = None
+        self._heartbeat_task = None
+        self._idle = {}  # peer address -> [(reader, writer)] free for the next leg
+        self._clients = set()  # writers of connections peers keep open to this worker
+
+    async def start(self, loader, handler):
+        """Listen for forwarded legs, answered by handler(src, tgt, text), and join the registry"""
+        if not self.enabled:
+            return
+        self._loader = loader
+        self._handler = handler
+        loader.should_host = self.should_host
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        listen = config.get("placement_address")
+        if listen:
+            host, _, port = listen.rpartition(":")
+            # Anyone who can reach the port can use this worker's models; all
+            # interfaces only when asked for explicitly
+            host = host or "127.0.0.1"
+            self._server = await asyncio.start_server(self._serve, host, int(port))
+            port = self._server.sockets[0].getsockname()[1]
+            self.address = f"{socket.gethostname() if host == '0.0.0.0' else host}:{port}"
+        else:
+            socket_dir = config.get("placement_socket_dir") or os.path.dirname(os.path.abspath(self.registry.path))
+            self.address = os.path.join(socket_dir, f"fluentai-{os.getpid()}.sock")
+            if os.path.exists(self.address):
+                os.unlink(self.address)
+            self._server = await asyncio.start_unix_server(self._serve, self.address)
+        await self.publish()
+        self._heartbeat_task = asyncio.create_task(self._heartbeat_loop())
+        logging.info(f"Worker {self.worker_id} joined model placement at {self.address}")
+
+    async def stop(self):
+        if not self.enabled or self._server is None:
+            return
+        if self._heartbeat_task is not None:
+            self._heartbeat_task.cancel()
+        for address in list(self._idle):
+            self._close_idle(address)
+        self._server.close()
+        # Peers keep idle connections open; wait_closed would wait for them
+        for writer in list(self._clients):
+            writer.close()
+        await self._server.wait_closed()
+        await asyncio.to_thread(self.registry.remove, self.worker_id)
+        if not config.get("placement_address") and os.path.exists(self.address):
+            os.unlink(self.address)
+        self._server = None
+
+    def _hosted(self) -> dict:
+        return {key: pool.in_flight for key, pool in self._loader.models.items()}
+
+    async def publish(self):
+        info = {
+            "address": self.address,
+            "node": socket.gethostname(),
+            "pid": os.getpid(),
+            "models": self._hosted(),
+        }
+        self.view = await asyncio.to_thread(self.registry.publish, self.worker_id, info)
+
+    async def _heartbeat_loop(self):
+        while True:
+            await asyncio.sleep(self.heartbeat)
+            try:
+                await self.publish()
+            except Exception as e:
+                logging.error(f"Could not publish model placement: {str(e)}")
+
+    async def route(self, key: str):
+        """Address of the worker that should decode key, or None to decode it here"""
+        if self._server is None or key in self._loader.models or key in self._loader._loading:
+            return None
+        # The last heartbeat's view answers most lookups without touching the file
+        hosts = [
+            (sum(worker["models"].values()), worker["address"]) for worker_id, worker in self.view["workers"].items()
+            if worker_id != self.worker_id and key in worker.get("models", {})
+        ]
+        if hosts:
+            return min(hosts)[1]
+        owner = await asyncio.to_thread(self.registry.claim, self.worker_id, key)
+        if owner is None:
+            return None
+        worker = self.view["workers"].get(owner)
+        if worker is None:
+            # Joined since our last heartbeat
+            self.view = await asyncio.to_thread(self.registry.snapshot)
+            worker = self.view["workers"].get(owner)
+        return worker["address"] if worker else None
+
+    async def should_host(self, key: str) -> bool:
+        """Whether this worker should load key ahead of requests (preloading, prefetching)"""
+        return await self.route(key) is None
+
+    def forget(self, address: str):
+        """Drop an unreachable worker from the local view until its next heartbeat"""
+        self._close_idle(address)
+        for worker_id, worker in list(self.view["workers"].items()):
+            if worker.get("address") == address:
+                del self.view["workers"][worker_id]
+
+    def _close_idle(self, address: str):
+        for _, writer in self._idle.pop(address, []):
+            writer.close()
+
+    async def _connect(self, address: str):
+        try:
+            if os.sep in address:
+                return await asyncio.open_unix_connection(address)
+            host, _, port = address.rpartition(":")
+            return await asyncio.open_connection(host, int(port))
+        except OSError as e:
+            raise PeerUnavailableError(f"Worker at {address} is unreachable: {str(e)}")
+
+    async def forward(self, address: str, source_lang: str, target_lang: str, text: str) -> str:
+        """Have the worker at address decode one leg"""
+        request = {"src": source_lang, "tgt": target_lang, "text": text, "priority": request_priority.get()}
+        payload = (json.dumps(request, ensure_ascii=False) + "\n").encode("utf-8")
+        for attempt in range(2):
+            idle = self._idle.get(address)
+            reused = bool(idle)
+            reader, writer = idle.pop() if reused else await self._connect(address)
+            line, error = None, None
+            try:
+                writer.write(payload)
+                await writer.drain()
+                line = await asyncio.wait_for(reader.readline(), timeout=self.forward_timeout)
+            except (OSError, asyncio.TimeoutError) as e:
+                error = e
+            finally:
+                if not line:
+                    # Failed, timed out or cancelled: the reply may still arrive, so never reuse it
+                    writer.close()
+            if line:
+                break
+            # A reused connection may have been closed by the peer while idle; try a fresh one
+            if reused and not isinstance(error, asyncio.TimeoutError):
+                continue
+            if error is not None:
+                raise PeerUnavailableError(f"Worker at {address} did not answer: {str(error)}")
+            raise PeerUnavailableError(f"Worker at {address} closed the connection")
+        else:
+            raise PeerUnavailableError(f"Worker at {address} keeps closing connections")
+
+        idle = self._idle.setdefault(address, [])
+        if len(idle) < MAX_IDLE_CONNECTIONS:
+            idle.append((reader, writer))
+        else:
+            writer.close()
+
+        self.forwarded += 1
+        reply = json.loads(line)
+        if "result" in reply:
+            return reply["result"]
+        if reply.get("kind") == "QueueFullError":
+            raise QueueFullError(f"{source_lang}-{target_lang}", reply.get("retry_after", 1))
+        if reply.get("kind") == "FileNotFoundError":
+            raise FileNotFoundError(reply["error"])
+        raise RuntimeError(reply["error"])
+
+    async def _serve(self, reader, writer):
+        self._clients.add(writer)
+        try:
+            while line := await reader.readline():
+                request = json.loads(line)
+                request_priority.set(request.get("priority", 0))
+                try:
+                    reply = {"result": await self._handler(request["src"], request["tgt"], request["text"])}
+                except Exception as e:
+                    reply = {"error": str(e), "kind": e.__class__.__name__,
+                             "retry_after": getattr(e, "retry_after", None)}
+                self.served += 1
+                writer.write((json.dumps(reply, ensure_ascii=False) + "\n").encode("utf-8"))
+                await writer.drain()
+        except (ConnectionError, ValueError) as e:
+            logging.warning(f"Dropped a placement connection: {str(e)}")
+        finally:
+            self._clients.discard(writer)
+            writer.close()
+
+    def status(self) -> dict:
+        if not self.enabled:
+            return {"enabled": False}
+        placement = {}
+        for worker_id, worker in self.view["workers"].items():
+            for key in worker.get("models", {}):
+                placement.setdefault(key, []).append(worker_id)
+        return {
+            "enabled": True,
+            "worker": self.worker_id,
+            "workers": {
+                worker_id: {
+                    "address": worker.get("address"),
+                    "node": worker.get("node"),
+                    "pid": worker.get("pid"),
+                    "models": sorted(worker.get("models", {})),
+                    "in_flight": sum(worker.get("models", {}).values()),
+                }
+                for worker_id, worker in self.view["workers"].items()
+            },
+            "placement": placement,
+            "claims": {key: claim["worker"] for key, claim in self.view["claims"].items()},
+            "forwarded": self.forwarded,
+            "served": self.served,
+        }
+
+coordinator = Coordinator()
@@ -0,0 +1,72 @@
+# app/services/prefetch.py
+import json
+import logging
+from collections import Counter, defaultdict
+
+class RequestHistory:
+    """Counts which model pairs are requested and which pair tends to follow which"""
+
+    def __init__(self, max_total: int = 100000):
+        self.counts = Counter()
+        self.transitions = defaultdict(Counter)  # key -> Counter of the keys requested next
+        self.last_key = None
+        # Counts are halved past this total so old traffic fades out
+        self.max_total = max_total
+        self._total = 0
+
+    def record(self, key: str):
+        self.counts[key] += 1
+        self._total += 1
+        if self.last_key is not None and self.last_key != key:
+            self.transitions[self.last_key][key] += 1
+        self.last_key = key
+        if self._total > self.max_total:
+            self._decay()
+
+    def _decay(self):
+        for counter in [self.counts, *self.transitions.values()]:
+            for key in list(counter):
+                counter[key] //= 2
+                if not counter[key]:
+                    del counter[key]
+        self._total = sum(self.counts.values())
+
+    def hot_set(self, size: int):
+        """Most requested keys, most popular first"""
+        return [key for key, _ in self.counts.most_common(size)]
+
+    def likely_next(self, key: str, min_share: float = 0.5):
+        """The key that usually follows key, if it does so often enough to be worth loading"""
+        followers = self.transitions.get(key)
+        if not followers:
+            return None
+        candidate, count = followers.most_common(1)[0]
+        if count / sum(followers.values()) < min_share:
+            return None
+        return candidate
+
+    def save(self, path: str):
+        data = {
+            "counts": dict(self.counts),
+            "transitions": {key: dict(counter) for key, counter in self.transitions.items()},
+        }
+        try:
+            with open(path, "w") as f:
+                json.dump(data, f)
+        except OSError as e:
+            logging.warning(f"Could not save request history to {path}: {str(e)}")
+
+    def load(self, path: str):
+        try:
+            with open(path, "r") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            logging.warning(f"Could not read request history from {path}: {str(e)}")
+            return
+        self.counts = Counter(data.get("counts", {}))
+        self.transitions = defaultdict(Counter, {
+            key: Counter(followers) for key, followers in data.get("transitions", {}).items()
+        })
+        self._total = sum(self.counts.values())
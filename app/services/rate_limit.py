@@ -0,0 +1,99 @@
+# app/services/rate_limit.py
+import math
+import time
+from contextvars import ContextVar
+from app.config import config
+
+# Priority classes; lower values are decoded first
+INTERACTIVE = 0
+BULK = 1
+PRIORITIES = {"interactive": INTERACTIVE, "bulk": BULK}
+
+# Priority of the request being handled; tasks spawned for it inherit the value
+request_priority = ContextVar("request_priority", default=INTERACTIVE)
+
+class RateLimitedError(Exception):
+    """A client has used up its request allowance"""
+
+    def __init__(self, client: str, retry_after: int):
+        super().__init__(f"Rate limit exceeded for {client}")
+        self.retry_after = retry_after
+
+class RequestTooLargeError(Exception):
+    """A single request costs more than a client's whole burst, so it can never be admitted"""
+
+    def __init__(self, cost: float, burst: float):
+        super().__init__(f"Request costs {cost:g} against a rate limit burst of {burst:g}; split it into smaller requests")
+
+class QueueFullError(Exception):
+    """A model's request queue is at its limit; the caller should back off"""
+
+    def __init__(self, model_key: str, retry_after: int):
+        super().__init__(f"Model {model_key} is busy, try again later")
+        self.retry_after = retry_after
+
+class TokenBucket:
+    """Allows rate requests per second on average, with bursts of up to burst"""
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+    def take(self, cost: float = 1.0) -> float:
+        """Take cost tokens; returns 0 on success, otherwise seconds until they are available"""
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= cost:
+            self.tokens -= cost
+            return 0.0
+        return (cost - self.tokens) / self.rate
+
+class RateLimiter:
+    """One token bucket per client, from rate_limit (requests per minute) and rate_limit_burst"""
+
+    def __init__(self, per_minute: float = None, burst: float = None, max_clients: int = 10000):
+        self.per_minute = per_minute if per_minute is not None else config.get("rate_limit", 100)
+        self.burst = burst if burst is not None else config.get("rate_limit_burst", self.per_minute)
+        self.max_clients = max_clients
+        self.buckets = {}
+        self.rejected = 0
+
+    def check(self, client: str, cost: float = 1.0):
+        """
+        Charge a request to client, raising RateLimitedError if it is over its
+        limit, or RequestTooLargeError if cost exceeds the burst
+        """
+        if not self.per_minute:
+            return
+        if cost > max(self.burst, 1):
+            self.rejected += 1
+            raise RequestTooLargeError(cost, max(self.burst, 1))
+        bucket = self.buckets.get(client)
+        if bucket is None:
+            if len(self.buckets) >= self.max_clients:
+                self._forget_idle()
+            bucket = self.buckets[client] = TokenBucket(self.per_minute / 60, max(self.burst, 1))
+        wait = bucket.take(cost)
+        if wait:
+            self.rejected += 1
+            raise RateLimitedError(client, max(1, math.ceil(wait)))
+
+    def _forget_idle(self):
+        # Buckets that have refilled completely carry no state worth keeping
+        now = time.monotonic()
+        for client, bucket in list(self.buckets.items()):
+            if bucket.tokens + (now - bucket.updated) * bucket.rate >= bucket.burst:
+                del self.buckets[client]
+
+    def stats(self) -> dict:
+        return {
+            "per_minute": self.per_minute,
+            "burst": self.burst,
+            "clients": len(self.buckets),
+            "rejected": self.rejected,
+        }
+
+rate_limiter = RateLimiter()
@@ -0,0 +1,119 @@
+# app/services/routing.py
+import logging
+from collections import defaultdict
+from app.config import config
+from app.services.model_loader import model_loader
+from app.services.model_registry import ModelRegistry
+
+class ModelGraph:
+    """
+    Language pairs with a model file, as a directed graph of languages.
+
+    Built from the model registry's index and rebuilt when the registry
+    reports a change (a scan, or a model directory found or removed), so
+    the directory is never listed again just to plan a route.
+    """
+
+    def __init__(self, registry: ModelRegistry = None):
+        self.registry = registry or model_loader.registry
+        self.targets = defaultdict(set)  # source language -> target languages
+        self._generation = None  # registry generation the graph was built from
+
+    def refresh(self):
+        """Rebuild the graph if the registry's models changed since it was built"""
+        if self._generation is not None and self.registry.generation == self._generation:
+            return
+
+        keys = self.registry.list_models()
+        targets = defaultdict(set)
+        for key in keys:
+            source, _, target = key.partition("-")
+            if source and target:
+                targets[source].add(target)
+        self.targets = targets
+        self._generation = self.registry.generation
+        logging.info(f"Model graph: {len(keys)} models in {self.registry.models_dir}")
+
+    def has_model(self, source_lang: str, target_lang: str) -> bool:
+        return target_lang in self.targets.get(source_lang, ())
+
+    def paths(self, source_lang: str, target_lang: str, max_hops: int):
+        """Every chain of models from source to target with at most max_hops legs, without revisiting a language"""
+        found = []
+
+        def walk(lang, legs, seen):
+            for nxt in sorted(self.targets.get(lang, ())):
+                if nxt in seen:
+                    continue
+                route = legs + [(lang, nxt)]
+                if nxt == target_lang:
+                    found.append(route)
+                elif len(route) < max_hops:
+                    walk(nxt, route, seen | {nxt})
+
+        walk(source_lang, [], {source_lang})
+        return found
+
+class Router:
+    """
+    Picks the chain of models a translation goes through.
+
+    A direct model always wins: one decode is cheaper than two once it is
+    loaded. Otherwise routes whose models are already loaded come first, then
+    the one with the lowest measured decode time per segment. Pairs missing
+    from the graph fall back to pivoting through pivot_lang, so the load
+    reports which model is missing.
+    """
+
+    def __init__(self, graph: ModelGraph = None):
+        self.graph = graph or ModelGraph()
+        self.max_hops = max(1, int(config.get("max_route_hops", 2)))
+        self.decode_cost = {}  # model key -> smoothed seconds per segment
+
+    def record(self, key: str, seconds: float):
+        """Feed a measured leg time into the model's decode cost"""
+        previous = self.decode_cost.get(key)
+        self.decode_cost[key] = seconds if previous is None else 0.8 * previous + 0.2 * seconds
+
+    def _cost(self, key: str) -> float:
+        if key in self.decode_cost:
+            return self.decode_cost[key]
+        # Unmeasured models are assumed to be average
+        if self.decode_cost:
+            return sum(self.decode_cost.values()) / len(self.decode_cost)
+        return 1.0
+
+    def plan(self, source_lang: str, target_lang: str, loaded=()):
+        """The (source, target) models a translation goes through, in order"""
+        if source_lang == target_lang:
+            return []
+
+        self.graph.refresh()
+        if self.graph.has_model(source_lang, target_lang):
+            return [(source_lang, target_lang)]
+
+        pivot_lang = config.get("pivot_lang", "en")
+        routes = self.graph.paths(source_lang, target_lang, self.max_hops)
+        if not routes:
+            if pivot_lang in (source_lang, target_lang):
+                return [(source_lang, target_lang)]
+            return [(source_lang, pivot_lang), (pivot_lang, target_lang)]
+
+        def rank(legs):
+            keys = [f"{src}-{tgt}" for src, tgt in legs]
+            return (
+                sum(key not in loaded for key in keys),
+                sum(self._cost(key) for key in keys),
+                len(legs),
+                legs[0][1] != pivot_lang,
+            )
+
+        return min(routes, key=rank)
+
+    def stats(self) -> dict:
+        return {
+            "models": sum(len(targets) for targets in self.graph.targets.values()),
+            "decode_cost_ms": {key: round(cost * 1000, 2) for key, cost in sorted(self.decode_cost.items())},
+        }
+
+router = Router()
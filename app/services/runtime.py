@@ -0,0 +1,229 @@
+# app/services/runtime.py
+import asyncio
+import itertools
+from collections import deque
+import logging
+import math
+import os
+import time
+from app.config import config
+from app.services.metrics import QUEUE_WAIT, DECODE_TIME, BATCH_SIZE, REJECTED
+from app.services.rate_limit import BULK, QueueFullError, request_priority
+from app.services.model_registry import describe_model_dir
+from app.utils.log import request_id
+
+class ModelUnloadedError(RuntimeError):
+    """The runtime was stopped while a request was waiting on it"""
+
+class TranslationRuntime:
+    """
+    One loaded model for one language pair.
+
+    Concurrent translate() calls are micro-batched: pending (text, future,
+    enqueued at, request ID) items are collected for up to batch_window seconds or
+    max_batch_size items and handed to _decode together. Interactive requests
+    are taken before bulk ones, and requests beyond max_queue_depth are
+    refused straight away. Backends implement start, _decode, _shutdown,
+    running and memory_bytes.
+    """
+
+    backend = None
+
+    def __init__(self, model_dir: str, cpu_threads: int = 1, artifacts: dict = None):
+        self.model_dir = model_dir
+        self.cpu_threads = cpu_threads
+        # The model's entry in the model registry; found on start if not given
+        self.artifacts = artifacts
+        self.loaded_at = None
+        self.model_key = os.path.basename(model_dir)
+        # Requests accepted but not yet answered; used by the replica pool
+        self.in_flight = 0
+        self.last_used = time.monotonic()
+        self.max_batch_size = max(1, int(config.get("max_batch_size", 16)))
+        self.batch_window = config.get("batch_window_ms", 10) / 1000
+        # Bulk requests may only fill part of the queue, so interactive ones always fit
+        self.max_queue_depth = max(1, int(config.get("max_queue_depth", 256)))
+        self.bulk_queue_depth = max(1, int(self.max_queue_depth * config.get("bulk_queue_share", 0.5)))
+        # Items are (priority, arrival order, (text, future, enqueued at, request ID))
+        self._pending = asyncio.PriorityQueue()
+        self._order = itertools.count()
+        self._batch_task = None
+        # Requests finding the runtime stopped start it once, not once each
+        self._start_lock = asyncio.Lock()
+        # Batches handed to _decode at once; backends that can overlap them raise this
+        self.pipeline_depth = 1
+        self._decoding = set()
+        # Smoothed time per batch, for Retry-After estimates
+        self.batch_seconds = 0.0
+        # Recent request latencies (queue wait + decode), for /status and hedging
+        self.latencies = deque(maxlen=200)
+        self.state = "stopped"
+        self.started_at = None  # monotonic time of the last (re)start
+
+    @property
+    def running(self) -> bool:
+        raise NotImplementedError
+
+    async def start(self):
+        raise NotImplementedError
+
+    async def _decode(self, texts):
+        """Translate a batch of lines, returning one result per line"""
+        raise NotImplementedError
+
+    async def _shutdown(self):
+        """Release the backend (process, weights, threads)"""
+        raise NotImplementedError
+
+    def memory_bytes(self) -> int:
+        raise NotImplementedError
+
+    def _artifacts(self) -> dict:
+        if self.artifacts is None:
+            self.artifacts = describe_model_dir(self.model_dir)
+        return self.artifacts
+
+    async def _ensure_running(self):
+        """Start a stopped runtime for the request that found it stopped"""
+        async with self._start_lock:
+            if not self.running:
+                logging.info(f"Starting {self.backend} runtime for {self.model_key} on demand")
+                await self.start()
+
+    def _ensure_batch_loop(self):
+        if self._batch_task is None or self._batch_task.done():
+            self._batch_task = asyncio.create_task(self._batch_loop())
+
+    async def translate(self, text: str) -> str:
+        if not self.running:
+            await self._ensure_running()
+
+        priority = request_priority.get()
+        limit = self.bulk_queue_depth if priority >= BULK else self.max_queue_depth
+        if self.in_flight >= limit:
+            REJECTED.inc(reason="queue_full")
+            raise QueueFullError(self.model_key, self.retry_after())
+
+        self._ensure_batch_loop()
+        future = asyncio.get_running_loop().create_future()
+        self.in_flight += 1
+        enqueued_at = time.monotonic()
+        try:
+            self._pending.put_nowait((priority, next(self._order), (text, future, enqueued_at, request_id.get())))
+            result = await future
+            self.latencies.append(time.monotonic() - enqueued_at)
+            return result
+        finally:
+            self.in_flight -= 1
+            self.last_used = time.monotonic()
+
+    def latency_percentile(self, share: float):
+        """Recent request latency at the given percentile, in seconds, or None before any requests"""
+        if not self.latencies:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(share * len(ordered)))]
+
+    def stats(self) -> dict:
+        p95 = self.latency_percentile(0.95)
+        return {
+            "backend": self.backend,
+            "state": self.state,
+            "loaded_at": self.loaded_at,
+            "uptime_seconds": round(time.monotonic() - self.started_at, 1) if self.started_at else 0,
+            "queue_depth": self.in_flight,
+            "last_latency_ms": round(self.latencies[-1] * 1000, 2) if self.latencies else None,
+            "p95_latency_ms": round(p95 * 1000, 2) if p95 is not None else None,
+        }
+
+    def retry_after(self) -> int:
+        """Seconds until the current queue should have drained"""
+        batches = math.ceil(self.in_flight / self.max_batch_size)
+        return max(1, math.ceil(batches * (self.batch_seconds or self.batch_window)))
+
+    async def translate_batch(self, texts):
+        """Translate several lines, letting the scheduler batch them with other callers"""
+        return await asyncio.gather(*(self.translate(text) for text in texts))
+
+    async def _batch_loop(self):
+        # Started by whichever request came first; it serves them all
+        request_id.set(None)
+        loop = asyncio.get_running_loop()
+        while True:
+            # Take the next batch only once a pipeline slot is free, so requests
+            # arriving meanwhile still compete on priority
+            while len(self._decoding) >= self.pipeline_depth:
+                await asyncio.wait(self._decoding, return_when=asyncio.FIRST_COMPLETED)
+            batch = [(await self._pending.get())[2]]
+            deadline = loop.time() + self.batch_window
+            while len(batch) < self.max_batch_size:
+                if not self._pending.empty():
+                    batch.append(self._pending.get_nowait()[2])
+                    continue
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append((await asyncio.wait_for(self._pending.get(), timeout=remaining))[2])
+                except asyncio.TimeoutError:
+                    break
+
+            # Callers that gave up while queued don't need decoding
+            batch = [item for item in batch if not item[1].done()]
+            if not batch:
+                continue
+            task = asyncio.create_task(self._decode_batch(batch))
+            self._decoding.add(task)
+            task.add_done_callback(self._decoding.discard)
+
+    async def _decode_batch(self, batch):
+        texts = [item[0] for item in batch]
+        # Lines logged while decoding belong to every request in the batch
+        request_id.set(",".join(dict.fromkeys(item[3] for item in batch if item[3])) or None)
+        dispatched = time.monotonic()
+        for item in batch:
+            QUEUE_WAIT.observe(dispatched - item[2], model=self.model_key)
+        BATCH_SIZE.observe(len(batch), model=self.model_key)
+        try:
+            results = await self._decode(texts)
+            elapsed = time.monotonic() - dispatched
+            DECODE_TIME.observe(elapsed, model=self.model_key)
+            self.batch_seconds = elapsed if not self.batch_seconds else 0.8 * self.batch_seconds + 0.2 * elapsed
+        except asyncio.CancelledError:
+            for _, future, _, _ in batch:
+                if not future.done():
+                    future.set_exception(ModelUnloadedError(f"Model {self.model_key} was unloaded"))
+            raise
+        except Exception as e:
+            for _, future, _, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        if logging.root.isEnabledFor(logging.DEBUG):
+            logging.debug(
+                f"Decoded a batch of {len(batch)} for {self.model_key} in {elapsed * 1000:.1f} ms",
+                extra={"model": self.model_key, "batch_size": len(batch), "duration_ms": round(elapsed * 1000, 2),
+                       "queue_ms": round(max(dispatched - item[2] for item in batch) * 1000, 2)},
+            )
+        for (_, future, _, _), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+    async def stop(self):
+        """Stop batching, fail queued requests and release the backend"""
+        if self._batch_task is not None:
+            self._batch_task.cancel()
+            self._batch_task = None
+        for task in list(self._decoding):
+            task.cancel()
+        if self._decoding:
+            await asyncio.wait(self._decoding)
+        # Fail anything still waiting for a batch slot
+        while not self._pending.empty():
+            _, _, (_, future, _, _) = self._pending.get_nowait()
+            if not future.done():
+                future.set_exception(ModelUnloadedError(f"Model {self.model_key} was unloaded"))
+        await self._shutdown()
+        self.state = "stopped"
+        self.started_at = None
@@ -0,0 +1,229 @@
+# app/services/runtime_pool.py
+import asyncio
+import logging
+import os
+import time
+from app.config import config
+from app.services.runtime import ModelUnloadedError
+from app.services.marian_runtime import MarianRuntime
+from app.services.ctranslate2_runtime import CTranslate2Runtime
+
+RUNTIMES = {
+    "marian": MarianRuntime,
+    "ctranslate2": CTranslate2Runtime,
+}
+
+def replica_settings(key: str) -> dict:
+    """Replica settings for a model pair, falling back to the "default" entry"""
+    replicas = config.get("replicas", {})
+    settings = {"min": 1, "max": 1, "cpu_threads": 1}
+    settings.update(replicas.get("default", {}))
+    settings.update(replicas.get(key, {}))
+    settings["min"] = max(1, int(settings["min"]))
+    settings["max"] = max(settings["min"], int(settings["max"]))
+    return settings
+
+def backend_for(key: str) -> str:
+    """Runtime backend for a model pair, falling back to the "default" entry"""
+    backends = config.get("backends", {})
+    return backends.get(key, backends.get("default", "marian"))
+
+def create_runtime(model_dir: str, cpu_threads: int = 1, artifacts: dict = None):
+    name = backend_for(os.path.basename(model_dir))
+    runtime = RUNTIMES.get(name.lower())
+    if runtime is None:
+        logging.warning(f"Unknown runtime backend '{name}', using marian")
+        runtime = MarianRuntime
+    return runtime(model_dir, cpu_threads, artifacts)
+
+class RuntimePool:
+    """
+    Decoder replicas for one model pair; requests go to the least busy replica.
+
+    With hedge_requests on, a request that hasn't been answered after the
+    replica's p95 latency (at least hedge_min_delay_ms) is also sent to a
+    second replica, and whichever answers first wins.
+    """
+
+    def __init__(self, model_dir: str, min_replicas: int = 1, max_replicas: int = 1,
+                 cpu_threads: int = 1, has_capacity=None, artifacts: dict = None):
+        self.model_dir = model_dir
+        self.artifacts = artifacts
+        self.model_key = os.path.basename(model_dir)
+        self.min_replicas = min_replicas
+        self.max_replicas = max_replicas
+        self.cpu_threads = cpu_threads
+        self.loaded_at = None
+        self.replicas = []
+        # Called before growing so the loader can enforce the global budget
+        self._has_capacity = has_capacity or (lambda: True)
+        self.scale_up_queue_depth = config.get("scale_up_queue_depth", 8)
+        self.idle_timeout = config.get("replica_idle_timeout", 60)
+        self._scaling = False
+        self._scale_task = None
+        self._stopped = False
+        self.hedge_requests = config.get("hedge_requests", False)
+        self.hedge_min_delay = config.get("hedge_min_delay_ms", 50) / 1000
+        self.hedged = 0
+
+    @property
+    def size(self) -> int:
+        return len(self.replicas)
+
+    @property
+    def in_flight(self) -> int:
+        return sum(replica.in_flight for replica in self.replicas)
+
+    def memory_bytes(self) -> int:
+        """
+        Resident memory of all replicas, or the model file size per replica if
+        it can't be measured (also the estimate for a pool that hasn't started)
+        """
+        measured = sum(replica.memory_bytes() for replica in self.replicas)
+        if measured:
+            return measured
+        if self.artifacts is not None:
+            files = self.artifacts["files"]
+            return sum(info["size"] for name, info in files.items() if name.endswith(".npz")) * max(self.size, self.min_replicas)
+        try:
+            model_files = [f for f in os.listdir(self.model_dir) if f.endswith(".npz")]
+            return sum(os.path.getsize(os.path.join(self.model_dir, f)) for f in model_files) * max(self.size, self.min_replicas)
+        except OSError:
+            return 0
+
+    async def start(self):
+        """Start the minimum number of replicas"""
+        self._stopped = False
+        replicas = [create_runtime(self.model_dir, self.cpu_threads, self.artifacts) for _ in range(self.min_replicas)]
+        results = await asyncio.gather(*(replica.start() for replica in replicas), return_exceptions=True)
+        errors = [result for result in results if isinstance(result, Exception)]
+        if errors:
+            await asyncio.gather(*(replica.stop() for replica in replicas))
+            raise errors[0]
+        self.replicas = replicas
+        self.loaded_at = replicas[0].loaded_at
+
+    async def translate(self, text: str) -> str:
+        if self._stopped:
+            # Evicted after the caller looked it up; restarting here would
+            # leave decoders running outside the loader's budget
+            raise ModelUnloadedError(f"Model {self.model_key} was unloaded")
+        if not self.replicas:
+            logging.info(f"Starting replicas for {self.model_key} on demand")
+            await self.start()
+
+        replica = self._pick(self.replicas)
+        self._scale(replica)
+        if self.hedge_requests and self.size > 1:
+            return await self._hedged(replica, text)
+        return await replica.translate(text)
+
+    async def _hedged(self, replica, text: str) -> str:
+        """Send text to replica, and to a second replica too if the first is slower than usual"""
+        primary = asyncio.ensure_future(replica.translate(text))
+        delay = max(self.hedge_min_delay, replica.latency_percentile(0.95) or 0)
+        done, _ = await asyncio.wait({primary}, timeout=delay)
+        others = [r for r in self.replicas if r is not replica]
+        if done or not others:
+            return await primary
+
+        self.hedged += 1
+        backup = asyncio.ensure_future(self._pick(others).translate(text))
+        attempts = {primary, backup}
+        try:
+            while attempts:
+                done, attempts = await asyncio.wait(attempts, return_when=asyncio.FIRST_COMPLETED)
+                for attempt in done:
+                    if attempt.exception() is None:
+                        return attempt.result()
+            # Both failed; report the original replica's error
+            return primary.result()
+        finally:
+            for attempt in attempts:
+                attempt.cancel()
+
+    async def translate_batch(self, texts):
+        """Translate several lines, spreading them over the replicas"""
+        return await asyncio.gather(*(self.translate(text) for text in texts))
+
+    def _pick(self, replicas):
+        """
+        The least busy replica. It counts as used from now on, so a
+        scale-down already planned won't stop it before the request reaches it.
+        """
+        replica = min(replicas, key=lambda r: r.in_flight)
+        replica.last_used = time.monotonic()
+        return replica
+
+    def _idle(self, replica) -> bool:
+        return replica.in_flight == 0 and time.monotonic() - replica.last_used > self.idle_timeout
+
+    def _scale(self, chosen):
+        """Grow when even the least busy replica (chosen) is backed up, shrink when idle"""
+        if self._scaling:
+            return
+        if (chosen.in_flight >= self.scale_up_queue_depth
+                and self.size < self.max_replicas and self._has_capacity()):
+            self._scaling = True
+            self._scale_task = asyncio.create_task(self._add_replica())
+        elif self.size > self.min_replicas:
+            idle = [r for r in self.replicas if r is not chosen and self._idle(r)]
+            if idle:
+                self._scaling = True
+                self._scale_task = asyncio.create_task(self._remove_replica(idle[-1]))
+
+    async def _add_replica(self):
+        replica = create_runtime(self.model_dir, self.cpu_threads, self.artifacts)
+        try:
+            await replica.start()
+            if self._stopped:
+                # The pool was unloaded while this replica was starting
+                await replica.stop()
+                return
+            self.replicas.append(replica)
+            logging.info(f"Scaled {self.model_key} up to {self.size} replicas")
+        except asyncio.CancelledError:
+            await replica.stop()
+            raise
+        except Exception as e:
+            logging.error(f"Failed to add replica for {self.model_key}: {str(e)}")
+        finally:
+            self._scaling = False
+
+    async def _remove_replica(self, replica):
+        try:
+            # Requests may have picked it since the scale-down was planned
+            if replica not in self.replicas or not self._idle(replica):
+                return
+            self.replicas.remove(replica)
+            await replica.stop()
+            logging.info(f"Scaled {self.model_key} down to {self.size} replicas")
+        finally:
+            self._scaling = False
+
+    def _state(self, replicas) -> str:
+        if self._stopped or not replicas:
+            return "stopped"
+        states = {r["state"] for r in replicas}
+        return "ready" if "ready" in states else replicas[0]["state"]
+
+    def stats(self) -> dict:
+        replicas = [replica.stats() for replica in self.replicas]
+        latencies = [r["last_latency_ms"] for r in replicas if r["last_latency_ms"] is not None]
+        return {
+            "state": self._state(replicas),
+            "uptime_seconds": max((r["uptime_seconds"] for r in replicas), default=0),
+            "restarts": sum(r.get("restarts", 0) for r in replicas),
+            "queue_depth": self.in_flight,
+            "last_latency_ms": latencies[-1] if latencies else None,
+            "hedged": self.hedged,
+            "runtimes": replicas,
+        }
+
+    async def stop(self):
+        """Stop every replica"""
+        self._stopped = True
+        if self._scale_task is not None and not self._scale_task.done():
+            self._scale_task.cancel()
+        replicas, self.replicas = self.replicas, []
+        await asyncio.gather(*(replica.stop() for replica in replicas))
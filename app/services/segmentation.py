@@ -0,0 +1,111 @@
+# app/services/segmentation.py
+import re
+
+# Places where a document can be cut without changing its meaning. The
+# matched text is the whitespace between two segments and is kept verbatim.
+_BREAK = re.compile(
+    r"[ \t]*\r?\n\s*"                    # line and paragraph breaks
+    # After sentence-final punctuation and up to two closing quotes or
+    # brackets, which stay with their sentence (lookbehinds are fixed-width)
+    r"|(?:(?<=[.!?…])|(?<=[.!?…][\"')\]»”’])|(?<=[.!?…][\"')\]»”’]{2}))[ \t]+(?=[^\sa-z])"
+    r"|(?:(?<=[。！？])|(?<=[。！？][」』）”’]))(?![」』）”’])[ \t]*"  # CJK sentence ends need no space
+)
+
+# Preferred cut points inside an over-long sentence
+_CLAUSE_BREAK = re.compile(r"(?<=[,;:，；、])\s+")
+
+def _split_long(segment: str, max_chars: int):
+    """Cut a sentence longer than max_chars at clause breaks, then at spaces"""
+    pieces, separators = [], []
+    while len(segment) > max_chars:
+        window = segment[:max_chars + 1]
+        cut = None
+        for match in _CLAUSE_BREAK.finditer(window):
+            cut = match
+        if cut is None:
+            for match in re.finditer(r"\s+", window):
+                cut = match
+        if cut is None or cut.start() == 0:
+            # No whitespace at all (e.g. CJK without punctuation): hard cut
+            pieces.append(segment[:max_chars])
+            separators.append("")
+            segment = segment[max_chars:]
+            continue
+        pieces.append(segment[:cut.start()])
+        separators.append(cut.group())
+        segment = segment[cut.end():]
+    pieces.append(segment)
+    return pieces, separators
+
+def split_segments(text: str, max_chars: int = 500):
+    """
+    Split text into sentence-sized segments.
+
+    Returns (separators, segments) where separators has one more item than
+    segments; join_segments(separators, segments) gives back the original text.
+    """
+    leading = len(text) - len(text.lstrip())
+    separators = [text[:leading]]
+    segments = []
+    pos = leading
+
+    for match in _BREAK.finditer(text, leading):
+        if match.start() == pos:
+            # Nothing between two breaks: fold the whitespace into the separator
+            separators[-1] += match.group()
+            pos = match.end()
+            continue
+        segments.append(text[pos:match.start()])
+        separators.append(match.group())
+        pos = match.end()
+
+    tail = text[pos:]
+    if tail.strip():
+        stripped = tail.rstrip()
+        segments.append(stripped)
+        separators.append(tail[len(stripped):])
+    else:
+        separators[-1] += tail
+
+    if max_chars:
+        short_segments, short_separators = [], [separators[0]]
+        for segment, separator in zip(segments, separators[1:]):
+            pieces, inner = _split_long(segment, max_chars)
+            short_segments.extend(pieces)
+            short_separators.extend(inner)
+            short_separators.append(separator)
+        segments, separators = short_segments, short_separators
+
+    return separators, segments
+
+def join_segments(separators, segments) -> str:
+    """Inverse of split_segments, used with the translated segments"""
+    parts = [separators[0]]
+    for segment, separator in zip(segments, separators[1:]):
+        parts.append(segment)
+        parts.append(separator)
+    return "".join(parts)
+
+async def iter_segments(chunks, max_chars: int = 500):
+    """
+    Incremental split_segments over an async iterable of text chunks.
+
+    Yields (separator, segment) pairs as soon as a segment is known to be
+    complete, then a final (trailing_whitespace, None). Only the unfinished
+    tail of the input is buffered.
+    """
+    buffer = ""
+    async for chunk in chunks:
+        buffer += chunk
+        separators, segments = split_segments(buffer, max_chars)
+        if len(segments) < 2:
+            continue
+        # The last segment may still grow with the next chunk
+        for separator, segment in zip(separators, segments[:-1]):
+            yield separator, segment
+        buffer = separators[-2] + segments[-1] + separators[-1]
+
+    separators, segments = split_segments(buffer, max_chars)
+    for separator, segment in zip(separators, segments):
+        yield separator, segment
+    yield separators[-1], None
@@ -1,40 +1,299 @@
-# app/services/translation.py
 import asyncio
+import time
+from collections import deque
 from app.services.model_loader import model_loader
+from app.services.translation_cache import translation_cache
+from app.services.translation_memory import translation_memory
+from app.services.runtime import ModelUnloadedError
+from app.services.segmentation import split_segments, join_segments, iter_segments
+from app.services.metrics import REQUESTS, REQUEST_ERRORS, LEG_TIME
+from app.services.routing import router
+from app.services.placement import coordinator, PeerUnavailableError
+from app.services.language_detection import AUTO, language_detector
 from app.config import config
 import logging
 
-# ***** This might need to be changed later because we have no direct translations other than english" *****
+# Identical legs being decoded right now; later callers await the same task
+_in_progress = {}
+
+def _leg_key(source_lang: str, target_lang: str, text: str):
+    return translation_cache.make_key(
+        source_lang, target_lang, text, model_loader.model_version(source_lang, target_lang)
+    )
+
+async def _translate_leg(source_lang: str, target_lang: str, text: str, key=None) -> str:
+    """
+    Translate one segment with a single model, consulting the result cache
+    first (a caller that already did passes the cache key instead)
+    """
+    if key is None:
+        key = _leg_key(source_lang, target_lang, text)
+        cached = translation_cache.get(key)
+        if cached is not None:
+            return cached
+
+    # The decode runs as its own task so a caller giving up doesn't cancel it
+    # for the others waiting on the same text
+    task = _in_progress.get(key)
+    if task is None:
+        task = asyncio.ensure_future(_decode_leg(key, source_lang, target_lang, text))
+        _in_progress[key] = task
+        task.add_done_callback(lambda _: _in_progress.pop(key, None))
+    return await asyncio.shield(task)
+
+async def _decode_leg(key, source_lang: str, target_lang: str, text: str) -> str:
+    result = None
+    # With several workers the pair may be hosted by another one
+    address = await coordinator.route(f"{source_lang}-{target_lang}")
+    if address is not None:
+        try:
+            result = await coordinator.forward(address, source_lang, target_lang, text)
+        except PeerUnavailableError as e:
+            logging.warning(f"{str(e)}; decoding {source_lang}-{target_lang} locally")
+            coordinator.forget(address)
+    if result is None:
+        result = await decode_local(source_lang, target_lang, text)
+    translation_cache.put(key, result)
+    return result
+
+async def decode_local(source_lang: str, target_lang: str, text: str) -> str:
+    """Decode one leg with this worker's own model; also answers legs forwarded by other workers"""
+    for attempt in range(3):
+        runtime = await model_loader.load_model(source_lang, target_lang)
+        try:
+            started = time.monotonic()
+            result = await runtime.translate(text)
+            router.record(f"{source_lang}-{target_lang}", time.monotonic() - started)
+            break
+        except ModelUnloadedError:
+            # Evicted between lookup and use; look it up (and load it) again
+            if attempt == 2:
+                raise
+    return result
+
+async def _translate_segment(legs, segment: str) -> str:
+    """
+    Run one segment through each (source, target) leg in turn, unless the
+    translation memory already has it (or a close enough variant) for the
+    whole route
+    """
+    if not legs:
+        return segment
+    source, target = legs[0][0], legs[-1][1]
+    key = None
+    if len(legs) == 1:
+        # Hot strings are answered from memory without a trip to the translation memory's thread
+        key = _leg_key(source, target, segment)
+        cached = translation_cache.get(key)
+        if cached is not None:
+            return cached
+    remembered = await translation_memory.lookup(source, target, segment)
+    if remembered is not None:
+        return remembered
+
+    route = "pivot" if len(legs) > 1 else "direct"
+    text = segment
+    for source_lang, target_lang in legs:
+        started = time.monotonic()
+        text = await _translate_leg(source_lang, target_lang, text, key)
+        elapsed = time.monotonic() - started
+        LEG_TIME.observe(elapsed, model=f"{source_lang}-{target_lang}", route=route)
+        if logging.root.isEnabledFor(logging.DEBUG):
+            logging.debug(
+                f"Leg {source_lang}-{target_lang} took {elapsed * 1000:.1f} ms",
+                extra={"model": f"{source_lang}-{target_lang}", "route": route, "duration_ms": round(elapsed * 1000, 2)},
+            )
+    translation_memory.put(source, target, segment, text)
+    return text
+
+def _plan_legs(source_lang: str, target_lang: str):
+    """
+    The (source, target) models a translation goes through, in order.
+    Each leg is cached separately so a fan-out to several targets only
+    decodes a shared first leg once.
+    """
+    return router.plan(source_lang, target_lang, loaded=model_loader.models)
+
+def _note_legs(legs):
+    """Feed the request history and load later legs while the first one decodes"""
+    for source_lang, target_lang in legs:
+        model_loader.record_request(source_lang, target_lang)
+    for source_lang, target_lang in legs[1:]:
+        model_loader.prefetch(source_lang, target_lang)
+
+def _request_window() -> asyncio.Semaphore:
+    # Enough segments in flight to fill the decoders' batches, but one
+    # request must not fill a decoder's queue on its own
+    return asyncio.Semaphore(max(1, config.get("request_window", 64)))
+
+async def _translate_legs(legs, text: str, window: asyncio.Semaphore = None) -> str:
+    """
+    Split text into sentences, run them through the legs and reassemble it.
+    Callers translating many texts pass one window shared by all of them.
+    """
+    separators, segments = split_segments(text, config.get("max_segment_chars", 500))
+    window = window or _request_window()
+
+    async def translate_segment(segment):
+        async with window:
+            return await _translate_segment(legs, segment)
+
+    translations = await asyncio.gather(*(translate_segment(segment) for segment in segments))
+    return join_segments(separators, translations)
 
 async def translate_text(source_lang: str, target_lang: str, text: str) -> str:
     """
     Translate text from source language to target language.
-    Uses pivot translation through pivot_lang if direct translation is not available.
-    
-    Returns a dictionary with translation results and metadata.
+    Uses a direct model if there is one, otherwise the cheapest chain of
+    models found by the router (usually through pivot_lang).
+
+    The text is split into sentences first; they are translated concurrently so
+    the decoders can batch them, and reassembled with the original whitespace.
     """
     if source_lang == target_lang:
         return text
 
-    pivot_lang = config.get("pivot_lang", "en")
+    pair = f"{source_lang}-{target_lang}"
+    REQUESTS.inc(pair=pair)
     try:
-        # Use direct translation if one of the languages is the pivot language
-        if source_lang == pivot_lang or target_lang == pivot_lang:
-            logging.info(f"Direct translation from {source_lang} to {target_lang}")
-            runtime = await model_loader.load_model(source_lang, target_lang)
-            return await runtime.translate(text)
-        else:
-            # For pivot translation: source -> pivot, then pivot -> target
-            logging.info(f"Pivot translation from {source_lang} to {target_lang} via {pivot_lang}")
-            
-            # First translate to pivot language
-            runtime1 = await model_loader.load_model(source_lang, pivot_lang)
-            intermediate_text = await runtime1.translate(text)
-            
-            # Then translate to target language
-            runtime2 = await model_loader.load_model(pivot_lang, target_lang)
-            return await runtime2.translate(intermediate_text)
-        
+        legs = _plan_legs(source_lang, target_lang)
+        route = " -> ".join([legs[0][0]] + [target for _, target in legs])
+        logging.debug(f"Translating {pair} via {route}", extra={"pair": pair, "route": route})
+        _note_legs(legs)
+        return await _translate_legs(legs, text)
+
     except Exception as e:
+        REQUEST_ERRORS.inc(pair=pair)
         logging.error(f"Translation error: {str(e)}")
         raise
+
+async def translate_batch(source_lang: str, target_langs, texts, window: asyncio.Semaphore = None):
+    """
+    Translate every text into every target language.
+
+    A first leg shared by several routes (usually source -> pivot) is decoded
+    once and reused by every target that starts with it; targets are worked
+    through a few model pairs at a time, and failures are reported per text
+    and target instead of failing the whole batch.
+    At most request_window segments of the whole batch (or of window, if
+    given) are in flight at once, so a large batch doesn't overrun the
+    decoders' bulk queue.
+    Returns one {"index", "translations", "errors"} dict per text, in input order.
+
+    With source_lang "auto" the texts are grouped by detected language and
+    each group is translated as its own batch; results also carry
+    "detected_source_lang". Texts whose language can't be told are
+    translated from language_detection_fallback, or fail if there is none.
+    """
+    window = window or _request_window()
+    if source_lang == AUTO:
+        return await _translate_batch_detected(target_langs, texts, window)
+
+    results = [{"index": i, "translations": {}, "errors": {}} for i in range(len(texts))]
+    # A target equal to the source plans no legs; its texts pass through as they are
+    plans = {target: _plan_legs(source_lang, target) for target in dict.fromkeys(target_langs)}
+    for legs in plans.values():
+        _note_legs(legs)
+
+    # First legs of multi-model routes, decoded once for every target using them
+    first_legs = list(dict.fromkeys(legs[0] for legs in plans.values() if len(legs) > 1))
+
+    async def translate_first_leg(leg):
+        logging.info(f"Batch pivot leg {leg[0]}-{leg[1]} for {len(texts)} texts")
+        return await asyncio.gather(*(_translate_legs([leg], text, window) for text in texts), return_exceptions=True)
+
+    shared = dict(zip(first_legs, await asyncio.gather(*(translate_first_leg(leg) for leg in first_legs))))
+
+    # Don't work on more targets at once than the model cache can hold
+    concurrent_pairs = asyncio.Semaphore(max(1, config.get("cache_size", 6) // 2))
+
+    async def translate_target(target: str, legs):
+        async with concurrent_pairs:
+            inputs = texts
+            if legs and legs[0] in shared:
+                inputs, legs = shared[legs[0]], legs[1:]
+
+            async def translate_one(text):
+                if isinstance(text, Exception):
+                    raise text
+                return await _translate_legs(legs, text, window) if legs else text
+
+            if legs:
+                outputs = await asyncio.gather(*(translate_one(text) for text in inputs), return_exceptions=True)
+            else:
+                # Target is the end of a shared first leg (usually the pivot language)
+                outputs = inputs
+            REQUESTS.inc(len(texts), pair=f"{source_lang}-{target}")
+            for result, output in zip(results, outputs):
+                if isinstance(output, Exception):
+                    REQUEST_ERRORS.inc(pair=f"{source_lang}-{target}")
+                    logging.error(f"Batch translation error for {source_lang}-{target}: {str(output)}")
+                    result["errors"][target] = str(output)
+                else:
+                    result["translations"][target] = output
+
+    await asyncio.gather(*(translate_target(target, legs) for target, legs in plans.items()))
+    return results
+
+async def _translate_batch_detected(target_langs, texts, window):
+    fallback = config.get("language_detection_fallback")
+    groups = {}
+    for i, lang in enumerate(language_detector.detect_batch(texts)):
+        groups.setdefault(lang or fallback, []).append(i)
+
+    async def translate_group(lang, indexes):
+        group = [texts[i] for i in indexes]
+        if lang is None:
+            error = "Could not detect the source language"
+            return [{"translations": {}, "errors": {target: error for target in target_langs}} for _ in group]
+        return await translate_batch(lang, target_langs, group, window)
+
+    outputs = await asyncio.gather(*(translate_group(lang, indexes) for lang, indexes in groups.items()))
+    results = [None] * len(texts)
+    for (lang, indexes), output in zip(groups.items(), outputs):
+        for i, result in zip(indexes, output):
+            results[i] = {**result, "index": i, "detected_source_lang": lang}
+    return results
+
+async def translate_stream(source_lang: str, target_lang: str, chunks):
+    """
+    Translate an async stream of text chunks, yielding segments as they finish.
+
+    Yields {"index", "separator", "translated_text"} (or "error") per segment in
+    input order, then {"done", "separator", "segments"} with the trailing
+    whitespace. At most stream_window segments are in flight, so memory stays
+    flat regardless of input size.
+    """
+    legs = _plan_legs(source_lang, target_lang)
+    _note_legs(legs)
+    REQUESTS.inc(pair=f"{source_lang}-{target_lang}")
+    window = max(1, config.get("stream_window", 32))
+    pending = deque()  # (index, separator, task)
+    index = 0
+
+    async def finish(item):
+        item_index, separator, task = item
+        try:
+            return {"index": item_index, "separator": separator, "translated_text": await task}
+        except Exception as e:
+            REQUEST_ERRORS.inc(pair=f"{source_lang}-{target_lang}")
+            logging.error(f"Streaming translation error for {source_lang}-{target_lang}: {str(e)}")
+            return {"index": item_index, "separator": separator, "error": str(e)}
+
+    try:
+        async for separator, segment in iter_segments(chunks, config.get("max_segment_chars", 500)):
+            if segment is None:
+                while pending:
+                    yield await finish(pending.popleft())
+                yield {"done": True, "separator": separator, "segments": index}
+                return
+
+            pending.append((index, separator, asyncio.ensure_future(_translate_segment(legs, segment))))
+            index += 1
+            # Emit whatever is finished at the head; block only when the window is full
+            while pending and (len(pending) >= window or pending[0][2].done()):
+                yield await finish(pending.popleft())
+    finally:
+        # Client went away: don't keep decoding for nobody
+        for _, _, task in pending:
+            task.cancel()
@@ -0,0 +1,84 @@
+# app/services/translation_cache.py
+import time
+import unicodedata
+from collections import OrderedDict
+from app.config import config
+
+class TranslationCache:
+    """Bounded LRU cache of decoded translations with an optional TTL"""
+
+    def __init__(self, max_entries: int = 10000, max_bytes: int = 64 * 1024 * 1024, ttl: float = None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl or None
+        self.entries = OrderedDict()  # key -> (translation, size in bytes, expiry time)
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def normalize(text: str) -> str:
+        """Canonical form of the source text, so trivially different inputs share an entry"""
+        return unicodedata.normalize("NFC", text).strip()
+
+    def make_key(self, src: str, tgt: str, text: str, model_version=None):
+        return (src, tgt, self.normalize(text), model_version)
+
+    def get(self, key):
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        translation, _, expires_at = entry
+        if expires_at is not None and expires_at <= time.monotonic():
+            self._remove(key)
+            self.misses += 1
+            return None
+
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return translation
+
+    def put(self, key, translation: str):
+        size = len(key[2].encode("utf-8")) + len(translation.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+
+        if key in self.entries:
+            self._remove(key)
+        expires_at = time.monotonic() + self.ttl if self.ttl else None
+        self.entries[key] = (translation, size, expires_at)
+        self.bytes += size
+
+        while len(self.entries) > self.max_entries or self.bytes > self.max_bytes:
+            oldest_key = next(iter(self.entries))
+            self._remove(oldest_key)
+            self.evictions += 1
+
+    def _remove(self, key):
+        _, size, _ = self.entries.pop(key)
+        self.bytes -= size
+
+    def clear(self):
+        self.entries.clear()
+        self.bytes = 0
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self.entries),
+            "bytes": self.bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+translation_cache = TranslationCache(
+    max_entries=config.get("result_cache_entries", 10000),
+    max_bytes=config.get("result_cache_bytes", 64 * 1024 * 1024),
+    ttl=config.get("result_cache_ttl"),
+)
@@ -0,0 +1,252 @@
+# app/services/translation_memory.py
+import asyncio
+import hashlib
+import logging
+import re
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from app.config import config
+from app.services.translation_cache import TranslationCache
+
+SHINGLE_SIZE = 4
+# 32 MinHash values in 8 bands of 4: segments about 60% alike share a band
+# bucket with good odds, so they become candidates for the exact check
+NUM_HASHES = 32
+BANDS = 8
+MAX_CANDIDATES = 50
+_NUMBERS = re.compile(r"\d+")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS segments (
+    id INTEGER PRIMARY KEY,
+    pair TEXT NOT NULL,
+    digest INTEGER NOT NULL,
+    source TEXT NOT NULL,
+    translation TEXT NOT NULL
+);
+CREATE UNIQUE INDEX IF NOT EXISTS segments_by_digest ON segments (pair, digest);
+CREATE TABLE IF NOT EXISTS buckets (
+    bucket INTEGER NOT NULL,
+    segment INTEGER NOT NULL,
+    PRIMARY KEY (bucket, segment)
+) WITHOUT ROWID;
+"""
+
+def _hash64(data: str) -> int:
+    """Stable signed 64-bit hash (SQLite integers are signed)"""
+    return int.from_bytes(hashlib.blake2b(data.encode("utf-8"), digest_size=8).digest(), "little", signed=True)
+
+def shingles(text: str) -> set:
+    """Character n-grams of the lower-cased text with whitespace collapsed"""
+    text = " ".join(text.lower().split())
+    if len(text) <= SHINGLE_SIZE:
+        return {text}
+    return {text[i:i + SHINGLE_SIZE] for i in range(len(text) - SHINGLE_SIZE + 1)}
+
+def similarity(a: set, b: set) -> float:
+    return len(a & b) / len(a | b) if a or b else 1.0
+
+def minhash(grams: set):
+    """
+    MinHash signature of grams with one-permutation hashing: each n-gram is
+    hashed once and the hash picks the slot it competes for, so the cost
+    doesn't grow with NUM_HASHES. Empty slots borrow from the next filled one.
+    """
+    slots = [None] * NUM_HASHES
+    for gram in grams:
+        h = _hash64(gram)
+        slot, value = h % NUM_HASHES, h // NUM_HASHES
+        if slots[slot] is None or value < slots[slot]:
+            slots[slot] = value
+    for slot in range(NUM_HASHES):
+        if slots[slot] is None:
+            for offset in range(1, NUM_HASHES):
+                borrowed = slots[(slot + offset) % NUM_HASHES]
+                if isinstance(borrowed, int):
+                    slots[slot] = (borrowed, offset)
+                    break
+    return slots
+
+def band_buckets(pair: str, grams: set):
+    """The LSH bucket of each band of the MinHash signature of grams"""
+    signature = minhash(grams)
+    rows = NUM_HASHES // BANDS
+    return [
+        _hash64(f"{pair}|{band}|" + ",".join(map(str, signature[band * rows:(band + 1) * rows])))
+        for band in range(BANDS)
+    ]
+
+class TranslationMemory:
+    """
+    Persistent store of segment translations with fuzzy lookup.
+
+    Segments are kept per language pair in SQLite, so the memory survives
+    restarts. Lookups first try the exact (normalized) source text, then
+    near-duplicates: a MinHash signature of the segment's character n-grams
+    is split into LSH bands, and segments sharing a band bucket are checked
+    for their real n-gram similarity. A match at or above threshold is used
+    as-is, as long as its numbers are the same as the segment's.
+
+    SQLite runs on one worker thread so the event loop never waits on disk;
+    new translations are written in batches.
+    """
+
+    def __init__(self, path: str = None, threshold: float = None, mmap_mb: int = None):
+        self.path = path if path is not None else config.get("translation_memory_path")
+        self.enabled = bool(self.path)
+        self.threshold = threshold if threshold is not None else config.get("translation_memory_threshold", 0.9)
+        self.mmap_bytes = int((mmap_mb if mmap_mb is not None else config.get("translation_memory_mmap_mb", 256)) * 1024 * 1024)
+        self.exact_hits = 0
+        self.fuzzy_hits = 0
+        self.misses = 0
+        self.stored = 0
+        self._db = None
+        self._lock = threading.Lock()
+        self._executor = None
+        # Written translations not yet committed, by (pair, digest)
+        self._pending = {}
+        self._flush_task = None
+
+    def _connect(self):
+        if self._db is None:
+            db = sqlite3.connect(self.path, check_same_thread=False)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            db.execute(f"PRAGMA mmap_size={self.mmap_bytes}")
+            db.executescript(SCHEMA)
+            self._db = db
+        return self._db
+
+    def _run(self, function, *args):
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="translation-memory")
+        return asyncio.get_running_loop().run_in_executor(self._executor, function, *args)
+
+    @staticmethod
+    def _digest(pair: str, text: str) -> int:
+        return _hash64(f"{pair}|{TranslationCache.normalize(text)}")
+
+    def lookup_sync(self, pair: str, text: str):
+        """(translation, similarity) of the best remembered match for text, or None"""
+        digest = self._digest(pair, text)
+        normalized = TranslationCache.normalize(text)
+        with self._lock:
+            db = self._connect()
+            row = db.execute(
+                "SELECT source, translation FROM segments WHERE pair = ? AND digest = ?", (pair, digest)
+            ).fetchone()
+            if row is not None and row[0] == normalized:
+                return row[1], 1.0
+            if self.threshold >= 1:
+                return None
+
+            grams = shingles(normalized)
+            buckets = band_buckets(pair, grams)
+            # Buckets first, then segments by id; never a scan over the pair
+            candidates = db.execute(
+                f"SELECT source, translation FROM segments WHERE id IN ("
+                f"SELECT DISTINCT segment FROM buckets WHERE bucket IN ({','.join('?' * len(buckets))}) "
+                f"LIMIT {MAX_CANDIDATES}) AND +pair = ?",
+                (*buckets, pair),
+            ).fetchall()
+
+        numbers = _NUMBERS.findall(normalized)
+        best = None
+        for source, translation in candidates:
+            score = similarity(grams, shingles(source))
+            if score >= self.threshold and (best is None or score > best[1]) and _NUMBERS.findall(source) == numbers:
+                best = (translation, score)
+        return best
+
+    def store_sync(self, entries):
+        """Insert (pair, digest, source, translation) entries in one transaction"""
+        with self._lock:
+            db = self._connect()
+            with db:
+                for pair, digest, source, translation in entries:
+                    cursor = db.execute(
+                        "INSERT INTO segments (pair, digest, source, translation) VALUES (?, ?, ?, ?) "
+                        "ON CONFLICT (pair, digest) DO UPDATE SET source = excluded.source, "
+                        "translation = excluded.translation RETURNING id",
+                        (pair, digest, source, translation),
+                    )
+                    segment = cursor.fetchone()[0]
+                    db.executemany(
+                        "INSERT OR IGNORE INTO buckets (bucket, segment) VALUES (?, ?)",
+                        [(bucket, segment) for bucket in band_buckets(pair, shingles(source))],
+                    )
+
+    async def lookup(self, source_lang: str, target_lang: str, text: str):
+        """Remembered translation of text, exact or close enough, or None"""
+        if not self.enabled or not text.strip():
+            return None
+        pair = f"{source_lang}-{target_lang}"
+        pending = self._pending.get((pair, self._digest(pair, text)))
+        if pending is not None and pending[0] == TranslationCache.normalize(text):
+            self.exact_hits += 1
+            return pending[1]
+        try:
+            match = await self._run(self.lookup_sync, pair, text)
+        except sqlite3.Error as e:
+            logging.error(f"Translation memory lookup failed: {str(e)}")
+            return None
+        if match is None:
+            self.misses += 1
+            return None
+        if match[1] >= 1:
+            self.exact_hits += 1
+        else:
+            self.fuzzy_hits += 1
+        return match[0]
+
+    def put(self, source_lang: str, target_lang: str, text: str, translation: str):
+        """Remember a translation; it is written to disk shortly after"""
+        if not self.enabled or not text.strip():
+            return
+        pair = f"{source_lang}-{target_lang}"
+        self._pending[(pair, self._digest(pair, text))] = (TranslationCache.normalize(text), translation)
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.ensure_future(self.flush())
+
+    async def flush(self):
+        """Write pending translations"""
+        while self._pending:
+            pending, self._pending = self._pending, {}
+            entries = [(pair, digest, source, translation) for (pair, digest), (source, translation) in pending.items()]
+            try:
+                await self._run(self.store_sync, entries)
+                self.stored += len(entries)
+            except sqlite3.Error as e:
+                logging.error(f"Could not write {len(entries)} entries to the translation memory: {str(e)}")
+
+    async def close(self):
+        if not self.enabled:
+            return
+        await self.flush()
+        if self._executor is not None:
+            await self._run(self._close_db)
+            self._executor.shutdown()
+            self._executor = None
+
+    def _close_db(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+    def stats(self) -> dict:
+        if not self.enabled:
+            return {"enabled": False}
+        lookups = self.exact_hits + self.fuzzy_hits + self.misses
+        return {
+            "enabled": True,
+            "threshold": self.threshold,
+            "exact_hits": self.exact_hits,
+            "fuzzy_hits": self.fuzzy_hits,
+            "misses": self.misses,
+            "stored": self.stored,
+            "hit_ratio": round((self.exact_hits + self.fuzzy_hits) / lookups, 4) if lookups else 0.0,
+        }
+
+translation_memory = TranslationMemory()
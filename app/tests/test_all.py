@@ -1,8 +1,14 @@
 # app/tests/test_all.py
 import pytest
+import asyncio
+import io
+import json
+import logging
+import threading
 from fastapi.testclient import TestClient
 import os
 import sys
+from concurrent.futures import ThreadPoolExecutor
 from unittest.mock import AsyncMock, patch, MagicMock
 
 # Add project root to path
@@ -11,6 +17,25 @@ sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../.
 # Import app after adjusting the path
 from app.main import app
 from app.services.model_loader import model_loader
+from app.services.marian_runtime import MarianRuntime, DecoderDiedError
+from app.services.runtime_pool import RuntimePool, create_runtime
+from app.services.ctranslate2_runtime import CTranslate2Runtime
+from app.services.translation import translate_text, translate_batch
+from app.services.translation_cache import TranslationCache, translation_cache
+from app.services.translation_memory import TranslationMemory
+from app.services.language_detection import LanguageDetector, language_detector
+from app.services.model_registry import ModelRegistry
+from app.services.segmentation import split_segments, join_segments
+from app.services.prefetch import RequestHistory
+from app.services.eviction import GDSFPolicy
+from app.services.model_loader import ModelLoader, ModelCacheFullError
+from app.services.runtime import ModelUnloadedError
+from app.services.admission import AdmissionQueue
+from app.services.routing import ModelGraph, Router
+from app.services.placement import Coordinator
+from app.services.bulk_jobs import BulkJob
+from app.utils.log import RequestSampler, setup_logging, stop_logging
+from app.services.rate_limit import RateLimiter, RateLimitedError, QueueFullError, BULK, request_priority
 
 # Create test client
 client = TestClient(app)
@@ -39,6 +64,7 @@ def mock_translation():
         mock_status_loader.get_status = MagicMock(return_value=[
             {"model_key": "en-es", "source_lang": "en", "target_lang": "es", "loaded_at": "2024-03-23T10:00:00Z"}
         ])
+        mock_status_loader.load_stats = MagicMock(return_value={"loading": [], "waiting": 0})
         
         # Configure the clear loader mock
         mock_clear_loader.clear_cache = AsyncMock()
@@ -128,5 +154,1084 @@ def test_unsupported_language():
     assert "detail" in data  # FastAPI returns errors in "detail" field
     assert "not supported" in data["detail"]
 
+# Fake marian-decoder process: echoes each input line upper-cased
+class FakeStdin:
+    def __init__(self, stdout):
+        self.stdout = stdout
+        self.writes = []
+
+    def write(self, data):
+        self.writes.append(data)
+        for line in data.decode("utf-8").splitlines():
+            self.stdout.feed(line.upper() + "\n")
+
+    async def drain(self):
+        pass
+
+    def close(self):
+        pass
+
+class FakeStdout:
+    def __init__(self):
+        self.lines = asyncio.Queue()
+
+    def feed(self, line):
+        self.lines.put_nowait(line.encode("utf-8"))
+
+    async def readline(self):
+        return await self.lines.get()
+
+class FakeProcess:
+    def __init__(self):
+        self.returncode = None
+        self.stdout = FakeStdout()
+        self.stdin = FakeStdin(self.stdout)
+
+    def terminate(self):
+        self.returncode = 0
+
+    async def wait(self):
+        return self.returncode
+
+# Test concurrent requests are decoded as one micro-batch
+@pytest.mark.asyncio
+async def test_runtime_micro_batching():
+    runtime = MarianRuntime(os.path.join("app", "models", "en-es"))
+    runtime._attach(FakeProcess())
+    runtime.max_batch_size = 4
+
+    results = await asyncio.gather(
+        runtime.translate("one"),
+        runtime.translate("two\nlines"),
+        runtime.translate("three"),
+    )
+
+    assert results == ["ONE", "TWO LINES", "THREE"]
+    # A single padded write for all three callers
+    assert len(runtime.process.stdin.writes) == 1
+    assert runtime.process.stdin.writes[0].count(b"\n") == 4
+    await runtime.stop()
+
+# Test the replica pool sends work to the least busy replica
+@pytest.mark.asyncio
+async def test_pool_least_busy_replica():
+    model_dir = os.path.join("app", "models", "en-es")
+    busy = MarianRuntime(model_dir)
+    busy.in_flight = 3
+    busy.translate = AsyncMock(return_value="busy")
+    idle = MarianRuntime(model_dir)
+    idle.translate = AsyncMock(return_value="idle")
+
+    pool = RuntimePool(model_dir, max_replicas=2)
+    pool.replicas = [busy, idle]
+
+    assert await pool.translate("Hello") == "idle"
+    assert pool.size == 2
+    assert pool.in_flight == 3
+
+# Test scaling down never stops the replica a request was just sent to
+@pytest.mark.asyncio
+async def test_pool_scale_down_spares_chosen_replica():
+    model_dir = os.path.join("app", "models", "en-es")
+    busy, idle = MarianRuntime(model_dir), MarianRuntime(model_dir)
+    for replica in (busy, idle):
+        replica._attach(FakeProcess())
+        replica.max_batch_size = 1
+        replica.last_used -= 3600
+    pool = RuntimePool(model_dir, min_replicas=1, max_replicas=2)
+    pool.replicas = [busy, idle]
+
+    # The only idle replica is the one picked, so it stays
+    busy.in_flight = 1
+    assert await pool.translate("hello") == "HELLO"
+    assert pool.size == 2
+
+    # A scale-down planned before a request picked the replica is dropped
+    busy.in_flight = 0
+    idle.last_used -= 3600
+    pool._scale(busy)
+    late = asyncio.ensure_future(pool._pick([idle]).translate("late"))
+    await pool._scale_task
+    assert await late == "LATE"
+    assert pool.size == 2
+
+    idle.last_used -= 3600
+    pool._scale(busy)
+    await pool._scale_task
+    assert pool.replicas == [busy]
+    await pool.stop()
+
+# Test the backend is chosen per pair and the in-process runtime batches natively
+@pytest.mark.asyncio
+async def test_ctranslate2_backend():
+    with patch.dict('app.services.runtime_pool.config', {"backends": {"default": "marian", "en-es": "ctranslate2"}}):
+        runtime = create_runtime(os.path.join("app", "models", "en-es"))
+        assert isinstance(create_runtime(os.path.join("app", "models", "en-fr")), MarianRuntime)
+    assert isinstance(runtime, CTranslate2Runtime)
+
+    spm = MagicMock()
+    spm.encode.side_effect = lambda text, out_type: text.split()
+    spm.decode.side_effect = lambda tokens: " ".join(tokens).upper()
+    runtime.source_spm = runtime.target_spm = spm
+    runtime.translator = MagicMock()
+    runtime.translator.translate_batch.side_effect = lambda tokens, **kwargs: [
+        MagicMock(hypotheses=[line]) for line in tokens
+    ]
+    runtime._executor = ThreadPoolExecutor(max_workers=1)
+
+    results = await asyncio.gather(runtime.translate("one"), runtime.translate("two words"))
+
+    assert results == ["ONE", "TWO WORDS"]
+    runtime.translator.translate_batch.assert_called_once()
+    await runtime.stop()
+    assert not runtime.running
+
+# Test replicas starting together convert a model for CTranslate2 once, and later starts reuse the conversion
+@pytest.mark.asyncio
+async def test_ctranslate2_conversion_once(tmp_path):
+    for name in ("opus.npz", "source.spm", "target.spm"):
+        (tmp_path / name).write_text(name)
+    conversions = []
+
+    def convert(output_dir, **kwargs):
+        conversions.append(output_dir)
+        os.makedirs(output_dir, exist_ok=True)
+        with open(os.path.join(output_dir, "model.bin"), "w") as f:
+            f.write("weights")
+
+    ctranslate2 = MagicMock()
+    ctranslate2.converters.OpusMTConverter.return_value.convert.side_effect = convert
+    with patch.dict(sys.modules, {"ctranslate2": ctranslate2, "sentencepiece": MagicMock()}):
+        runtimes = [CTranslate2Runtime(str(tmp_path)) for _ in range(3)]
+        await asyncio.gather(*(runtime.start() for runtime in runtimes))
+        await runtimes[0].stop()
+        await runtimes[0].start()
+
+    assert len(conversions) == 1
+    assert sorted(os.listdir(tmp_path / "ctranslate2")) == ["model.bin"]
+    assert not [name for name in os.listdir(tmp_path) if name.startswith(".ctranslate2")]
+    await asyncio.gather(*(runtime.stop() for runtime in runtimes))
+
+# Test the result cache evicts least recently used entries and honours the TTL
+def test_translation_cache_lru_and_ttl():
+    cache = TranslationCache(max_entries=2)
+    a = cache.make_key("en", "es", "a")
+    b = cache.make_key("en", "es", " b ")
+    c = cache.make_key("en", "es", "c")
+    cache.put(a, "A")
+    cache.put(b, "B")
+    assert cache.get(a) == "A"  # a is now most recently used
+    cache.put(c, "C")
+    assert cache.get(b) is None
+    assert cache.get(cache.make_key("en", "es", "a")) == "A"
+    assert cache.stats()["evictions"] == 1
+
+    expired = TranslationCache(ttl=-1)
+    expired.put(a, "A")
+    assert expired.get(a) is None
+
+# Test a pivot fan-out decodes the source -> pivot leg only once
+@pytest.mark.asyncio
+async def test_pivot_leg_cached(mock_translation):
+    translation_cache.clear()
+    from app.services import translation
+    translation.model_loader.model_version = MagicMock(return_value="v1")
+
+    await translate_text("fr", "es", "Bonjour")
+    await translate_text("fr", "it", "Bonjour")
+
+    loaded = [call.args for call in translation.model_loader.load_model.call_args_list]
+    assert loaded.count(("fr", "en")) == 1
+    assert ("en", "es") in loaded and ("en", "it") in loaded
+    translation_cache.clear()
+
+# Test documents are split into sentences and reassembled with their layout
+def test_split_segments_round_trip():
+    text = "  Hello world. How are you?\n\n  Fine, thanks!  "
+    separators, segments = split_segments(text)
+    assert segments == ["Hello world.", "How are you?", "Fine, thanks!"]
+    assert join_segments(separators, segments) == text
+
+    # Closing quotes and brackets stay with the sentence they close
+    text = 'He said "Hi." Then he left. (It was late.) «Oui.» Fin.'
+    separators, segments = split_segments(text)
+    assert segments == ['He said "Hi."', "Then he left.", "(It was late.)", "«Oui.»", "Fin."]
+    assert separators == ["", " ", " ", " ", " ", ""]
+    assert split_segments("「はい。」次に行く。")[1] == ["「はい。」", "次に行く。"]
+
+    separators, segments = split_segments("one, two, three four", max_chars=9)
+    assert all(len(segment) <= 9 for segment in segments)
+    assert join_segments(separators, segments) == "one, two, three four"
+
+# Test each sentence of a multi-paragraph text is translated on its own
+@pytest.mark.asyncio
+async def test_translate_multi_paragraph(mock_translation):
+    translation_cache.clear()
+    from app.services import translation
+    runtime = await translation.model_loader.load_model("en", "fr")
+    runtime.translate = AsyncMock(side_effect=lambda text: text.upper())
+
+    result = await translate_text("en", "fr", "First line.\nSecond one. Third!\n\n")
+
+    assert result == "FIRST LINE.\nSECOND ONE. THIRD!\n\n"
+    assert runtime.translate.await_count == 3
+    translation_cache.clear()
+
+# Test batch translation returns results in order with per-item errors
+def test_translate_batch(mock_translation):
+    translation_cache.clear()
+    from app.services import translation
+
+    async def fake_translate(text):
+        if "bad" in text:
+            raise RuntimeError("decoder failed")
+        return f"[{text}]"
+
+    runtime = AsyncMock()
+    runtime.translate = AsyncMock(side_effect=fake_translate)
+    translation.model_loader.load_model = AsyncMock(return_value=runtime)
+
+    response = client.post("/translate/batch", json={
+        "source_lang": "fr",
+        "target_langs": ["es", "en", "fr"],
+        "texts": ["Bonjour", "bad input"]
+    })
+
+    assert response.status_code == 200
+    results = response.json()["results"]
+    assert [result["index"] for result in results] == [0, 1]
+    assert results[0]["translations"] == {"es": "[[Bonjour]]", "en": "[Bonjour]", "fr": "Bonjour"}
+    assert results[1]["translations"] == {"fr": "bad input"}
+    assert set(results[1]["errors"]) == {"es", "en"}
+    # The French -> English leg is decoded once per text and shared by "es" and "en"
+    decoded = [call.args[0] for call in runtime.translate.call_args_list]
+    assert decoded.count("Bonjour") == 1
+    assert decoded.count("bad input") == 1
+    translation_cache.clear()
+
+# Test a batch larger than the decoder's bulk queue is fed to it a window at a time instead of failing
+@pytest.mark.asyncio
+async def test_translate_batch_window(mock_translation):
+    translation_cache.clear()
+    from app.services import translation
+    runtime = MarianRuntime(os.path.join("app", "models", "en-es"))
+    runtime._attach(FakeProcess())
+    runtime.max_batch_size = 4
+    runtime.bulk_queue_depth = 8
+    translation.model_loader.load_model = AsyncMock(return_value=runtime)
+
+    token = request_priority.set(BULK)
+    try:
+        with patch.dict('app.services.translation.config', {"request_window": 8}):
+            results = await translate_batch("en", ["es"], [f"Text {i}." for i in range(30)])
+    finally:
+        request_priority.reset(token)
+        await runtime.stop()
+
+    assert [result["errors"] for result in results] == [{}] * 30
+    assert results[29]["translations"] == {"es": "TEXT 29."}
+    translation_cache.clear()
+
+# Test streamed translation returns one NDJSON line per segment
+def test_translate_stream(mock_translation):
+    translation_cache.clear()
+    from app.services import translation
+    runtime = AsyncMock()
+    runtime.translate = AsyncMock(side_effect=lambda text: text.upper())
+    translation.model_loader.load_model = AsyncMock(return_value=runtime)
+
+    def body():
+        yield "First sen".encode("utf-8")
+        yield "tence. Second one.\n\nLast".encode("utf-8")
+        yield " line\n".encode("utf-8")
+
+    response = client.post(
+        "/translate/stream",
+        params={"source_lang": "en", "target_lang": "fr"},
+        content=body(),
+    )
+
+    assert response.status_code == 200
+    items = [json.loads(line) for line in response.text.splitlines()]
+    assert [item.get("translated_text") for item in items[:-1]] == ["FIRST SENTENCE.", "SECOND ONE.", "LAST LINE"]
+    assert items[-1] == {"done": True, "separator": "\n", "segments": 3}
+    rebuilt = "".join(item["separator"] + item.get("translated_text", "") for item in items)
+    assert rebuilt == "FIRST SENTENCE. SECOND ONE.\n\nLAST LINE\n"
+    translation_cache.clear()
+
+# Test streaming into the source language passes the text through
+def test_translate_stream_same_language(mock_translation):
+    from app.services import translation
+    response = client.post(
+        "/translate/stream",
+        params={"source_lang": "en", "target_lang": "en"},
+        content="First sentence. Second one.".encode("utf-8"),
+    )
+
+    assert response.status_code == 200
+    items = [json.loads(line) for line in response.text.splitlines()]
+    assert [item.get("translated_text") for item in items[:-1]] == ["First sentence.", "Second one."]
+    translation.model_loader.load_model.assert_not_called()
+
+# Test a client disconnecting after sending its document stops the streamed translation
+@pytest.mark.asyncio
+async def test_translate_stream_disconnect(mock_translation):
+    translation_cache.clear()
+    from app.services import translation
+
+    async def hang(text):
+        await asyncio.sleep(60)
+
+    translation.model_loader.load_model.return_value.translate = AsyncMock(side_effect=hang)
+    messages = [{"type": "http.request", "body": b"One sentence. Another one.", "more_body": False},
+                {"type": "http.disconnect"}]
+
+    async def receive():
+        if messages:
+            await asyncio.sleep(0.05)
+            return messages.pop(0)
+        return await asyncio.get_running_loop().create_future()
+
+    sent = []
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {"type": "http", "asgi": {"version": "3.0", "spec_version": "2.3"}, "http_version": "1.1",
+             "method": "POST", "scheme": "http", "path": "/translate/stream", "raw_path": b"/translate/stream",
+             "root_path": "", "query_string": b"source_lang=en&target_lang=fr", "headers": [(b"host", b"test")],
+             "client": ("127.0.0.1", 1234), "server": ("test", 80)}
+    # The decoder never answers; only noticing the disconnect lets the response end
+    await asyncio.wait_for(app(scope, receive, send), timeout=5)
+
+    assert sent[0]["status"] == 200
+    translation_cache.clear()
+
+# Test source_lang "auto" detects the language, and skips decoding text already in the target language
+def test_translate_auto_source(mock_translation):
+    translation_cache.clear()
+    from app.services import translation
+
+    response = client.post("/translate", json={
+        "source_lang": "auto", "target_lang": "en", "text": "Das Wetter ist heute schön und ich möchte spazieren gehen."
+    })
+    assert response.status_code == 200
+    assert response.json() == {"translated_text": "Translated text", "detected_source_lang": "de"}
+    translation.model_loader.load_model.assert_called_with("de", "en")
+
+    translation.model_loader.load_model.reset_mock()
+    response = client.post("/translate", json={
+        "source_lang": "auto", "target_lang": "en", "text": "The weather is lovely today."
+    })
+    assert response.json() == {"translated_text": "The weather is lovely today.", "detected_source_lang": "en"}
+    translation.model_loader.load_model.assert_not_called()
+
+    # Short strings aren't guessed at: they fail, or come from the configured fallback
+    response = client.post("/translate", json={"source_lang": "auto", "target_lang": "fr", "text": "Save"})
+    assert response.status_code == 422
+    response = client.post("/translate/batch", json={"source_lang": "auto", "target_langs": ["fr"], "texts": ["Cancel"]})
+    assert response.json()["results"][0]["errors"] == {"fr": "Could not detect the source language"}
+    with patch.dict('app.controllers.translate.config', {"language_detection_fallback": "en"}):
+        response = client.post("/translate", json={"source_lang": "auto", "target_lang": "fr", "text": "Save"})
+    assert response.json() == {"translated_text": "Translated text", "detected_source_lang": "en"}
+    translation.model_loader.load_model.assert_called_with("en", "fr")
+
+# Test detection picks the right language among those supported, and declines to guess on short strings
+def test_language_detection():
+    detector = LanguageDetector(["en", "es", "fr", "de", "ru", "uk", "zh", "jap", "ko", "ar"])
+    samples = {
+        "Where can I buy a ticket for the train?": "en",
+        "¿Dónde puedo comprar un billete de tren?": "es",
+        "Où puis-je acheter un billet de train ?": "fr",
+        "Wo kann ich eine Fahrkarte für den Zug kaufen?": "de",
+        "Где я могу купить билет на поезд?": "ru",
+        "Де я можу купити квиток на потяг?": "uk",
+        "我在哪里可以买到火车票？": "zh",
+        "電車の切符はどこで買えますか？": "jap",
+        "기차표는 어디서 살 수 있나요?": "ko",
+        "أين يمكنني شراء تذكرة القطار؟": "ar",
+    }
+    assert [detector.score(text)[0] for text in samples] == list(samples.values())
+    assert detector.detect("Wo kann ich eine Fahrkarte für den Zug kaufen?") == "de"
+    assert detector.detect("12:30 - 14:45") is None
+    # Everyday one-line messages are decided with all supported languages as candidates
+    messages = {
+        "El archivo no se pudo guardar.": "es",
+        "Le mot de passe est incorrect.": "fr",
+        "Die Datei konnte nicht gespeichert werden.": "de",
+        "Impossibile salvare il file.": "it",
+        "Não foi possível salvar o arquivo.": "pt",
+        "Het wachtwoord is onjuist.": "nl",
+        "Dziękujemy za zamówienie.": "pl",
+        "Сохранить изменения?": "ru",
+        "Дякуємо за ваше замовлення.": "uk",
+    }
+    assert language_detector.detect_batch(list(messages)) == list(messages.values())
+    # Too short to tell apart from related languages
+    assert language_detector.detect_batch(["Save", "Cancel", "Settings", "OK"]) == [None] * 4
+    # Only supported languages are candidates
+    assert LanguageDetector(["en", "fr"]).detect("Wo kann ich eine Fahrkarte kaufen?") in ("en", "fr")
+
+# Test request history learns the hot set and which pair usually comes next
+def test_request_history(tmp_path):
+    history = RequestHistory()
+    for key in ["fr-en", "en-es", "fr-en", "en-es", "fr-en", "en-it"]:
+        history.record(key)
+
+    assert history.hot_set(2) == ["fr-en", "en-es"]
+    assert history.likely_next("fr-en") == "en-es"
+    assert history.likely_next("fr-en", min_share=0.9) is None
+
+    path = str(tmp_path / "hot_models.json")
+    history.save(path)
+    restored = RequestHistory()
+    restored.load(path)
+    assert restored.hot_set(1) == ["fr-en"]
+
+# Test GDSF evicts big, cheap, rarely used models and busy models are pinned
+@pytest.mark.asyncio
+async def test_cost_aware_eviction():
+    def fake_pool(memory_mb, in_flight=0, size=1):
+        pool = MagicMock()
+        pool.memory_bytes = MagicMock(return_value=memory_mb * 1024 * 1024)
+        pool.in_flight = in_flight
+        pool.size = size
+        pool.stop = AsyncMock()
+        return pool
+
+    policy = GDSFPolicy()
+    policy.record_load("en-es", 10.0)
+    policy.record_load("en-fr", 1.0)
+    for _ in range(5):
+        policy.record_hit("en-es")
+    candidates = {"en-es": fake_pool(300), "en-fr": fake_pool(300)}
+    assert policy.choose_victim(candidates) == "en-fr"
+
+    loader = ModelLoader(cache_size=2)
+    loader.eviction_policy = GDSFPolicy()
+    busy, idle = fake_pool(100, in_flight=2), fake_pool(100)
+    loader.models["en-es"] = busy
+    loader.models["en-fr"] = idle
+
+    await loader._evict_for(fake_pool(100))
+
+    assert list(loader.models) == ["en-es"]
+    idle.stop.assert_awaited_once()
+    busy.stop.assert_not_awaited()
+
+# Test room is made before a new model starts, a model is pinned until its waiting callers use it, and a load fails rather than overrun the budget while every model is busy
+@pytest.mark.asyncio
+async def test_evict_before_load():
+    loader = ModelLoader(cache_size=2)
+    loader.registry.refresh = MagicMock(return_value={"dir": "app/models/en-it"})
+    first, second = (MagicMock(size=1, in_flight=1, stop=AsyncMock(), memory_bytes=MagicMock(return_value=0)) for _ in range(2))
+    loader.models.update({"en-es": first, "en-fr": second})
+    incoming = MagicMock(size=0, min_replicas=1, in_flight=0, memory_bytes=MagicMock(return_value=0))
+
+    async def start():
+        # The budget already has room when the decoders start
+        assert loader.replica_count() == 2
+        incoming.size = 1
+
+    incoming.start = AsyncMock(side_effect=start)
+    with patch.object(loader, "_create_pool", return_value=incoming), \
+         patch.dict('app.services.model_loader.config', {"model_load_wait": 0.1}):
+        with pytest.raises(ModelCacheFullError):
+            await loader._load("en-it")
+        incoming.start.assert_not_awaited()
+        assert not loader._starting
+
+        # A model going idle while the load waits makes room for it; one whose
+        # callers are still waiting on its load stays pinned
+        first.in_flight = 0
+        loader._waiters["en-es"] += 1
+        loop = asyncio.get_running_loop()
+        loop.call_later(0.05, setattr, second, "in_flight", 0)
+        with patch.dict('app.services.model_loader.config', {"model_load_wait": 5}):
+            assert await loader._load("en-it") is incoming
+
+    second.stop.assert_awaited_once()
+    assert list(loader.models) == ["en-es", "en-it"]
+
+# Test concurrent misses for the same pair share a single load
+@pytest.mark.asyncio
+async def test_single_flight_load():
+    loader = ModelLoader(cache_size=2)
+    pool = MagicMock(size=1, in_flight=0)
+    started = asyncio.Event()
+
+    async def slow_load(key):
+        started.set()
+        await asyncio.sleep(0.01)
+        loader.models[key] = pool
+        return pool
+
+    loader._load = AsyncMock(side_effect=slow_load)
+    results = await asyncio.gather(*(loader.load_model("en", "es") for _ in range(5)))
+
+    assert all(result is pool for result in results)
+    loader._load.assert_awaited_once_with("en-es")
+    assert loader.load_stats()["loading"] == []
+
+# Test clearing the cache stops every model and cancels loads in progress, even as the cache changes
+@pytest.mark.asyncio
+async def test_clear_cache_during_load():
+    loader = ModelLoader(cache_size=4)
+    late = MagicMock(size=1, in_flight=0)
+
+    async def stop_and_add():
+        # A background load finishing while the cache is being cleared
+        loader.models["en-de"] = late
+
+    pools = {key: MagicMock(size=1, in_flight=0, stop=AsyncMock()) for key in ("en-es", "en-fr")}
+    pools["en-es"].stop.side_effect = stop_and_add
+    loader.models.update(pools)
+
+    async def slow_load(key):
+        await asyncio.sleep(10)
+        loader.models[key] = late
+        return late
+
+    loader._load = AsyncMock(side_effect=slow_load)
+    waiting = asyncio.ensure_future(loader.load_model("en", "it"))
+    await asyncio.sleep(0)
+    await loader.clear_cache()
+
+    assert all(pool.stop.await_count == 1 for pool in pools.values())
+    assert "en-it" not in loader.models
+    with pytest.raises(ModelUnloadedError):
+        await waiting
+
+# Test background prefetches stay referenced while they run and are cancelled on shutdown
+@pytest.mark.asyncio
+async def test_background_tasks_cancelled_on_shut_down():
+    loader = ModelLoader(cache_size=2)
+    started = asyncio.Event()
+
+    async def slow_load(src, tgt):
+        started.set()
+        await asyncio.sleep(60)
+
+    loader.load_model = slow_load
+    loader.prefetch("en", "xx")
+    assert len(loader._background) == 1
+    await asyncio.wait_for(started.wait(), timeout=1)
+
+    await asyncio.wait_for(loader.shut_down(), timeout=1)
+    assert not loader._background
+    assert not loader._prefetching
+
+# Test the admission queue admits in order and records wait times
+@pytest.mark.asyncio
+async def test_admission_queue_order():
+    queue = AdmissionQueue(1)
+    order = []
+
+    async def worker(name):
+        async with queue.slot():
+            order.append(name)
+            await asyncio.sleep(0.01)
+
+    await asyncio.gather(*(worker(name) for name in "abc"))
+
+    assert order == ["a", "b", "c"]
+    stats = queue.stats()
+    assert stats["admitted"] == 3 and stats["active"] == 0 and stats["waiting"] == 0
+    assert stats["max_wait_ms"] > 0
+
+# Test the metrics endpoint exposes request counters and latency histograms
+def test_metrics(mock_translation):
+    translation_cache.clear()
+    client.post("/translate", json={"source_lang": "en", "target_lang": "fr", "text": "Metrics test."})
+
+    response = client.get("/metrics")
+
+    assert response.status_code == 200
+    assert 'fluentai_requests_total{pair="en-fr"}' in response.text
+    assert 'fluentai_leg_seconds_bucket{model="en-fr",route="direct",le="+Inf"}' in response.text
+    assert "fluentai_translation_cache_hit_ratio" in response.text
+    translation_cache.clear()
+
+# Test the marian runtime talks to a real decoder process through its pipes
+@pytest.mark.asyncio
+async def test_runtime_with_stub_decoder():
+    # Real subprocess plumbing against benchmarks/fake_marian_decoder.py
+    root = os.path.abspath(os.path.join(os.path.dirname(__file__), '../..'))
+    decoder = f"{sys.executable} {os.path.join(root, 'benchmarks', 'fake_marian_decoder.py')}"
+    with patch.dict('app.services.marian_runtime.config', {"marian_decoder_path": decoder, "log_texts": False}):
+        runtime = MarianRuntime(os.path.join(root, "app", "models", "en-es"))
+        await runtime.start()
+        try:
+            results = await asyncio.gather(*(runtime.translate(f"Line {i}") for i in range(5)))
+        finally:
+            await runtime.stop()
+
+    assert results == [f"<en-es> Line {i}" for i in range(5)]
+    assert runtime.process is None
+
+# Test a decoder crash fails only the batch it was working on; the rest go to its replacement
+@pytest.mark.asyncio
+async def test_decoder_crash_is_contained(monkeypatch):
+    root = os.path.abspath(os.path.join(os.path.dirname(__file__), '../..'))
+    decoder = f"{sys.executable} {os.path.join(root, 'benchmarks', 'fake_marian_decoder.py')}"
+    monkeypatch.setenv("FAKE_MARIAN_FAIL_ON", "boom")
+    settings = {"marian_decoder_path": decoder, "log_texts": False, "max_batch_size": 1, "pipeline_depth": 4}
+    with patch.dict('app.services.marian_runtime.config', settings), \
+         patch.dict('app.services.runtime.config', settings):
+        runtime = MarianRuntime(os.path.join(root, "app", "models", "en-es"))
+        await runtime.start()
+        try:
+            results = await asyncio.gather(
+                runtime.translate("first"), runtime.translate("boom"), runtime.translate("last\nline"),
+                return_exceptions=True,
+            )
+        finally:
+            await runtime.stop()
+
+    assert results[0] == "<en-es> first"
+    assert isinstance(results[1], RuntimeError)
+    assert results[2] == "<en-es> last line"
+    assert runtime.restarts == 1
+
+# Test the supervisor notices a decoder that died while idle and replaces it
+@pytest.mark.asyncio
+async def test_supervisor_restarts_dead_decoder():
+    root = os.path.abspath(os.path.join(os.path.dirname(__file__), '../..'))
+    decoder = f"{sys.executable} {os.path.join(root, 'benchmarks', 'fake_marian_decoder.py')}"
+    settings = {"marian_decoder_path": decoder, "log_texts": False, "health_check_interval": 0.05}
+    with patch.dict('app.services.marian_runtime.config', settings):
+        runtime = MarianRuntime(os.path.join(root, "app", "models", "en-es"))
+        await runtime.start()
+        try:
+            first_pid = runtime.process.pid
+            runtime.process.kill()
+            for _ in range(100):
+                await asyncio.sleep(0.05)
+                if runtime.restarts and runtime.state == "ready":
+                    break
+            stats = runtime.stats()
+            result = await runtime.translate("still here")
+        finally:
+            await runtime.stop()
+
+    assert result == "<en-es> still here"
+    assert stats["restarts"] == 1
+    assert stats["state"] == "ready"
+    assert stats["pid"] != first_pid
+    assert "exited" in stats["last_error"]
+    assert runtime.state == "stopped"
+
+# Test requests finding the decoder down start one replacement between them, and none during the restart backoff
+@pytest.mark.asyncio
+async def test_on_demand_start_is_serialized():
+    runtime = MarianRuntime(os.path.join("app", "models", "en-es"))
+    runtime.max_batch_size = 4
+    starts = 0
+
+    async def start():
+        nonlocal starts
+        starts += 1
+        await asyncio.sleep(0.01)
+        runtime._attach(FakeProcess())
+
+    runtime.start = start
+    runtime.state = "failed"
+    runtime._back_off()
+    results = await asyncio.gather(*(runtime.translate(f"line {i}") for i in range(8)), return_exceptions=True)
+    assert starts == 0
+    assert all(isinstance(result, DecoderDiedError) for result in results)
+
+    runtime._restart_at = 0.0
+    results = await asyncio.gather(*(runtime.translate(f"line {i}") for i in range(8)))
+    assert starts == 1
+    assert results == [f"LINE {i}" for i in range(8)]
+    await runtime.stop()
+    assert runtime.process is None
+
+# Test a slow replica's request is hedged onto another replica
+@pytest.mark.asyncio
+async def test_hedged_request():
+    async def slow(text):
+        await asyncio.sleep(5)
+        return "slow"
+
+    slow_replica, fast_replica = MagicMock(in_flight=0, last_used=0), MagicMock(in_flight=1, last_used=0)
+    slow_replica.translate = AsyncMock(side_effect=slow)
+    slow_replica.latency_percentile.return_value = None
+    fast_replica.translate = AsyncMock(return_value="fast")
+    with patch.dict('app.services.runtime_pool.config', {"hedge_requests": True, "hedge_min_delay_ms": 10}):
+        pool = RuntimePool("app/models/en-es", min_replicas=2, max_replicas=2)
+    pool.replicas = [slow_replica, fast_replica]
+
+    assert await asyncio.wait_for(pool.translate("Hello"), timeout=1) == "fast"
+    assert pool.hedged == 1
+    fast_replica.translate.assert_awaited_once_with("Hello")
+
+# Test the translation memory finds exact and near-duplicate segments after a restart
+@pytest.mark.asyncio
+async def test_translation_memory(tmp_path):
+    path = str(tmp_path / "memory.db")
+    memory = TranslationMemory(path, threshold=0.8)
+    memory.put("en", "es", "The quick brown fox jumps over the lazy dog.", "El rápido zorro marrón salta sobre el perro perezoso.")
+    memory.put("en", "es", "Your order 1234 has shipped.", "Su pedido 1234 ha sido enviado.")
+    assert await memory.lookup("en", "es", "Your order 1234 has shipped.") == "Su pedido 1234 ha sido enviado."
+    await memory.close()
+
+    memory = TranslationMemory(path, threshold=0.8)
+    try:
+        exact = await memory.lookup("en", "es", "  The quick brown fox jumps over the lazy dog.")
+        fuzzy = await memory.lookup("en", "es", "The quick brown fox jumps over the lazy dog!")
+        other_number = await memory.lookup("en", "es", "Your order 1235 has shipped.")
+        other_pair = await memory.lookup("en", "fr", "The quick brown fox jumps over the lazy dog.")
+        unrelated = await memory.lookup("en", "es", "Where is the train station?")
+    finally:
+        await memory.close()
+
+    assert exact == fuzzy == "El rápido zorro marrón salta sobre el perro perezoso."
+    assert other_number is None and other_pair is None and unrelated is None
+    assert memory.stats()["exact_hits"] == 1 and memory.stats()["fuzzy_hits"] == 1
+
+# Test the model index reuses checksums from its manifest and only reports real content changes
+def test_model_registry(tmp_path):
+    model_dir = tmp_path / "models" / "en-xx"
+    model_dir.mkdir(parents=True)
+    (model_dir / "model.npz").write_bytes(b"weights v1")
+    (model_dir / "vocab.yml").write_text("vocab")
+    (model_dir / "decoder.yml").write_text("decoder")
+    manifest = str(tmp_path / "manifest.json")
+
+    registry = ModelRegistry(str(tmp_path / "models"), manifest)
+    assert registry.scan() == []
+    entry = registry.get("en-xx")
+    assert entry["model"] == str(model_dir / "model.npz") and entry["vocab"] == str(model_dir / "vocab.yml")
+    version = entry["version"]
+
+    # A fresh start validates the manifest instead of hashing everything again
+    registry = ModelRegistry(str(tmp_path / "models"), manifest)
+    with patch('app.services.model_registry._sha256') as sha256:
+        assert registry.scan() == []
+    sha256.assert_not_called()
+    assert registry.get("en-xx")["version"] == version
+
+    os.utime(model_dir / "model.npz", ns=(1, 1))
+    assert registry.scan() == []
+    assert registry.get("en-xx")["version"] == version
+    (model_dir / "model.npz").write_bytes(b"weights v2")
+    assert registry.scan() == ["en-xx"]
+    assert registry.get("en-xx")["version"] != version
+    assert registry.get("en-zz") is None
+
+# Test startup preloads from the directory listing without waiting for the models to be hashed
+@pytest.mark.asyncio
+async def test_start_up_does_not_wait_for_scan(tmp_path):
+    (tmp_path / "en-xx").mkdir()
+    (tmp_path / "en-xx" / "model.npz").write_bytes(b"weights")
+    loader = ModelLoader(cache_size=2)
+    loader.registry = ModelRegistry(str(tmp_path), "")
+    hashing = threading.Event()
+    loader.registry.scan = MagicMock(side_effect=lambda: hashing.wait(5) and [])
+    loader.preload = AsyncMock()
+
+    with patch.dict('app.services.model_loader.config', {"auto_update_models": False}):
+        await asyncio.wait_for(loader.start_up(), timeout=1)
+
+    loader.preload.assert_awaited_once()
+    assert loader.registry.get("en-xx")["model"] == str(tmp_path / "en-xx" / "model.npz")
+    assert not loader._watch_task.done()
+    hashing.set()
+    await asyncio.wait_for(loader._watch_task, timeout=5)
+    loader.registry.scan.assert_called_once()
+
+# Test an updated model is swapped in, and the old replicas stopped, without unloading it
+@pytest.mark.asyncio
+async def test_model_hot_swap(tmp_path):
+    model_dir = tmp_path / "en-xx"
+    model_dir.mkdir()
+    (model_dir / "model.npz").write_bytes(b"weights")
+    loader = ModelLoader(cache_size=2)
+    loader.registry = ModelRegistry(str(tmp_path), "")
+    old, new = MagicMock(in_flight=0), MagicMock()
+    old.stop, new.start, new.stop = AsyncMock(), AsyncMock(), AsyncMock()
+    loader.models["en-xx"] = old
+
+    with patch.object(loader, "_create_pool", return_value=new):
+        await loader.reload_model("en-xx")
+
+    assert loader.models["en-xx"] is new
+    new.start.assert_awaited_once()
+    old.stop.assert_awaited_once()
+
+# Test the router prefers direct models, then loaded routes, then cheap ones
+def test_routing_planner(tmp_path):
+    def add_model(pair):
+        (tmp_path / pair).mkdir()
+        (tmp_path / pair / "model.npz").write_bytes(b"weights")
+
+    for pair in ["es-en", "en-fr", "es-de", "de-fr"]:
+        add_model(pair)
+    # A directory without a model file isn't a route
+    (tmp_path / "es-it").mkdir()
+    registry = ModelRegistry(str(tmp_path), "")
+    planner = Router(ModelGraph(registry))
+
+    assert planner.plan("es", "fr") == [("es", "en"), ("en", "fr")]
+    assert planner.plan("es", "fr", loaded={"es-de", "de-fr"}) == [("es", "de"), ("de", "fr")]
+    planner.record("es-en", 2.0)
+    planner.record("de-fr", 0.1)
+    assert planner.plan("es", "fr") == [("es", "de"), ("de", "fr")]
+    # Pairs without any route fall back to the pivot language
+    assert planner.plan("it", "pt") == [("it", "en"), ("en", "pt")]
+    assert planner.plan("es", "it") == [("es", "en"), ("en", "it")]
+
+    # A newly added direct model is picked up once the registry has indexed it
+    add_model("es-fr")
+    assert planner.plan("es", "fr", loaded={"es-de", "de-fr"}) == [("es", "de"), ("de", "fr")]
+    registry.scan()
+    assert planner.plan("es", "fr", loaded={"es-de", "de-fr"}) == [("es", "fr")]
+
+# Test clients are limited separately, bulk work waits behind interactive, full queues fail fast
+@pytest.mark.asyncio
+async def test_rate_limit_and_priority():
+    limiter = RateLimiter(per_minute=60, burst=2)
+    limiter.check("a")
+    limiter.check("a")
+    with pytest.raises(RateLimitedError) as excinfo:
+        limiter.check("a")
+    assert excinfo.value.retry_after == 1
+    limiter.check("b")
+
+    runtime = MarianRuntime(os.path.join("app", "models", "en-es"))
+    runtime._attach(FakeProcess())
+    runtime.max_batch_size = 1
+    runtime.max_queue_depth, runtime.bulk_queue_depth = 3, 2
+
+    async def bulk(text):
+        request_priority.set(BULK)
+        return await runtime.translate(text)
+
+    tasks = [
+        asyncio.create_task(bulk("bulk one")),
+        asyncio.create_task(bulk("bulk two")),
+        asyncio.create_task(runtime.translate("interactive")),
+    ]
+    await asyncio.sleep(0)
+    with pytest.raises(QueueFullError):
+        await runtime.translate("interactive two")
+    token = request_priority.set(BULK)
+    with pytest.raises(QueueFullError):
+        await runtime.translate("bulk three")
+    request_priority.reset(token)
+    await asyncio.gather(*tasks)
+
+    order = [write.decode().strip() for write in runtime.process.stdin.writes]
+    assert order == ["interactive", "bulk one", "bulk two"]
+    await runtime.stop()
+
+# Test a batch is charged per text and target, clients can't dodge the limit by renaming themselves, and oversized batches are refused
+def test_translate_batch_rate_cost(mock_translation):
+    single = {"source_lang": "en", "target_lang": "fr", "text": "Hi."}
+    with patch('app.controllers.translate.rate_limiter', RateLimiter(per_minute=60, burst=40)), \
+         patch.dict('app.controllers.translate.config', {"rate_limit_batch_item_cost": 1.0}):
+        response = client.post("/translate/batch", headers={"X-Client-ID": "one"}, json={
+            "source_lang": "en", "target_langs": ["fr", "es", "fr"], "texts": [f"Text {i}." for i in range(20)]
+        })
+        assert response.status_code == 200
+        response = client.post("/translate", headers={"X-Client-ID": "two"}, json=single)
+        assert response.status_code == 429
+        assert response.headers["retry-after"] == "1"
+
+        # A gateway trusted to name its clients gets a bucket per client
+        with patch.dict('app.controllers.translate.config', {"rate_limit_trusted_proxies": ["testclient"]}):
+            assert client.post("/translate", headers={"X-Client-ID": "two"}, json=single).status_code == 200
+
+        response = client.post("/translate/batch", json={
+            "source_lang": "en", "target_langs": ["fr", "es"], "texts": [f"Text {i}." for i in range(21)]
+        })
+        assert response.status_code == 400
+        assert "split it" in response.json()["detail"]
+
+# Test a full decoder queue answers 503 with Retry-After
+def test_translate_queue_full(mock_translation):
+    translation_cache.clear()
+    from app.services import translation
+    translation.model_loader.load_model.return_value.translate.side_effect = QueueFullError("en-fr", 3)
+
+    response = client.post("/translate", json={"source_lang": "en", "target_lang": "fr", "text": "Busy."})
+
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "3"
+
+# Test workers share one placement: a pair is hosted once and legs are forwarded to its host
+@pytest.mark.asyncio
+async def test_model_placement(tmp_path):
+    registry = str(tmp_path / "placement.json")
+    workers = []
+    for name in ("a", "b"):
+        (tmp_path / name).mkdir()
+        loader = MagicMock(models={}, _loading={})
+
+        async def handler(src, tgt, text, name=name):
+            return f"{name}:{text}"
+
+        settings = {"placement_registry": registry, "placement_socket_dir": str(tmp_path / name)}
+        with patch.dict('app.services.placement.config', settings), \
+             patch('app.services.placement.socket.gethostname', return_value=f"host-{name}"):
+            worker = Coordinator()
+            await worker.start(loader, handler)
+        workers.append((worker, loader))
+
+    (a, loader_a), (b, loader_b) = workers
+    try:
+        loader_a.models["en-es"] = MagicMock(in_flight=0)
+        await a.publish()
+        await b.publish()
+
+        address = await b.route("en-es")
+        assert address == a.address
+        assert await b.forward(address, "en", "es", "Hello") == "a:Hello"
+        assert await a.route("en-es") is None
+        # Connections to a peer are reused, one leg at a time each
+        await asyncio.gather(*(b.forward(address, "en", "es", f"Text {i}") for i in range(2)))
+        assert await b.forward(address, "en", "es", "Bye") == "a:Bye"
+        assert len(b._idle[address]) == 2
+
+        # Nobody hosts en-fr: b claims it and a defers to b
+        assert await b.route("en-fr") is None
+        assert await a.route("en-fr") == b.address
+        assert b.status()["placement"] == {"en-es": [a.worker_id]}
+    finally:
+        await a.stop()
+        await b.stop()
+
+    # A TCP port without a host only listens on loopback
+    settings = {"placement_registry": registry, "placement_address": ":0"}
+    with patch.dict('app.services.placement.config', settings):
+        worker = Coordinator()
+        await worker.start(MagicMock(models={}, _loading={}), None)
+    try:
+        assert worker.address.startswith("127.0.0.1:")
+        assert worker._server.sockets[0].getsockname()[0] == "127.0.0.1"
+    finally:
+        with patch.dict('app.services.placement.config', settings):
+            await worker.stop()
+
+# Test bulk jobs dedupe strings, write output as they go and resume from a checkpoint
+@pytest.mark.asyncio
+async def test_bulk_job_resume(mock_translation, tmp_path):
+    from app.services import translation
+    translation_cache.clear()
+    runtime = await translation.model_loader.load_model("en", "es")
+    runtime.translate.side_effect = lambda text: f"[{text}]"
+
+    source = tmp_path / "strings.jsonl"
+    source.write_text("".join(json.dumps({"id": i, "text": text}) + "\n"
+                              for i, text in enumerate(["Hello", "Hello", "Bye", "Bye", "Thanks"])))
+    output = tmp_path / "strings.out.jsonl"
+    job = BulkJob(str(source), str(output), "en", ["es"], chunk_size=2)
+    await job.run()
+
+    lines = [json.loads(line) for line in output.read_text().splitlines()]
+    assert [line["translations"]["es"] for line in lines] == ["[Hello]", "[Hello]", "[Bye]", "[Bye]", "[Thanks]"]
+    assert job.unique_strings == 3
+    assert not os.path.exists(str(output) + ".checkpoint")
+
+    # Pretend the job died after its first chunk
+    first_chunk = "".join(output.read_text().splitlines(keepends=True)[:2])
+    output.write_text(first_chunk + '{"partial')
+    with open(str(output) + ".checkpoint", "w") as f:
+        json.dump({"input": str(source), "target_langs": ["es"], "records": 2, "strings": 2,
+                   "unique_strings": 1, "failed": 0, "output_bytes": len(first_chunk.encode())}, f)
+    translation_cache.clear()
+    runtime.translate.reset_mock()
+
+    resumed = BulkJob(str(source), str(output), "en", ["es"], chunk_size=2)
+    await resumed.run()
+
+    assert runtime.translate.call_count == 2  # Bye and Thanks only
+    assert [json.loads(line)["id"] for line in output.read_text().splitlines()] == [0, 1, 2, 3, 4]
+    assert resumed.records == 5
+    translation_cache.clear()
+
+# Test PO catalogs keep their structure and get msgstr filled in
+@pytest.mark.asyncio
+async def test_bulk_job_po(mock_translation, tmp_path):
+    translation_cache.clear()
+    source = tmp_path / "messages.po"
+    source.write_text('msgid ""\nmsgstr ""\n"Language: es\\n"\n\n'
+                      '#: app.py:1\nmsgid "Hello"\nmsgstr ""\n\n'
+                      'msgid "One file"\nmsgid_plural "%d files"\nmsgstr[0] ""\nmsgstr[1] ""\n')
+    output = tmp_path / "messages.es.po"
+
+    await BulkJob(str(source), str(output), "en", ["es"]).run()
+
+    text = output.read_text()
+    assert '"Language: es\\n"' in text
+    assert '#: app.py:1\nmsgid "Hello"\nmsgstr "Translated text"' in text
+    assert 'msgstr[0] "Translated text"\nmsgstr[1] "Translated text"' in text
+    translation_cache.clear()
+
+# Test bad records fail on their own, stale checkpoints are ignored and single-target formats are checked up front
+@pytest.mark.asyncio
+async def test_bulk_job_errors(mock_translation, tmp_path):
+    translation_cache.clear()
+    source = tmp_path / "strings.jsonl"
+    source.write_text('{"id": 1, "text": "Hello"}\n{"id": 2, "label": "no text"}\nnot json\n')
+    output = tmp_path / "strings.out.jsonl"
+    # A checkpoint left over from a run whose output has since been deleted
+    with open(str(output) + ".checkpoint", "w") as f:
+        json.dump({"input": str(source), "target_langs": ["es"], "records": 2, "strings": 2,
+                   "unique_strings": 2, "failed": 0, "output_bytes": 50}, f)
+
+    job = BulkJob(str(source), str(output), "en", ["es"])
+    await job.run()
+
+    lines = [json.loads(line) for line in output.read_text().splitlines()]
+    assert job.state == "done" and job.records == 3 and job.failed == 2
+    assert lines[0]["translations"] == {"es": "Translated text"}
+    assert "text" in lines[1]["errors"]["es"] and "JSON" in lines[2]["errors"]["es"]
+
+    with pytest.raises(ValueError):
+        BulkJob(str(tmp_path / "messages.po"), str(tmp_path / "out.po"), "en", ["es", "fr"])
+    (tmp_path / "messages.po").write_text('msgid "Hello"\nmsgstr ""\n')
+    with patch.dict('app.controllers.jobs.config', {"bulk_jobs_dir": str(tmp_path)}):
+        response = client.post("/jobs", json={"input_path": "messages.po", "output_path": "out.po",
+                                              "source_lang": "en", "target_langs": ["es", "fr"]})
+    assert response.status_code == 400
+    translation_cache.clear()
+
+# Test log lines are written as JSON by the background writer and carry the request's ID
+def test_structured_logging(mock_translation):
+    translation_cache.clear()
+    stream = io.StringIO()
+    root_level = logging.getLogger().level
+    stop_logging()
+    try:
+        with patch.dict('app.utils.log.config', {"log_format": "json", "log_level": "DEBUG", "log_sample_rate": 1.0}):
+            setup_logging([logging.StreamHandler(stream)])
+        response = client.post("/translate", json={"source_lang": "en", "target_lang": "fr", "text": "Hello world"},
+                               headers={"X-Request-ID": "trace-1"})
+        assert response.headers["x-request-id"] == "trace-1"
+        assert client.get("/status").headers["x-request-id"] != "trace-1"
+    finally:
+        stop_logging()
+        logging.getLogger().setLevel(root_level)
+
+    lines = [json.loads(line) for line in stream.getvalue().splitlines()]
+    traced = [line for line in lines if line.get("request_id") == "trace-1"]
+    assert any(line["message"].startswith("Translating en-fr") for line in traced)
+    assert any(line.get("model") == "en-fr" and "duration_ms" in line for line in traced)
+    access = [line for line in traced if line.get("path") == "/translate"]
+    assert access[0]["status"] == 200 and access[0]["level"] == "INFO"
+
+    # Sampling drops whole requests' routine lines, never warnings
+    sampler = RequestSampler(0.0)
+    record = logging.LogRecord("root", logging.INFO, "", 0, "routine", None, None)
+    record.request_id = "trace-1"
+    assert not sampler.filter(record)
+    record.levelno = logging.WARNING
+    assert sampler.filter(record)
+    record.levelno, record.request_id = logging.INFO, None
+    assert sampler.filter(record)
+
 if __name__ == "__main__":
     pytest.main()
\ No newline at end of file
@@ -0,0 +1,205 @@
+# app/utils/log.py
+import atexit
+import copy
+import json
+import logging
+import queue
+import sys
+import time
+import uuid
+import zlib
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from app.config import config
+
+# ID of the request being served, for every log line written on its behalf;
+# a micro-batch carries the IDs of all its requests, comma separated
+request_id = ContextVar("request_id", default=None)
+
+REQUEST_ID_HEADER = "x-request-id"
+
+# Attributes every LogRecord has; anything else was passed through extra=
+_RECORD_FIELDS = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime", "request_id"}
+
+_listener = None
+
+def new_request_id() -> str:
+    return uuid.uuid4().hex[:16]
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: ts, level, logger, message, request_id and any extra= fields"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        if getattr(record, "request_id", None):
+            entry["request_id"] = record.request_id
+        for name, value in vars(record).items():
+            if name not in _RECORD_FIELDS:
+                entry[name] = value
+        if record.exc_info:
+            record.exc_text = record.exc_text or self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+class RequestSampler(logging.Filter):
+    """
+    Keep records above sample_level always, and the rest for a share of
+    requests. The choice is made per request ID, so a sampled request keeps
+    all its lines; records outside any request are always kept.
+    """
+
+    def __init__(self, rate: float, sample_level: int = logging.INFO):
+        super().__init__()
+        self.threshold = int(max(0.0, min(1.0, rate)) * 0xFFFFFFFF)
+        self.sample_level = sample_level
+
+    def sampled(self, ids: str) -> bool:
+        return any(zlib.crc32(rid.encode()) <= self.threshold for rid in ids.split(","))
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        ids = getattr(record, "request_id", None)
+        return record.levelno > self.sample_level or not ids or self.sampled(ids)
+
+class AsyncQueueHandler(QueueHandler):
+    """
+    Hands records to the background writer thread.
+
+    Only the request ID is captured and the message merged with its args on
+    the calling thread; formatting and I/O happen on the writer. When the
+    queue is full the record is dropped and counted instead of blocking.
+    """
+
+    def __init__(self, log_queue, sampler: RequestSampler = None):
+        super().__init__(log_queue)
+        self.sampler = sampler
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            # Tracebacks hold frames that may change before the writer gets to them
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def emit(self, record: logging.LogRecord):
+        record.request_id = request_id.get()
+        if self.sampler is not None and not self.sampler.filter(record):
+            return
+        try:
+            self.enqueue(self.prepare(record))
+        except queue.Full:
+            self.dropped += 1
+        except Exception:
+            self.handleError(record)
+
+def _make_formatter(log_format: str) -> logging.Formatter:
+    if log_format == "json":
+        return JsonFormatter()
+    return logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - %(request_id)s - %(message)s")
+
+def setup_logging(handlers=None):
+    """
+    Route all logging through a queue to a background writer thread.
+
+    Writes to log_file and stderr (or handlers, if given) in log_format
+    ("json" or "text"), at log_level and above. Safe to call more than
+    once; later calls keep the running pipeline.
+    """
+    global _listener
+    if _listener is not None:
+        return _listener
+
+    formatter = _make_formatter(config.get("log_format", "json"))
+    if handlers is None:
+        handlers = [logging.StreamHandler(sys.stderr)]
+        if config.get("log_file"):
+            handlers.append(logging.FileHandler(config["log_file"]))
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    log_queue = queue.Queue(maxsize=max(1, int(config.get("log_queue_size", 10000))))
+    sampler = RequestSampler(config.get("log_sample_rate", 1.0))
+    root = logging.getLogger()
+    # Records below the level are never created, so gated debug lines cost nothing
+    root.setLevel(getattr(logging, str(config.get("log_level", "INFO")).upper(), logging.INFO))
+    for handler in list(root.handlers):
+        if isinstance(handler, AsyncQueueHandler):
+            root.removeHandler(handler)
+    root.addHandler(AsyncQueueHandler(log_queue, sampler))
+
+    _listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    atexit.register(stop_logging)
+    return _listener
+
+def stop_logging():
+    """Write out queued records and stop the writer thread"""
+    global _listener
+    if _listener is None:
+        return
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        if isinstance(handler, AsyncQueueHandler):
+            root.removeHandler(handler)
+    _listener.stop()
+    for handler in _listener.handlers:
+        handler.close()
+    _listener = None
+
+def dropped_records() -> int:
+    """Records dropped because the writer fell behind"""
+    return sum(h.dropped for h in logging.getLogger().handlers if isinstance(h, AsyncQueueHandler))
+
+class RequestTracingMiddleware:
+    """
+    Give every HTTP request an ID and log it once it has been answered.
+
+    The ID comes from the client's X-Request-ID header or is generated, is
+    returned in the response's X-Request-ID header and is attached to every
+    log line written while the request is served. A plain ASGI middleware,
+    so streaming request bodies pass through untouched.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        rid = None
+        for name, value in scope.get("headers", []):
+            if name == REQUEST_ID_HEADER.encode():
+                rid = value.decode("latin-1")[:64]
+                break
+        rid = rid or new_request_id()
+        token = request_id.set(rid)
+        status = 500
+        started = time.monotonic()
+
+        async def send_with_id(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                message = {**message, "headers": [*message.get("headers", []), (REQUEST_ID_HEADER.encode(), rid.encode("latin-1"))]}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            logging.info(
+                f"{scope['method']} {scope['path']} {status}",
+                extra={"method": scope["method"], "path": scope["path"], "status": status,
+                       "duration_ms": round((time.monotonic() - started) * 1000, 2)},
+            )
+            request_id.reset(token)
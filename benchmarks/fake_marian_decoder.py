@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+# benchmarks/fake_marian_decoder.py
+"""
+Stand-in for marian-decoder, for benchmarks and tests without Marian.
+
+Speaks the same stdin/stdout protocol: one line in, one line out, answering
+only once a full --mini-batch of lines has been read (as marian does).
+Each output line is "<model> input", where model is the name of the model
+directory. Timing is controlled through environment variables:
+
+    FAKE_MARIAN_STARTUP_DELAY  seconds before the first batch is answered (default 0)
+    FAKE_MARIAN_BATCH_LATENCY  seconds per batch (default 0)
+    FAKE_MARIAN_LINE_LATENCY   seconds per non-empty line in a batch (default 0)
+    FAKE_MARIAN_FAIL_ON        exit with an error when a line contains this text
+"""
+import argparse
+import os
+import sys
+import time
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-m", "--models", required=True)
+    parser.add_argument("--mini-batch", type=int, default=1)
+    args, _ = parser.parse_known_args()
+
+    model = os.path.basename(os.path.dirname(os.path.abspath(args.models)))
+    startup_delay = float(os.environ.get("FAKE_MARIAN_STARTUP_DELAY", 0))
+    batch_latency = float(os.environ.get("FAKE_MARIAN_BATCH_LATENCY", 0))
+    line_latency = float(os.environ.get("FAKE_MARIAN_LINE_LATENCY", 0))
+    fail_on = os.environ.get("FAKE_MARIAN_FAIL_ON")
+
+    print(f"[fake-marian] loading {model}", file=sys.stderr, flush=True)
+    time.sleep(startup_delay)
+
+    batch = []
+    for line in sys.stdin:
+        line = line.rstrip("\n")
+        if fail_on and fail_on in line:
+            print("[fake-marian] failing on input", file=sys.stderr, flush=True)
+            sys.exit(1)
+        batch.append(line)
+        if len(batch) < args.mini_batch:
+            continue
+
+        busy = [text for text in batch if text]
+        if busy:
+            time.sleep(batch_latency + line_latency * len(busy))
+        sys.stdout.write("".join((f"<{model}> {text}" if text else "") + "\n" for text in batch))
+        sys.stdout.flush()
+        batch = []
+
+if __name__ == "__main__":
+    main()
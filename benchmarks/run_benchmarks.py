@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+# benchmarks/run_benchmarks.py
+"""
+Load-test FluentAI end to end against the stub decoder.
+
+Requests go through the real FastAPI app (in-process, over ASGI), the model
+loader and MarianRuntime; only marian-decoder is replaced by
+fake_marian_decoder.py, so results measure our own overhead, batching and
+cache behaviour. Examples:
+
+    python benchmarks/run_benchmarks.py
+    python benchmarks/run_benchmarks.py --scenario hot_pair --requests 2000 --line-latency 0.005
+    python benchmarks/run_benchmarks.py --json results.json
+    python benchmarks/run_benchmarks.py --baseline results.json --tolerance 0.2
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT)
+
+from app.config import config  # noqa: E402
+
+FAKE_DECODER = os.path.join(ROOT, "benchmarks", "fake_marian_decoder.py")
+PIVOT = config.get("pivot_lang", "en")
+LANGUAGES = [lang for lang in config.get("supported_languages", []) if lang != PIVOT]
+
+WORDS = ("the quick brown fox jumps over a lazy dog while our service translates "
+         "every catalog string into many languages with low latency").split()
+
+def sentence(rng: random.Random) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(rng.randint(6, 20))).capitalize() + "."
+
+def document(rng: random.Random, paragraphs: int = 40) -> str:
+    return "\n\n".join(" ".join(sentence(rng) for _ in range(5)) for _ in range(paragraphs))
+
+# Each scenario returns a list of (source_lang, target_lang, text) requests
+def hot_pair(rng, count):
+    return [("en", "es", sentence(rng)) for _ in range(count)]
+
+def uniform_50(rng, count):
+    langs = LANGUAGES[:50]
+    requests = []
+    for _ in range(count):
+        lang = rng.choice(langs)
+        requests.append((PIVOT, lang, sentence(rng)) if rng.random() < 0.5 else (lang, PIVOT, sentence(rng)))
+    return requests
+
+def pivot_heavy(rng, count):
+    langs = LANGUAGES[:8]
+    return [(*rng.sample(langs, 2), sentence(rng)) for _ in range(count)]
+
+def long_documents(rng, count):
+    return [("en", "fr", document(rng)) for _ in range(max(2, count // 100))]
+
+SCENARIOS = {
+    "hot_pair": hot_pair,
+    "uniform_50": uniform_50,
+    "pivot_heavy": pivot_heavy,
+    "long_documents": long_documents,
+}
+
+def make_models_dir(requests) -> str:
+    """Model directories with placeholder files for every pair the requests can touch"""
+    models_dir = tempfile.mkdtemp(prefix="fluentai-bench-")
+    pairs = set()
+    for src, tgt, _ in requests:
+        if PIVOT in (src, tgt):
+            pairs.add(f"{src}-{tgt}")
+        else:
+            pairs.update({f"{src}-{PIVOT}", f"{PIVOT}-{tgt}"})
+    for pair in pairs:
+        model_dir = os.path.join(models_dir, pair)
+        os.makedirs(model_dir)
+        for name in ("opus.fake.npz", "opus.fake.vocab.yml", "decoder.yml"):
+            with open(os.path.join(model_dir, name), "w") as f:
+                f.write("fake\n")
+    return models_dir
+
+def percentile(values, share: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(share * len(ordered)))]
+
+async def run_scenario(name: str, args) -> dict:
+    import httpx
+    from app.main import app
+    from app.services import translation
+    from app.services.metrics import MODEL_LOADS, MODEL_EVICTIONS
+    from app.services.model_loader import ModelLoader
+    from app.services.routing import ModelGraph
+    from app.services.rate_limit import rate_limiter
+    from app.services.translation_cache import translation_cache
+
+    rng = random.Random(args.seed)
+    requests = SCENARIOS[name](rng, args.requests)
+    models_dir = make_models_dir(requests)
+    config["models_dir"] = models_dir
+
+    # A fresh, empty loader per scenario
+    loader = ModelLoader(cache_size=args.cache_size)
+    translation.model_loader = loader
+    translation.router.graph = ModelGraph(loader.registry)
+    translation_cache.clear()
+    # Every request comes from one client; measure the service, not the limiter
+    rate_limiter.per_minute = 0
+    loads_before = sum(MODEL_LOADS.values.values())
+    evictions_before = sum(MODEL_EVICTIONS.values.values())
+
+    latencies = []
+    errors = 0
+    concurrency = asyncio.Semaphore(args.concurrency)
+    transport = httpx.ASGITransport(app=app)
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=600) as client:
+        async def send(src, tgt, text):
+            nonlocal errors
+            async with concurrency:
+                started = time.perf_counter()
+                response = await client.post("/translate", json={
+                    "source_lang": src, "target_lang": tgt, "text": text
+                })
+                latencies.append(time.perf_counter() - started)
+                if response.status_code != 200:
+                    errors += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(send(*request) for request in requests))
+        elapsed = time.perf_counter() - started
+
+    await loader.clear_cache()
+    shutil.rmtree(models_dir, ignore_errors=True)
+
+    return {
+        "scenario": name,
+        "requests": len(requests),
+        "errors": errors,
+        "requests_per_sec": round(len(requests) / elapsed, 2),
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 2),
+        "model_loads": int(sum(MODEL_LOADS.values.values()) - loads_before),
+        "model_evictions": int(sum(MODEL_EVICTIONS.values.values()) - evictions_before),
+    }
+
+def compare(results, baseline, tolerance: float):
+    """Regressions against a previous --json run: lower throughput or higher p95"""
+    previous = {result["scenario"]: result for result in baseline}
+    regressions = []
+    for result in results:
+        before = previous.get(result["scenario"])
+        if before is None:
+            continue
+        if result["requests_per_sec"] < before["requests_per_sec"] * (1 - tolerance):
+            regressions.append(f"{result['scenario']}: {result['requests_per_sec']} req/s "
+                               f"(was {before['requests_per_sec']})")
+        if result["p95_ms"] > before["p95_ms"] * (1 + tolerance):
+            regressions.append(f"{result['scenario']}: p95 {result['p95_ms']} ms (was {before['p95_ms']})")
+    return regressions
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenario", choices=sorted(SCENARIOS), action="append",
+                        help="Scenario to run; repeat for several (default: all)")
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--cache-size", type=int, default=config.get("cache_size", 6))
+    parser.add_argument("--startup-delay", type=float, default=0.2, help="Stub decoder model load time (s)")
+    parser.add_argument("--batch-latency", type=float, default=0.002, help="Stub decoder time per batch (s)")
+    parser.add_argument("--line-latency", type=float, default=0.001, help="Stub decoder time per line (s)")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", help="Write results to this file")
+    parser.add_argument("--baseline", help="Fail if results regress against this --json file")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args()
+
+    config["marian_decoder_path"] = f"{sys.executable} {FAKE_DECODER}"
+    config["log_texts"] = False
+    os.environ["FAKE_MARIAN_STARTUP_DELAY"] = str(args.startup_delay)
+    os.environ["FAKE_MARIAN_BATCH_LATENCY"] = str(args.batch_latency)
+    os.environ["FAKE_MARIAN_LINE_LATENCY"] = str(args.line_latency)
+
+    results = []
+    header = f"{'scenario':<16}{'requests':>9}{'errors':>8}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'loads':>7}{'evicts':>8}"
+    print(header)
+    for name in args.scenario or list(SCENARIOS):
+        result = await run_scenario(name, args)
+        results.append(result)
+        print(f"{name:<16}{result['requests']:>9}{result['errors']:>8}{result['requests_per_sec']:>10}"
+              f"{result['p50_ms']:>10}{result['p95_ms']:>10}{result['p99_ms']:>10}"
+              f"{result['model_loads']:>7}{result['model_evictions']:>8}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        if regressions:
+            print("Performance regressions:")
+            for regression in regressions:
+                print(f"  {regression}")
+            sys.exit(1)
+
+if __name__ == "__main__":
+    asyncio.run(main())